@@ -0,0 +1,94 @@
+"""Synthetic loan applications for the inference benchmarks."""
+
+from pathlib import Path
+
+import numpy as np
+from pandas import DataFrame, isna, read_csv
+
+from lap.config import RAW_DATA_DIR
+
+RAW_DATA_PATH = RAW_DATA_DIR / "loan_pred.csv"
+
+# Fields of the web service's PredictionRequest, split by how they are generated.
+CATEGORICAL_FIELDS = (
+    "Gender",
+    "Married",
+    "Dependents",
+    "Education",
+    "Self_Employed",
+    "Property_Area",
+    "Credit_History",
+    "Loan_Amount_Term",
+)
+NUMERICAL_FIELDS = ("ApplicantIncome", "CoapplicantIncome", "LoanAmount")
+
+# PredictionRequest fields that may not be null.
+REQUIRED_FIELDS = ("Education", "Property_Area", "ApplicantIncome", "CoapplicantIncome")
+
+
+class ApplicationGenerator:
+    """
+    Draws loan applications valid against the PredictionRequest schema, following the
+    per-field distributions of the raw dataset.
+
+    Categorical fields, and the few discrete loan terms, are drawn from their observed
+    frequencies. Incomes and loan amounts are log-normal, fitted to the positive values and
+    clipped to the observed range, with the observed share of zeros. Optional fields are
+    missing (None) as often as in the raw data. Fields are drawn independently.
+    """
+
+    def __init__(self, raw: DataFrame):
+        self.n_rows = len(raw)
+        self.categorical = {}
+        for field in CATEGORICAL_FIELDS:
+            counts = raw[field].value_counts(dropna=field in REQUIRED_FIELDS)
+            self.categorical[field] = (
+                [None if isna(value) else _python_value(value) for value in counts.index],
+                (counts / counts.sum()).to_numpy(),
+            )
+
+        self.numerical = {}
+        for field in NUMERICAL_FIELDS:
+            values = raw[field].dropna()
+            positive = np.log(values[values > 0])
+            self.numerical[field] = {
+                "missing_rate": 0.0 if field in REQUIRED_FIELDS else raw[field].isna().mean(),
+                "zero_rate": float((values == 0).mean()),
+                "log_mean": float(positive.mean()),
+                "log_std": float(positive.std()),
+                "low": float(values[values > 0].min()),
+                "high": float(values.max()),
+            }
+
+    @classmethod
+    def from_csv(cls, path: Path = RAW_DATA_PATH) -> "ApplicationGenerator":
+        return cls(read_csv(path, dtype={"Dependents": str}))
+
+    def sample(self, n: int, seed: int = 42) -> list[dict]:
+        rng = np.random.default_rng(seed)
+        columns = {}
+
+        for field, (values, probabilities) in self.categorical.items():
+            columns[field] = [values[i] for i in rng.choice(len(values), n, p=probabilities)]
+
+        for field, spec in self.numerical.items():
+            amounts = np.exp(rng.normal(spec["log_mean"], spec["log_std"], n))
+            amounts = np.round(np.clip(amounts, spec["low"], spec["high"]))
+            draws = rng.random(n)
+            missing = draws < spec["missing_rate"]
+            zero = ~missing & (draws < spec["missing_rate"] + spec["zero_rate"])
+            columns[field] = [
+                None if is_missing else 0.0 if is_zero else float(amount)
+                for is_missing, is_zero, amount in zip(missing, zero, amounts, strict=True)
+            ]
+
+        return [
+            dict(zip(columns, row, strict=True)) for row in zip(*columns.values(), strict=True)
+        ]
+
+
+def _python_value(value):
+    """Native Python scalars, so applications serialize to JSON as the schema expects."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value.item() if hasattr(value, "item") else value
@@ -0,0 +1,117 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from loguru import logger
+import typer
+
+from benchmarks.common import DEPLOYMENT_DIR, save_results
+from lap.config import MODELS_DIR, PROJ_ROOT
+
+app = typer.Typer()
+
+# Runs in a fresh interpreter, timing a Lambda cold start of deployment/model.py.
+COLD_START_SCRIPT = """
+import json, sys, time
+
+start = time.perf_counter()
+import model
+imported = time.perf_counter()
+service = model.init(prediction_stream_name=None, model_id=None, test_run=True)
+loaded = time.perf_counter()
+with open(sys.argv[1]) as f:
+    service.lambda_handler(json.load(f))
+scored = time.perf_counter()
+
+print(json.dumps({
+    "import_s": imported - start,
+    "load_s": loaded - imported,
+    "first_invocation_s": scored - loaded,
+    "total_s": scored - start,
+    "mlflow_imported": "mlflow" in sys.modules,
+    "pandas_imported": "pandas" in sys.modules,
+}))
+"""
+
+PACKAGES = ("numpy", "scipy", "pandas", "sklearn", "joblib", "mlflow", "boto3")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def run_cold_start(env: dict) -> tuple[dict, dict]:
+    """Runs one cold start, returning its timings and cumulative import time per package."""
+    completed = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            COLD_START_SCRIPT,
+            str(PROJ_ROOT / "integration-test" / "event.json"),
+        ],
+        cwd=MODELS_DIR,
+        env={**os.environ, "PYTHONPATH": str(DEPLOYMENT_DIR), **env},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    timings = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    # Top-level package imports carry the cumulative time of everything they import.
+    imports = {}
+    for match in IMPORTTIME_LINE.finditer(completed.stderr):
+        cumulative_us, module = match.groups()
+        if module in PACKAGES and module not in imports:
+            imports[module] = int(cumulative_us) / 1e6
+
+    return timings, imports
+
+
+@app.command()
+def main(
+    repeats: int = 5,
+    bundle_path: str = str(MODELS_DIR / "serving_bundle.joblib"),
+    mlflow_model_location: str = str(PROJ_ROOT / "integration-test" / "model"),
+):
+    """Compares Lambda cold starts loading the serving bundle against the MLflow model."""
+    modes = {
+        "bundle": {"MODEL_BUNDLE_PATH": bundle_path},
+        "mlflow": {"MODEL_LOCATION": mlflow_model_location},
+    }
+
+    results = {}
+    for mode, env in modes.items():
+        runs = [run_cold_start(env) for _ in range(repeats)]
+        timings = [timing for timing, _ in runs]
+        imports = [imported for _, imported in runs]
+
+        results[mode] = {
+            **{
+                key: statistics.median(run[key] for run in timings)
+                for key in ("import_s", "load_s", "first_invocation_s", "total_s")
+            },
+            "mlflow_imported": timings[0]["mlflow_imported"],
+            "pandas_imported": timings[0]["pandas_imported"],
+            "package_import_s": {
+                package: statistics.median(run.get(package, 0.0) for run in imports)
+                for package in PACKAGES
+            },
+        }
+
+        logger.info(
+            f"{mode}: import {results[mode]['import_s']:.3f}s, "
+            f"load {results[mode]['load_s']:.3f}s, "
+            f"first invocation {results[mode]['first_invocation_s']:.3f}s, "
+            f"total {results[mode]['total_s']:.3f}s"
+        )
+
+    output_path = save_results(results, "cold_start")
+    logger.success(f"Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,92 @@
+"""Shared helpers for the benchmark scripts."""
+
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import sys
+import tracemalloc
+
+import numpy as np
+
+from lap.config import CLEANED_DATA_PATH, MODELS_DIR, PROJ_ROOT, REPORTS_DIR
+from lap.dataset_io import read_table
+
+DEPLOYMENT_DIR = PROJ_ROOT / "deployment"
+WEB_SERVICE_DIR = DEPLOYMENT_DIR / "web-service"
+BENCHMARKS_REPORTS_DIR = REPORTS_DIR / "benchmarks"
+
+
+def add_deployment_to_path():
+    """Makes the flat deployment modules (model, bundle, predict, ...) importable."""
+    for path in (DEPLOYMENT_DIR, WEB_SERVICE_DIR):
+        if str(path) not in sys.path:
+            sys.path.insert(0, str(path))
+
+
+def load_web_service(
+    model_path: Path = MODELS_DIR / "model.pkl",
+    preprocessor_path: Path = MODELS_DIR / "preprocessor.pkl",
+    cleaner_path: Path = MODELS_DIR / "cleaner.pkl",
+):
+    """Imports the FastAPI web service in-process, pointing it at the given artifacts."""
+    os.environ.setdefault("MODEL_PATH", str(model_path))
+    os.environ.setdefault("PREPROCESSOR_PATH", str(preprocessor_path))
+    os.environ.setdefault("CLEANER_PATH", str(cleaner_path))
+    add_deployment_to_path()
+
+    import predict
+
+    return predict
+
+
+def load_model_service(bundle_path: Path = MODELS_DIR / "serving_bundle.joblib"):
+    """Builds the Lambda's ModelService from a serving bundle, without Kinesis callbacks."""
+    add_deployment_to_path()
+
+    from bundle import load_bundle
+    from model import ModelService
+
+    bundle = load_bundle(bundle_path)
+    return ModelService(
+        model=bundle.model, preprocessor=bundle.preprocessor, model_version=bundle.model_version
+    )
+
+
+def sample_applications(n: int, seed: int = 42) -> list[dict]:
+    """Samples `n` loan applications, with replacement, from the cleaned dataset."""
+    df = read_table(CLEANED_DATA_PATH).drop(columns=["Loan_Status"])
+    df["Credit_History"] = df["Credit_History"].astype(int)
+    df = df.sample(n=n, replace=True, random_state=seed)
+    return df.to_dict("records")
+
+
+def latency_summary(latencies: list[float]) -> dict:
+    """Summarizes latencies given in seconds as milliseconds."""
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def traced_peak_mb(fn, *args) -> float:
+    """Peak Python heap allocated while running `fn(*args)`, in MB, as seen by tracemalloc."""
+    tracemalloc.start()
+    try:
+        fn(*args)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def save_results(results: dict, name: str, output_dir: Path = BENCHMARKS_REPORTS_DIR) -> Path:
+    """Writes benchmark results to `<output_dir>/<name>-<timestamp>.json`."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    output_path = output_dir / f"{name}-{timestamp}.json"
+    with open(output_path, "wt") as f:
+        json.dump(results, f, indent=2)
+    return output_path
@@ -0,0 +1,72 @@
+import time
+
+from loguru import logger
+import numpy as np
+from pandas import DataFrame
+import typer
+
+from benchmarks.common import BENCHMARKS_REPORTS_DIR, save_results
+from lap.config import DATASET_SUFFIXES, FEATURES_PATH, LABELS_PATH
+from lap.dataset_io import LABEL_COLUMN, read_training_data, write_training_data
+
+app = typer.Typer()
+
+
+def synthetic_training_data(n_rows: int, seed: int = 42) -> tuple[DataFrame, DataFrame]:
+    """Resamples the processed training data to `n_rows`, with small noise on the features."""
+    features, labels = read_training_data(FEATURES_PATH, LABELS_PATH)
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(len(features), size=n_rows)
+
+    values = features.to_numpy()[rows] + rng.normal(scale=1e-3, size=(n_rows, features.shape[1]))
+    return (
+        DataFrame(values, columns=features.columns),
+        DataFrame({LABEL_COLUMN: labels[LABEL_COLUMN].to_numpy()[rows]}),
+    )
+
+
+@app.command()
+def main(n_rows: int = 1_000_000, repeats: int = 3):
+    """Compares writing and reading the training data as CSV, Parquet and Arrow IPC."""
+    features, labels = synthetic_training_data(n_rows)
+    output_dir = BENCHMARKS_REPORTS_DIR / "dataset_io"
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    results = {"n_rows": n_rows, "n_features": features.shape[1]}
+    for fmt, suffix in DATASET_SUFFIXES.items():
+        if fmt == "csv":
+            paths = (output_dir / "features.csv", output_dir / "labels.csv")
+        else:
+            paths = (output_dir / f"training{suffix}",) * 2
+
+        write_s, read_s = [], []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            write_training_data(features, labels, *paths)
+            write_s.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            read_features, read_labels = read_training_data(*paths)
+            read_s.append(time.perf_counter() - start)
+
+        assert read_features.shape == features.shape and len(read_labels) == n_rows
+
+        results[fmt] = {
+            "write_s": min(write_s),
+            "read_s": min(read_s),
+            "size_mb": sum(path.stat().st_size for path in set(paths)) / 1e6,
+        }
+        logger.info(
+            f"{fmt}: write {results[fmt]['write_s']:.3f}s, read {results[fmt]['read_s']:.3f}s, "
+            f"{results[fmt]['size_mb']:.1f} MB"
+        )
+
+        for path in set(paths):
+            path.unlink()
+
+    output_path = save_results(results, "dataset_io")
+    logger.success(f"Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
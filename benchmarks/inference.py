@@ -0,0 +1,185 @@
+import base64
+from contextlib import nullcontext
+import json
+import resource
+import time
+
+from fastapi.testclient import TestClient
+from loguru import logger
+import typer
+
+from benchmarks.applications import ApplicationGenerator
+from benchmarks.common import (
+    latency_summary,
+    load_model_service,
+    load_web_service,
+    save_results,
+    traced_peak_mb,
+)
+
+app = typer.Typer()
+
+
+def benchmark_calls(fn, inputs: list) -> dict:
+    """Times `fn` once per input, then traces its peak memory on the first input."""
+    latencies = []
+    start = time.perf_counter()
+    for value in inputs:
+        call_start = time.perf_counter()
+        fn(value)
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "calls": len(inputs),
+        "seconds": elapsed,
+        "calls_per_second": len(inputs) / elapsed,
+        **latency_summary(latencies),
+        "peak_traced_mb": traced_peak_mb(fn, inputs[0]),
+    }
+
+
+def kinesis_event(applications: list[dict], first_request_id: int = 0) -> dict:
+    """A Kinesis event carrying one base64-encoded record per application."""
+    records = []
+    for request_id, application in enumerate(applications, start=first_request_id):
+        data = json.dumps({"input": application, "request_id": str(request_id)})
+        records.append({"kinesis": {"data": base64.b64encode(data.encode("utf-8")).decode()}})
+    return {"Records": records}
+
+
+def benchmark_lambda_handler(service, applications: list[dict], batch_size: int) -> dict:
+    """Invokes `lambda_handler` with events of `batch_size` records, covering `applications`."""
+    events = [
+        kinesis_event(applications[start : start + batch_size], first_request_id=start)
+        for start in range(0, len(applications) - batch_size + 1, batch_size)
+    ]
+    result = benchmark_calls(service.lambda_handler, events)
+
+    return {
+        "batch_size": batch_size,
+        **result,
+        "records_per_second": result["calls_per_second"] * batch_size,
+    }
+
+
+class NullMetrics:
+    """Stands in for ServingMetrics to measure the service without instrumentation."""
+
+    def time(self, stage, record=None):
+        return nullcontext()
+
+    def count(self, name, amount=1):
+        pass
+
+
+def benchmark_instrumentation(service, applications: list[dict], n_timers: int = 100_000) -> dict:
+    """
+    Cost of one timed stage, and lambda_handler latency on single-record events with and
+    without the serving metrics.
+    """
+    start = time.perf_counter()
+    for _ in range(n_timers):
+        with service.metrics.time("benchmark"):
+            pass
+    timer_us = (time.perf_counter() - start) / n_timers * 1e6
+
+    events = [kinesis_event([application]) for application in applications]
+    instrumented = benchmark_calls(service.lambda_handler, events)
+
+    metrics, service.metrics = service.metrics, NullMetrics()
+    try:
+        uninstrumented = benchmark_calls(service.lambda_handler, events)
+    finally:
+        service.metrics = metrics
+
+    return {
+        "timed_stage_us": timer_us,
+        "lambda_handler_p50_ms": instrumented["p50_ms"],
+        "uninstrumented_lambda_handler_p50_ms": uninstrumented["p50_ms"],
+        "overhead_pct": (instrumented["p50_ms"] / uninstrumented["p50_ms"] - 1) * 100,
+    }
+
+
+def post_predict(client: TestClient, application: dict):
+    response = client.post("/predict", json=application)
+    response.raise_for_status()
+    return response
+
+
+@app.command()
+def main(
+    n_requests: int = typer.Option(2_000, help="Single-record calls per path."),
+    batch_sizes: list[int] = typer.Option(
+        [1, 10, 100, 1_000, 10_000], help="Records per Kinesis event."
+    ),
+    records_per_batch_size: int = typer.Option(
+        20_000, help="Records sent to lambda_handler at each batch size."
+    ),
+    seed: int = 42,
+):
+    """
+    Measures throughput, latency percentiles and memory of the serving paths on synthetic
+    applications: ModelService.prepare_features and predict, lambda_handler on Kinesis
+    events of increasing size, and the web service's /predict endpoint in-process. Also
+    measures the overhead of the serving metrics.
+    """
+    generator = ApplicationGenerator.from_csv()
+    applications = generator.sample(
+        max(n_requests, records_per_batch_size, *batch_sizes), seed=seed
+    )
+    single = applications[:n_requests]
+
+    service = load_model_service()
+    features = [service.prepare_features(application) for application in single]
+
+    results = {
+        "n_requests": n_requests,
+        "model_version": service.model_version,
+        "prepare_features": benchmark_calls(service.prepare_features, single),
+        "predict": benchmark_calls(service.predict, features),
+        "lambda_handler": [
+            benchmark_lambda_handler(
+                service, applications[: max(records_per_batch_size, batch_size)], batch_size
+            )
+            for batch_size in batch_sizes
+        ],
+    }
+
+    results["instrumentation"] = benchmark_instrumentation(service, single)
+
+    predict = load_web_service()
+    with TestClient(predict.app) as client:
+        results["web_service_predict"] = benchmark_calls(
+            lambda application: post_predict(client, application), single
+        )
+
+    # ru_maxrss is in kilobytes on Linux.
+    results["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+    for name in ("prepare_features", "predict", "web_service_predict"):
+        result = results[name]
+        logger.info(
+            f"{name}: {result['calls_per_second']:.0f} calls/s, "
+            f"p50 {result['p50_ms']:.3f} ms, p99 {result['p99_ms']:.3f} ms, "
+            f"peak {result['peak_traced_mb']:.3f} MB"
+        )
+    for result in results["lambda_handler"]:
+        logger.info(
+            f"lambda_handler, {result['batch_size']} records/event: "
+            f"{result['records_per_second']:.0f} records/s, p99 {result['p99_ms']:.1f} ms, "
+            f"peak {result['peak_traced_mb']:.3f} MB"
+        )
+
+    overhead = results["instrumentation"]
+    logger.info(
+        f"instrumentation: {overhead['timed_stage_us']:.2f} us per timed stage, "
+        f"lambda_handler p50 {overhead['overhead_pct']:+.1f}%"
+    )
+
+    output_path = save_results(results, "inference")
+    logger.success(f"Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,80 @@
+import time
+
+from loguru import logger
+from sklearn import config_context
+from sklearn.metrics import f1_score
+from sklearn.model_selection import train_test_split
+import typer
+
+from benchmarks.common import latency_summary, save_results
+from benchmarks.dataset_io import synthetic_training_data
+from lap.modeling.families import DEFAULT_PARAMS, MODEL_FAMILIES, build_model
+
+app = typer.Typer()
+
+
+def benchmark_family(model_family: str, X_train, y_train, X_test, y_test, n_requests: int):
+    """
+    Fit time, test F1 and scoring cost of one model family.
+
+    Scoring is timed both one record per call, where sklearn's per-call overhead weighs
+    in, and per row of a single call on the whole test set, where the cost of the kernel
+    (support vectors or approximation components) dominates.
+    """
+    model = build_model(model_family, DEFAULT_PARAMS[model_family], probability=True)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    latencies = []
+    with config_context(assume_finite=True):
+        for row in X_test[:n_requests]:
+            start = time.perf_counter()
+            model.decision_function(row[None, :])
+            latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        model.decision_function(X_test)
+        batch_us_per_row = (time.perf_counter() - start) / len(X_test) * 1e6
+
+    return {
+        "fit_s": fit_s,
+        "test_f1": f1_score(y_test, model.predict(X_test), average="weighted"),
+        "scoring_latency": latency_summary(latencies),
+        "batch_us_per_row": batch_us_per_row,
+        "n_support_vectors": int(model.n_support_.sum()) if model_family == "svc" else None,
+    }
+
+
+@app.command()
+def main(
+    sizes: list[int] = typer.Option([1_000, 5_000, 20_000], help="Training rows to compare at."),
+    n_requests: int = typer.Option(1_000, help="Single-record scoring calls per model."),
+):
+    """Compares exact SVC and the kernel approximation on F1, fit time and p99 latency."""
+    results = {"default_params": DEFAULT_PARAMS}
+
+    for n_rows in sizes:
+        features, labels = synthetic_training_data(n_rows)
+        X_train, X_test, y_train, y_test = train_test_split(
+            features.to_numpy(), labels.to_numpy().ravel(), test_size=0.2, random_state=42
+        )
+        results[n_rows] = {}
+
+        for model_family in MODEL_FAMILIES:
+            result = benchmark_family(model_family, X_train, y_train, X_test, y_test, n_requests)
+            results[n_rows][model_family] = result
+            logger.info(
+                f"{n_rows} rows, {model_family}: fit {result['fit_s']:.2f}s, "
+                f"F1 {result['test_f1']:.3f}, "
+                f"p99 {result['scoring_latency']['p99_ms']:.3f} ms, "
+                f"batch {result['batch_us_per_row']:.1f} us/row"
+            )
+
+    output_path = save_results(results, "kernel_approximation")
+    logger.success(f"Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
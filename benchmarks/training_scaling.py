@@ -0,0 +1,328 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+import os
+from pathlib import Path
+import resource
+import time
+
+from loguru import logger
+import numpy as np
+import pandas as pd
+import typer
+
+from benchmarks.applications import RAW_DATA_PATH
+from benchmarks.common import BENCHMARKS_REPORTS_DIR
+from lap.config import DATASET_FORMAT, DATASET_SUFFIXES, FIGURES_DIR
+
+app = typer.Typer()
+
+STAGES = ("data", "model_selection", "hp_optim", "final_training")
+
+# "orchestrated" runs the Prefect flows and tasks, tracked in MLflow, as the pipeline does.
+# "bare" runs the same computation without Prefect and without MLflow.
+MODES = ("orchestrated", "bare")
+
+SCRATCH_DIR = BENCHMARKS_REPORTS_DIR / "training_scaling"
+
+
+def upsample_raw_data(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Resamples the raw loan applications to `n_rows`, with replacement.
+
+    Incomes and loan amounts get a few percent of multiplicative noise so rows are not
+    exact duplicates, the other fields and the label are kept as sampled.
+    """
+    raw = pd.read_csv(RAW_DATA_PATH, dtype={"Dependents": str})
+    rng = np.random.default_rng(seed)
+    df = raw.iloc[rng.integers(len(raw), size=n_rows)].reset_index(drop=True)
+
+    for column in ("ApplicantIncome", "CoapplicantIncome", "LoanAmount"):
+        noise = rng.lognormal(sigma=0.05, size=n_rows)
+        df[column] = (df[column] * noise).round()
+    df["Loan_ID"] = [f"LP{i:08d}" for i in range(n_rows)]
+    return df
+
+
+def dataset_paths(workdir: Path) -> dict:
+    """Inputs and outputs of the pipeline stages for one dataset size."""
+    suffix = DATASET_SUFFIXES[DATASET_FORMAT]
+    if DATASET_FORMAT == "csv":
+        features_path, labels_path = workdir / "features.csv", workdir / "labels.csv"
+    else:
+        features_path = labels_path = workdir / f"training{suffix}"
+
+    return {
+        "raw_data_path": workdir / "raw.csv",
+        "cleaned_data_path": workdir / f"cleaned{suffix}",
+        "features_path": features_path,
+        "labels_path": labels_path,
+        "preprocessor_save_path": workdir / "preprocessor.pkl",
+        "cleaner_save_path": workdir / "cleaner.pkl",
+        "model_output_path": workdir / "model.pkl",
+    }
+
+
+def run_data(paths: dict, orchestrated: bool):
+    from lap import dataset
+
+    if orchestrated:
+        dataset.data_preprocessing_flow(
+            **{key: value for key, value in paths.items() if key != "model_output_path"}
+        )
+        return
+
+    cleaned_df = dataset.clean_data.fn(
+        input_path=paths["raw_data_path"],
+        output_path=paths["cleaned_data_path"],
+        cleaner_save_path=paths["cleaner_save_path"],
+    )
+    dataset.preproccess_data.fn(
+        cleaned_df=cleaned_df,
+        output_path=paths["features_path"],
+        labels_path=paths["labels_path"],
+        preprocessor_save_path=paths["preprocessor_save_path"],
+    )
+
+
+def run_model_selection(paths: dict, orchestrated: bool):
+    from sklearn.model_selection import train_test_split
+
+    from lap.dataset_io import read_training_data
+    from lap.modeling import model_selection
+
+    if orchestrated:
+        model_selection.training_flow(paths["features_path"], paths["labels_path"])
+        return
+
+    features, labels = read_training_data(paths["features_path"], paths["labels_path"])
+    X_train, X_test, y_train, y_test = train_test_split(
+        features, labels, test_size=0.2, random_state=42
+    )
+    for model in model_selection.candidate_models().values():
+        model_selection.fit_and_evaluate(
+            model, X_train, y_train.values.ravel(), X_test, y_test.values.ravel()
+        )
+
+
+def run_hp_optim(paths: dict, orchestrated: bool, num_trials: int):
+    from hyperopt import Trials, fmin, tpe
+    from sklearn.model_selection import train_test_split
+
+    from lap.dataset_io import read_training_data
+    from lap.modeling import hp_optim
+    from lap.modeling.families import SEARCH_SPACES
+
+    if orchestrated:
+        hp_optim.hp_optim_flow(paths["features_path"], paths["labels_path"], num_trials)
+        return
+
+    features, labels = read_training_data(paths["features_path"], paths["labels_path"])
+    X_train, _, y_train, _ = train_test_split(features, labels, test_size=0.2, random_state=42)
+    fmin(
+        fn=lambda params: -hp_optim.cv_score(params, X_train, y_train.values.ravel()),
+        space=SEARCH_SPACES["svc"],
+        algo=tpe.suggest,
+        max_evals=num_trials,
+        trials=Trials(),
+    )
+
+
+def run_final_training(paths: dict, orchestrated: bool):
+    import joblib
+    import mlflow
+
+    from lap.config import MLFLOW_EXPERIMENT_NAME
+    from lap.dataset_io import read_training_data
+    from lap.modeling import train
+    from lap.modeling.families import DEFAULT_PARAMS, build_model
+
+    features, labels = read_training_data(paths["features_path"], paths["labels_path"])
+
+    if orchestrated:
+        # The best parameters are fixed, so the time does not depend on the search.
+        mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+        train.train_final_model(
+            features=features,
+            labels=labels,
+            best_params=DEFAULT_PARAMS["svc"],
+            best_run_id="training_scaling",
+            model_name="training-scaling-svc",
+            model_output_path=paths["model_output_path"],
+        )
+        return
+
+    model = build_model("svc", DEFAULT_PARAMS["svc"], probability=True)
+    model.fit(features, labels.values.ravel())
+    joblib.dump(model, paths["model_output_path"])
+
+
+def run_stage(stage: str, mode: str, paths: dict, num_trials: int) -> dict:
+    """
+    Runs one stage in this (fresh) process, returning its time and peak RSS.
+
+    The RSS growth is the peak during the stage over the peak after the imports.
+    """
+    from lap import dataset  # noqa: F401, imported before the baseline RSS
+    from lap.modeling import hp_optim, model_selection, train  # noqa: F401
+
+    baseline_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    orchestrated = mode == "orchestrated"
+
+    start = time.perf_counter()
+    if stage == "data":
+        run_data(paths, orchestrated)
+    elif stage == "model_selection":
+        run_model_selection(paths, orchestrated)
+    elif stage == "hp_optim":
+        run_hp_optim(paths, orchestrated, num_trials)
+    else:
+        run_final_training(paths, orchestrated)
+    seconds = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux.
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    return {"seconds": seconds, "peak_rss_mb": peak_mb, "rss_growth_mb": peak_mb - baseline_mb}
+
+
+def measure(stage: str, mode: str, paths: dict, num_trials: int) -> dict:
+    """Runs `run_stage` in a fresh spawned process, so its peak RSS is the stage's own."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+        return executor.submit(run_stage, stage, mode, paths, num_trials).result()
+
+
+def scaling_exponents(report: pd.DataFrame) -> pd.DataFrame:
+    """Slope of log(seconds) over log(rows) per stage and mode: time grows as rows^slope."""
+    measured = report[report["status"] == "ok"]
+    exponents = []
+    for (stage, mode), group in measured.groupby(["stage", "mode"], sort=False):
+        if group["n_rows"].nunique() < 2:
+            continue
+        slope = np.polyfit(np.log(group["n_rows"]), np.log(group["seconds"]), 1)[0]
+        exponents.append({"stage": stage, "mode": mode, "exponent": slope})
+    return pd.DataFrame(exponents, columns=["stage", "mode", "exponent"])
+
+
+def plot_report(report: pd.DataFrame, output_path: Path):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    measured = report[report["status"] == "ok"]
+    fig, axes = plt.subplots(1, 2, figsize=(12, 5))
+
+    for ax, column, label in (
+        (axes[0], "seconds", "Time (s)"),
+        (axes[1], "peak_rss_mb", "Peak RSS (MB)"),
+    ):
+        for color, stage in zip(plt.cm.tab10.colors, STAGES):
+            for mode, linestyle in zip(MODES, ("-", "--")):
+                rows = measured[(measured["stage"] == stage) & (measured["mode"] == mode)]
+                if not rows.empty:
+                    ax.plot(
+                        rows["n_rows"],
+                        rows[column],
+                        linestyle=linestyle,
+                        marker="o",
+                        color=color,
+                        label=f"{stage} ({mode})",
+                    )
+        ax.set_xscale("log")
+        ax.set_yscale("log")
+        ax.set_xlabel("Rows")
+        ax.set_ylabel(label)
+        ax.grid(True, which="both", alpha=0.3)
+
+    axes[0].legend(fontsize="small")
+    fig.suptitle("Training pipeline scaling")
+    fig.tight_layout()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    fig.savefig(output_path, dpi=120)
+    plt.close(fig)
+
+
+@app.command()
+def main(
+    sizes: list[int] = typer.Option(
+        [614, 2_000, 10_000, 100_000, 1_000_000], help="Dataset sizes, in raw rows."
+    ),
+    stages: list[str] = typer.Option(list(STAGES), help="Stages to time."),
+    modes: list[str] = typer.Option(list(MODES), help="'orchestrated' and/or 'bare'."),
+    max_model_rows: int = typer.Option(
+        10_000, help="Largest size the model stages run at, the exact SVC is quadratic."
+    ),
+    num_trials: int = typer.Option(3, help="Hyperparameter optimization trials."),
+    seed: int = 42,
+):
+    """
+    Times each training pipeline stage on upsampled datasets of increasing size, with and
+    without Prefect and MLflow, and writes a scaling report (CSV and plot).
+    """
+    for stage in stages:
+        if stage not in STAGES:
+            raise typer.BadParameter(f"Unknown stage {stage!r}, expected one of {STAGES}.")
+    for mode in modes:
+        if mode not in MODES:
+            raise typer.BadParameter(f"Unknown mode {mode!r}, expected one of {MODES}.")
+
+    # Inherited by the stage processes: tracking, the run index and hyperopt's seed stay in
+    # the scratch directory and runs are reproducible.
+    os.environ.update(
+        MLFLOW_TRACKING_URI=f"sqlite:///{SCRATCH_DIR / 'mlflow.db'}",
+        MLFLOW_EXPERIMENT_NAME="training_scaling",
+        RUN_INDEX_PATH=str(SCRATCH_DIR / "run_index.sqlite"),
+        HYPEROPT_FMIN_SEED=str(seed),
+    )
+
+    rows = []
+    for n_rows in sorted(sizes):
+        workdir = SCRATCH_DIR / str(n_rows)
+        workdir.mkdir(parents=True, exist_ok=True)
+        paths = dataset_paths(workdir)
+        upsample_raw_data(n_rows, seed=seed).to_csv(paths["raw_data_path"], index=False)
+
+        for stage in stages:
+            for mode in modes:
+                row = {"n_rows": n_rows, "stage": stage, "mode": mode}
+                if stage != "data" and n_rows > max_model_rows:
+                    rows.append({**row, "status": "skipped"})
+                    continue
+                if stage != "data" and not paths["features_path"].exists():
+                    # The model stages train on the output of the data stage.
+                    measure("data", "bare", paths, num_trials)
+
+                try:
+                    result = measure(stage, mode, paths, num_trials)
+                except Exception as e:
+                    logger.error(f"{n_rows} rows, {stage} ({mode}) failed: {e!r}")
+                    rows.append({**row, "status": "failed"})
+                    continue
+
+                rows.append({**row, "status": "ok", **result})
+                logger.info(
+                    f"{n_rows} rows, {stage} ({mode}): {result['seconds']:.2f}s, "
+                    f"peak RSS {result['peak_rss_mb']:.0f} MB "
+                    f"(+{result['rss_growth_mb']:.0f} MB)"
+                )
+
+    report = pd.DataFrame(
+        rows,
+        columns=["n_rows", "stage", "mode", "status", "seconds", "peak_rss_mb", "rss_growth_mb"],
+    )
+    for exponent in scaling_exponents(report).itertuples():
+        logger.info(
+            f"{exponent.stage} ({exponent.mode}): time grows as rows^{exponent.exponent:.2f}"
+        )
+
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    csv_path = BENCHMARKS_REPORTS_DIR / f"training_scaling-{timestamp}.csv"
+    report.to_csv(csv_path, index=False)
+
+    figure_path = FIGURES_DIR / "training_scaling.png"
+    plot_report(report, figure_path)
+    logger.success(f"Scaling report written to {csv_path} and {figure_path}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,139 @@
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+import httpx
+from loguru import logger
+import typer
+
+from benchmarks.common import latency_summary, load_web_service, sample_applications, save_results
+
+app = typer.Typer()
+
+
+def benchmark_per_row(client: TestClient, applications: list[dict]) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    for application in applications:
+        request_start = time.perf_counter()
+        response = client.post("/predict", json=application)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - request_start)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "endpoint": "/predict",
+        "applications": len(applications),
+        "seconds": elapsed,
+        "applications_per_second": len(applications) / elapsed,
+        **latency_summary(latencies),
+    }
+
+
+def benchmark_batch(client: TestClient, applications: list[dict], ndjson: bool) -> dict:
+    if ndjson:
+        content = "\n".join(json.dumps(application) for application in applications)
+        headers = {"content-type": "application/x-ndjson"}
+    else:
+        content = json.dumps(applications)
+        headers = {"content-type": "application/json"}
+
+    start = time.perf_counter()
+    response = client.post("/predict_batch", content=content, headers=headers)
+    response.raise_for_status()
+    n_predictions = sum(1 for line in response.iter_lines() if line)
+    elapsed = time.perf_counter() - start
+
+    assert n_predictions == len(applications), "Batch response is missing predictions"
+
+    return {
+        "endpoint": "/predict_batch",
+        "body": "ndjson" if ndjson else "json",
+        "applications": len(applications),
+        "seconds": elapsed,
+        "applications_per_second": len(applications) / elapsed,
+    }
+
+
+async def _benchmark_concurrent(predict, applications: list[dict], concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=predict.app)
+    queue = list(reversed(applications))
+    latencies = []
+
+    async def client_loop(client: httpx.AsyncClient):
+        while queue:
+            application = queue.pop()
+            request_start = time.perf_counter()
+            response = await client.post("/predict", json=application)
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - request_start)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "endpoint": "/predict",
+        "concurrency": concurrency,
+        "max_batch_size": predict.batcher.max_batch_size,
+        "max_wait_ms": predict.batcher.max_wait_ms,
+        "applications": len(applications),
+        "seconds": elapsed,
+        "applications_per_second": len(applications) / elapsed,
+        **latency_summary(latencies),
+    }
+
+
+def benchmark_concurrent(predict, applications: list[dict], concurrency: int, max_batch_size: int):
+    """Runs `concurrency` in-process clients against /predict with the given batch size."""
+    configured_batch_size = predict.batcher.max_batch_size
+    predict.batcher.max_batch_size = max_batch_size
+    try:
+        return asyncio.run(_benchmark_concurrent(predict, applications, concurrency))
+    finally:
+        predict.batcher.max_batch_size = configured_batch_size
+
+
+@app.command()
+def main(
+    n_applications: int = 20_000,
+    n_per_row_requests: int = 1_000,
+    n_concurrent_requests: int = 5_000,
+    concurrency: int = 64,
+    seed: int = 42,
+):
+    """
+    Compares the throughput of /predict_batch against one /predict call per application,
+    and concurrent /predict load with and without micro-batching.
+    """
+    predict = load_web_service()
+    client = TestClient(predict.app)
+    applications = sample_applications(n_applications, seed=seed)
+
+    results = {
+        "per_row": benchmark_per_row(client, applications[:n_per_row_requests]),
+        "batch_json": benchmark_batch(client, applications, ndjson=False),
+        "batch_ndjson": benchmark_batch(client, applications, ndjson=True),
+        "concurrent_unbatched": benchmark_concurrent(
+            predict, applications[:n_concurrent_requests], concurrency, max_batch_size=1
+        ),
+        "concurrent_micro_batched": benchmark_concurrent(
+            predict,
+            applications[:n_concurrent_requests],
+            concurrency,
+            max_batch_size=predict.batcher.max_batch_size,
+        ),
+    }
+
+    for name, result in results.items():
+        p99 = f", p99 {result['p99_ms']:.1f} ms" if "p99_ms" in result else ""
+        logger.info(f"{name}: {result['applications_per_second']:.0f} applications/s{p99}")
+
+    output_path = save_results(results, "web_service")
+    logger.success(f"Results written to {output_path}")
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,92 @@
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row requests into one scoring call.
+
+    Requests are queued until `max_batch_size` rows are waiting or `max_wait_ms` have
+    passed since the first one arrived. The batch is scored in `executor` with a single
+    `score_batch(items)` call and each request's future is resolved with its own result.
+    If a batch fails, its rows are rescored one by one so a single bad row only fails
+    its own request.
+    """
+
+    def __init__(self, score_batch, max_batch_size=64, max_wait_ms=2.0, executor=None):
+        self.score_batch = score_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.executor = executor
+        self._loop = None
+        self._queue = None
+        self._worker = None
+
+    async def submit(self, item):
+        """Queues `item` for the next batch and waits for its result."""
+        loop = asyncio.get_running_loop()
+
+        # The worker is bound to the loop it was started on, uvicorn workers and test
+        # clients each run their own.
+        if self._loop is not loop or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait_ms / 1000
+
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+            await self._score(loop, batch)
+
+    async def _score(self, loop, batch):
+        items = [item for item, _ in batch]
+
+        try:
+            results = await loop.run_in_executor(self.executor, self.score_batch, items)
+        except Exception as e:
+            if len(batch) == 1:
+                self._resolve(batch[0][1], exception=e)
+                return
+
+            for item, future in batch:
+                try:
+                    [result] = await loop.run_in_executor(self.executor, self.score_batch, [item])
+                except Exception as item_error:
+                    self._resolve(future, exception=item_error)
+                else:
+                    self._resolve(future, result=result)
+            return
+
+        for (_, future), result in zip(batch, results, strict=True):
+            self._resolve(future, result=result)
+
+    @staticmethod
+    def _resolve(future, result=None, exception=None):
+        # The request may have been cancelled (e.g. client disconnected) while queued.
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
@@ -0,0 +1,169 @@
+import copy
+import os
+from pathlib import Path
+import warnings
+
+from compiled_preprocessor import CompiledPreprocessor
+from surrogate import check_flavor
+
+BUNDLE_FORMAT_VERSION = 1
+
+
+class ServingBundle:
+    """Preprocessor, model and model version loaded from a serving bundle."""
+
+    def __init__(self, model, preprocessor, model_version):
+        self.model = model
+        self.preprocessor = preprocessor
+        self.model_version = model_version
+
+
+def build_bundle(model, preprocessor, model_version, output_path, cleaner=None, surrogate=None):
+    """
+    Writes a self-contained serving bundle.
+
+    The bundle is an uncompressed joblib file, so the model's numpy arrays (support
+    vectors, dual coefficients, ...) are memory-mapped on load instead of copied. The
+    preprocessor is stored in its compiled form and the model's feature names are checked
+    against it, then dropped so scoring can work on plain arrays without pandas. The fill
+    values of `cleaner`, if given, are compiled into the preprocessor. A `surrogate` of the
+    model (see surrogate.py) is stored next to it, to be served instead with
+    `flavor="surrogate"`.
+    """
+    import joblib
+    import sklearn
+
+    if not isinstance(preprocessor, CompiledPreprocessor):
+        preprocessor = CompiledPreprocessor.from_column_transformer(preprocessor, cleaner)
+
+    model_feature_names = getattr(model, "feature_names_in_", None)
+    if model_feature_names is not None:
+        if list(model_feature_names) != preprocessor.feature_names:
+            raise ValueError("Model features do not match the preprocessor output.")
+        model = _without_feature_names(model)
+
+    joblib.dump(
+        {
+            "format_version": BUNDLE_FORMAT_VERSION,
+            "model_version": model_version,
+            "sklearn_version": sklearn.__version__,
+            "preprocessor": preprocessor.to_dict(),
+            "model": model,
+            "surrogate": surrogate,
+        },
+        output_path,
+    )
+
+
+def _without_feature_names(model):
+    """Copy of `model` that no longer records the feature names it was fitted on."""
+    from sklearn.pipeline import Pipeline
+
+    model = copy.copy(model)
+    if isinstance(model, Pipeline):
+        # A pipeline reads its feature names from its first step.
+        (name, first_step), *steps = model.steps
+        model.steps = [(name, _without_feature_names(first_step)), *steps]
+    else:
+        del model.feature_names_in_
+    return model
+
+
+def load_bundle(path, mmap_mode="r", flavor="model"):
+    """
+    Loads a serving bundle from a local path or an s3:// URI.
+
+    `flavor="surrogate"` serves the model's surrogate, its version gets a `-surrogate`
+    suffix so cached predictions of the two are kept apart. A bundle built with another
+    scikit-learn version is loaded with a warning, its models may not score the same.
+    """
+    import joblib
+    import sklearn
+
+    check_flavor(flavor)
+
+    if str(path).startswith("s3://"):
+        path = _download_from_s3(str(path))
+
+    bundle = joblib.load(path, mmap_mode=mmap_mode)
+
+    if bundle.get("format_version") != BUNDLE_FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported serving bundle version {bundle.get('format_version')}, "
+            f"expected {BUNDLE_FORMAT_VERSION}."
+        )
+
+    if bundle.get("sklearn_version") != sklearn.__version__:
+        warnings.warn(
+            f"The serving bundle was built with scikit-learn {bundle.get('sklearn_version')}, "
+            f"loading it with {sklearn.__version__}.",
+            stacklevel=2,
+        )
+
+    model, model_version = bundle["model"], bundle["model_version"]
+    if flavor == "surrogate":
+        if bundle.get("surrogate") is None:
+            raise ValueError("The serving bundle has no surrogate model.")
+        model, model_version = bundle["surrogate"], f"{model_version}-surrogate"
+
+    return ServingBundle(
+        model=model,
+        preprocessor=CompiledPreprocessor.from_dict(bundle["preprocessor"]),
+        model_version=model_version,
+    )
+
+
+def _download_from_s3(uri):
+    """
+    Downloads the object to /tmp once per ETag, so a bundle replaced under the same key is
+    never served from a stale local copy.
+    """
+    import boto3
+
+    bucket, key = uri.removeprefix("s3://").split("/", 1)
+    s3 = boto3.client("s3")
+    etag = s3.head_object(Bucket=bucket, Key=key)["ETag"].strip('"')
+    stem, suffix = os.path.splitext(os.path.basename(key))
+    local_path = os.path.join("/tmp", f"{stem}-{etag}{suffix}")
+
+    if not os.path.exists(local_path):
+        # Downloaded next to its final path first, so a failed download is not reused.
+        s3.download_file(bucket, key, f"{local_path}.part")
+        os.replace(f"{local_path}.part", local_path)
+
+    return local_path
+
+
+def main(
+    model_path: Path = Path("models/model.pkl"),
+    preprocessor_path: Path = Path("models/preprocessor.pkl"),
+    cleaner_path: Path = Path("models/cleaner.pkl"),
+    surrogate_path: Path = Path("models/surrogate.pkl"),
+    output_path: Path = Path("models/serving_bundle.joblib"),
+    model_version: str = "local",
+):
+    """
+    Builds the serving bundle from the trained model, the fitted preprocessor and cleaner,
+    and the model's surrogate when there is one.
+    """
+    import joblib
+
+    with open(model_path, "rb") as f:
+        model = joblib.load(f)
+
+    with open(preprocessor_path, "rb") as f:
+        preprocessor = joblib.load(f)
+
+    cleaner = joblib.load(cleaner_path) if cleaner_path.exists() else None
+    surrogate = joblib.load(surrogate_path) if surrogate_path.exists() else None
+
+    build_bundle(
+        model, preprocessor, model_version, output_path, cleaner=cleaner, surrogate=surrogate
+    )
+    print(f"Serving bundle saved to {output_path}")
+
+
+if __name__ == "__main__":
+    import typer
+
+    typer.run(main)
@@ -0,0 +1,205 @@
+import json
+from pathlib import Path
+
+import numpy as np
+
+FORMAT_VERSION = 2
+
+# Version 1 files have no imputation fill values.
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+
+
+class CompiledPreprocessor:
+    """
+    Pandas-free replacement for the fitted `ColumnTransformer` built in `lap/dataset.py`.
+
+    The fitted encoders and scalers are reduced to category lookup tables (ordinal and
+    one-hot) and an affine map (StandardScaler mean and scale), so records can go from
+    dicts straight to a feature matrix. The output matches `preprocessor.transform`
+    bit for bit.
+
+    `fill_values` are the imputation values of the fitted cleaner. Missing or None fields
+    of those columns are mapped to them inside the same lookups, so imputation adds no
+    work per record.
+    """
+
+    def __init__(self, feature_names, ordinal, one_hot, numerical, fill_values=None):
+        self.feature_names = list(feature_names)
+        self.ordinal = ordinal
+        self.one_hot = one_hot
+        self.numerical = numerical
+        self.fill_values = dict(fill_values or {})
+
+        self._ordinal_lookups = [
+            (column, index, self._lookup(column, categories))
+            for column, index, categories in ordinal
+        ]
+        self._one_hot_lookups = [
+            (column, offset, self._lookup(column, categories))
+            for column, offset, categories in one_hot
+        ]
+        self._numerical_columns = [column for column, _, _, _ in numerical]
+        self._numerical_index = np.array([index for _, index, _, _ in numerical], dtype=np.intp)
+        self._mean = np.array([mean for _, _, mean, _ in numerical], dtype=np.float64)
+        self._scale = np.array([scale for _, _, _, scale in numerical], dtype=np.float64)
+        self._numerical_fill = np.array(
+            [self.fill_values.get(column, np.nan) for column in self._numerical_columns],
+            dtype=np.float64,
+        )
+        self._has_numerical_fill = bool(np.any(~np.isnan(self._numerical_fill)))
+
+    def _lookup(self, column, categories):
+        lookup = {category: code for code, category in enumerate(categories)}
+
+        if column in self.fill_values:
+            fill_value = self.fill_values[column]
+            if fill_value not in lookup:
+                raise ValueError(
+                    f"Fill value {fill_value!r} of column {column} is not a category."
+                )
+            lookup[None] = lookup[fill_value]
+
+        return lookup
+
+    @classmethod
+    def from_column_transformer(cls, preprocessor, cleaner=None):
+        """Compiles a fitted ColumnTransformer of OrdinalEncoder, OneHotEncoder and
+        StandardScaler pipelines, with the fill values of a fitted cleaner if given."""
+        ordinal = []
+        one_hot = []
+        numerical = []
+        offset = 0
+
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == "remainder":
+                continue
+
+            steps = getattr(transformer, "steps", [(name, transformer)])
+            if len(steps) != 1:
+                raise ValueError(f"Transformer '{name}' must have exactly one step to compile.")
+            step = steps[0][1]
+            kind = type(step).__name__
+
+            if kind == "OrdinalEncoder":
+                for column, categories in zip(columns, step.categories_, strict=True):
+                    ordinal.append((column, offset, categories.tolist()))
+                    offset += 1
+            elif kind == "OneHotEncoder":
+                for column, categories in zip(columns, step.categories_, strict=True):
+                    one_hot.append((column, offset, categories.tolist()))
+                    offset += len(categories)
+            elif kind == "StandardScaler":
+                for i, column in enumerate(columns):
+                    mean = float(step.mean_[i]) if step.with_mean else 0.0
+                    scale = float(step.scale_[i]) if step.with_std else 1.0
+                    numerical.append((column, offset, mean, scale))
+                    offset += 1
+            else:
+                raise ValueError(f"Cannot compile transformer '{name}' of type {kind}.")
+
+        feature_names = preprocessor.get_feature_names_out().tolist()
+        if len(feature_names) != offset:
+            raise ValueError("Compiled layout does not match the preprocessor output.")
+
+        return cls(feature_names, ordinal, one_hot, numerical, cls._fill_values(cleaner))
+
+    @staticmethod
+    def _fill_values(cleaner):
+        """Column fill values of a fitted ColumnTransformer of SimpleImputers."""
+        if cleaner is None:
+            return {}
+
+        fill_values = {}
+        for _, imputer, columns in cleaner.transformers_:
+            statistics = getattr(imputer, "statistics_", None)
+            if statistics is not None:
+                fill_values.update(zip(columns, statistics.tolist(), strict=True))
+        return fill_values
+
+    def transform(self, records, dtype=np.float32):
+        """Transforms a list of input dicts into a `(len(records), n_features)` matrix."""
+        n_rows = len(records)
+        features = np.zeros((n_rows, len(self.feature_names)), dtype=np.float64)
+
+        for column, index, lookup in self._ordinal_lookups:
+            features[:, index] = self._encode(records, column, lookup)
+
+        rows = np.arange(n_rows)
+        for column, offset, lookup in self._one_hot_lookups:
+            features[rows, offset + self._encode(records, column, lookup)] = 1.0
+
+        if self._numerical_columns:
+            # Missing fields become NaN here and are replaced by their fill value.
+            values = np.array(
+                [[record.get(column) for column in self._numerical_columns] for record in records],
+                dtype=np.float64,
+            ).reshape(n_rows, len(self._numerical_columns))
+            if self._has_numerical_fill:
+                values = np.where(np.isnan(values), self._numerical_fill, values)
+            features[:, self._numerical_index] = (values - self._mean) / self._scale
+
+        return features.astype(dtype, copy=False)
+
+    @staticmethod
+    def _encode(records, column, lookup):
+        try:
+            return np.array([lookup[record.get(column)] for record in records], dtype=np.intp)
+        except KeyError as e:
+            raise ValueError(f"Found unknown category {e.args[0]!r} in column {column}") from e
+
+    def to_dict(self):
+        return {
+            "format_version": FORMAT_VERSION,
+            "feature_names": self.feature_names,
+            "ordinal": self.ordinal,
+            "one_hot": self.one_hot,
+            "numerical": self.numerical,
+            "fill_values": self.fill_values,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format_version") not in SUPPORTED_FORMAT_VERSIONS:
+            raise ValueError(
+                f"Unsupported compiled preprocessor version {data.get('format_version')}, "
+                f"expected one of {SUPPORTED_FORMAT_VERSIONS}."
+            )
+        return cls(
+            data["feature_names"],
+            data["ordinal"],
+            data["one_hot"],
+            data["numerical"],
+            data.get("fill_values"),
+        )
+
+    def save(self, path):
+        with open(path, "wt") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rt") as f:
+            return cls.from_dict(json.load(f))
+
+
+def main(
+    preprocessor_path: Path = Path("models/preprocessor.pkl"),
+    cleaner_path: Path = Path("models/cleaner.pkl"),
+    output_path: Path = Path("models/preprocessor.json"),
+):
+    """Exports the fitted preprocessor and cleaner as a compiled lookup-table preprocessor."""
+    import joblib
+
+    with open(preprocessor_path, "rb") as f:
+        preprocessor = joblib.load(f)
+
+    cleaner = joblib.load(cleaner_path) if cleaner_path.exists() else None
+
+    CompiledPreprocessor.from_column_transformer(preprocessor, cleaner).save(output_path)
+    print(f"Compiled preprocessor saved to {output_path}")
+
+
+if __name__ == "__main__":
+    import typer
+
+    typer.run(main)
@@ -5,9 +5,13 @@ import model
 PREDICTIONS_STREAM_NAME = os.getenv("PREDICTIONS_STREAM_NAME")
 MODEL_ID = os.getenv("MODEL_ID")
 TEST_RUN = os.getenv("TEST_RUN", "False") == "True"
+APPROVAL_THRESHOLD = float(os.getenv("APPROVAL_THRESHOLD", "0.5"))
 
 model_service = model.init(
-    prediction_stream_name=PREDICTIONS_STREAM_NAME, model_id=MODEL_ID, test_run=TEST_RUN
+    prediction_stream_name=PREDICTIONS_STREAM_NAME,
+    model_id=MODEL_ID,
+    test_run=TEST_RUN,
+    threshold=APPROVAL_THRESHOLD,
 )
 
 
@@ -0,0 +1,239 @@
+from bisect import bisect_left
+import json
+import os
+from pathlib import Path
+import threading
+import time
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+)
+
+COUNTERS = ("records", "batches", "errors", "cache_hits", "cache_misses")
+
+METRIC_PREFIX = "loan_prediction"
+EMF_NAMESPACE = "LoanPrediction"
+
+
+class StageTimer:
+    """Times a `with` block into the `stage` histogram, counting an error if it raises."""
+
+    __slots__ = ("metrics", "stage", "record", "start")
+
+    def __init__(self, metrics, stage, record=None):
+        self.metrics = metrics
+        self.stage = stage
+        self.record = record
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        seconds = time.perf_counter() - self.start
+        self.metrics.observe(self.stage, seconds)
+        if self.record is not None:
+            self.record[self.stage] = self.record.get(self.stage, 0.0) + seconds
+        if exc_type is not None:
+            self.metrics.count("errors")
+
+
+class ServingMetrics:
+    """
+    Per-stage latency histograms and record, batch, error and cache counters of one
+    model version, kept in-process without any metrics client.
+
+    The web service exposes them in the Prometheus text format (`render`). The Lambda
+    handler emits each invocation as a CloudWatch Embedded Metric Format log line
+    (`emf_line`), which CloudWatch turns into metrics without an agent.
+    """
+
+    def __init__(self, model_version, buckets=DEFAULT_BUCKETS):
+        self.model_version = str(model_version)
+        self.buckets = tuple(buckets)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # stage -> [bucket counts (+Inf last), sum of seconds]
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def time(self, stage, record=None):
+        """Context manager timing `stage`, also adding its seconds to `record` if given."""
+        return StageTimer(self, stage, record)
+
+    def observe(self, stage, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = [[0] * (len(self.buckets) + 1), 0.0]
+            histogram[0][index] += 1
+            histogram[1] += seconds
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def snapshot(self):
+        """JSON-serializable copy of the counters and histograms."""
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {
+                    stage: [list(counts), total]
+                    for stage, (counts, total) in self.histograms.items()
+                },
+            }
+
+    def render(self, snapshots=None):
+        """
+        Prometheus text exposition of the counters and histograms.
+
+        Renders the sum of `snapshots` instead when given, e.g. those of every worker
+        process of the server (see SharedMetrics).
+        """
+        label = f'model_version="{_escape(self.model_version)}"'
+        lines = []
+
+        counters, histograms = merge_snapshots(
+            [self.snapshot()] if snapshots is None else snapshots
+        )
+
+        for name, value in counters.items():
+            lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+            lines.append(f"{METRIC_PREFIX}_{name}_total{{{label}}} {value}")
+
+        name = f"{METRIC_PREFIX}_stage_seconds"
+        lines.append(f"# TYPE {name} histogram")
+        for stage, (counts, total) in histograms.items():
+            labels = f'{label},stage="{_escape(stage)}"'
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {total}")
+            lines.append(f"{name}_count{{{labels}}} {cumulative}")
+
+        return "\n".join(lines) + "\n"
+
+    def emf_line(self, stage_seconds, counts):
+        """
+        One invocation's stage timings and counts as a CloudWatch Embedded Metric Format
+        JSON line, with the model version as the dimension.
+        """
+        values = {f"{stage}_ms": seconds * 1000 for stage, seconds in stage_seconds.items()}
+        values |= counts
+        units = {name: "Milliseconds" if name.endswith("_ms") else "Count" for name in values}
+
+        return json.dumps(
+            {
+                "_aws": {
+                    "Timestamp": int(time.time() * 1000),
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": EMF_NAMESPACE,
+                            "Dimensions": [["model_version"]],
+                            "Metrics": [
+                                {"Name": name, "Unit": unit} for name, unit in units.items()
+                            ],
+                        }
+                    ],
+                },
+                "model_version": self.model_version,
+                **values,
+            }
+        )
+
+
+def merge_snapshots(snapshots):
+    """Sums the counters and histograms of `snapshots` taken with the same buckets."""
+    counters = dict.fromkeys(COUNTERS, 0)
+    histograms = {}
+
+    for snapshot in snapshots:
+        for name, value in snapshot["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+        for stage, (counts, total) in snapshot["histograms"].items():
+            merged = histograms.setdefault(stage, [[0] * len(counts), 0.0])
+            merged[0] = [a + b for a, b in zip(merged[0], counts, strict=True)]
+            merged[1] += total
+
+    return counters, histograms
+
+
+class SharedMetrics:
+    """
+    Shares the ServingMetrics of each worker process of a server through `directory`.
+
+    Every worker publishes a snapshot of its metrics to `<directory>/<pid>.json` every
+    `interval` seconds from a daemon thread, and before rendering. `render` sums the
+    snapshots of all the workers, so a scrape gets the totals of the whole server whichever
+    worker serves it. Snapshots of exited workers are kept, so the totals never decrease;
+    the directory is cleared when the server starts.
+    """
+
+    def __init__(self, metrics, directory, interval=1.0, name=None):
+        self.metrics = metrics
+        self.directory = Path(directory)
+        self.interval = interval
+        # Defaults to the pid of the publishing process, known only after the fork.
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Starts publishing, to be called in the worker process."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-publisher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops publishing, after a last snapshot."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.publish()
+
+    def publish(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = self.name or str(os.getpid())
+        # Written aside then renamed, so readers never see a partial snapshot.
+        tmp_path = self.directory / f"{name}.tmp"
+        tmp_path.write_text(json.dumps(self.metrics.snapshot()))
+        os.replace(tmp_path, self.directory / f"{name}.json")
+
+    def collect(self):
+        """Snapshots of every worker, this one's freshly published."""
+        self.publish()
+        snapshots = []
+        for path in self.directory.glob("*.json"):
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self):
+        return self.metrics.render(self.collect())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.publish()
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
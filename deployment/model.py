@@ -1,11 +1,17 @@
 import base64
 import json
 import os
+import time
 
-import boto3
-import joblib
-import mlflow
-import pandas as pd
+from bundle import load_bundle
+from compiled_preprocessor import CompiledPreprocessor
+from metrics import ServingMetrics
+import prediction_cache
+import scoring
+from surrogate import check_flavor
+
+# boto3, joblib, mlflow and pandas are imported where they are used: the bundle serving
+# path needs none of them, which keeps Lambda cold starts short.
 
 
 def get_model_location(model_id):
@@ -23,7 +29,10 @@ def get_model_location(model_id):
 
 def load_model(model_id):
     model_location = get_model_location(model_id)
-    model = mlflow.pyfunc.load_model(model_location)
+    import mlflow.sklearn
+
+    # The raw sklearn estimator exposes decision_function for calibrated scoring.
+    model = mlflow.sklearn.load_model(model_location)
     return model
 
 
@@ -34,19 +43,55 @@ def base64_decode(encoded_data):
 
 
 class ModelService:
-    def __init__(self, model, preprocessor=None, model_version=None, callbacks=None):
+    def __init__(
+        self,
+        model,
+        preprocessor=None,
+        model_version=None,
+        callbacks=None,
+        threshold=scoring.DEFAULT_THRESHOLD,
+        cache=None,
+        metrics_sink=None,
+    ):
         self.model = model
         self.preprocessor = preprocessor or self._load_default_preprocessor()
         self.model_version = model_version
         self.callbacks = callbacks or []
+        self.threshold = threshold
+        self.cache = cache
+        self.metrics = ServingMetrics(model_version)
+        # Called with each invocation's metrics as an EMF log line, e.g. `print` on Lambda.
+        self.metrics_sink = metrics_sink
 
     def _load_default_preprocessor(self):
         """Load preprocessor from default location (used in production)"""
+        if os.path.exists("./preprocessor.json"):
+            return CompiledPreprocessor.load("./preprocessor.json")
+
+        import joblib
+
         with open("./preprocessor.pkl", "rb") as f:
-            return joblib.load(f)
+            preprocessor = joblib.load(f)
+
+        cleaner = joblib.load("./cleaner.pkl") if os.path.exists("./cleaner.pkl") else None
+        return CompiledPreprocessor.from_column_transformer(preprocessor, cleaner)
 
     def prepare_features(self, input_record):
-        features: pd.DataFrame = pd.DataFrame([input_record])
+        return self.prepare_batch_features([input_record])
+
+    def prepare_batch_features(self, input_records):
+        if isinstance(self.preprocessor, CompiledPreprocessor):
+            features = self.preprocessor.transform(input_records)
+            if getattr(self.model, "feature_names_in_", None) is None:
+                return features
+
+            import pandas as pd
+
+            return pd.DataFrame(features, columns=self.preprocessor.feature_names)
+
+        import pandas as pd
+
+        features: pd.DataFrame = pd.DataFrame(input_records)
         features = self.preprocessor.transform(features)
         return features
 
@@ -54,32 +99,107 @@ class ModelService:
         prediction = self.model.predict(features)
         return prediction
 
-    def lambda_handler(self, event):
-        predictions_events = []
+    def score(self, features):
+        """Returns approval decisions and probabilities from one model evaluation."""
+        return scoring.score(self.model, features, threshold=self.threshold)
+
+    def score_records(self, input_records, stage_seconds=None):
+        """
+        Scores input records, reusing cached predictions when a cache is configured.
+
+        The transform and predict times are added to `stage_seconds` if given.
+        """
+        self.metrics.count("records", len(input_records))
+        return prediction_cache.score_with_cache(
+            self.cache,
+            input_records,
+            self.model_version,
+            lambda records: self._score_records(records, stage_seconds),
+            metrics=self.metrics,
+        )
 
-        for record in event["Records"]:
-            encoded_data = record["kinesis"]["data"]
-            input_record: dict = base64_decode(encoded_data)
+    def _score_records(self, input_records, stage_seconds=None):
+        self.metrics.count("batches")
+        with self.metrics.time("transform", stage_seconds):
+            features = self.prepare_batch_features(input_records)
+        with self.metrics.time("predict", stage_seconds):
+            approved, probability = self.score(features)
 
-            request: dict = input_record["input"]
-            request_id = input_record.get("request_id", "unknown")
+        results = [{"approved": bool(approve)} for approve in approved]
+        if probability is not None:
+            for result, p in zip(results, probability.tolist(), strict=True):
+                result["probability"] = p
 
-            features = self.prepare_features(request)
-            prediction = self.predict(features)
+        return results
 
-            prediction_event = {
-                "model": "loan_approval_prediction_model",
-                "model_version": self.model_version,
-                "prediction": {"approved": bool(prediction[0]), "request_id": request_id},
-            }
+    def lambda_handler(self, event):
+        """
+        Scores every record of a Kinesis event with a single transform and predict.
+
+        The invocation's stage timings and counter deltas are emitted to `metrics_sink`
+        whether it succeeds or fails.
+        """
+        stage_seconds = {}
+        counters = dict(self.metrics.counters)
+
+        try:
+            return self._handle_event(event, stage_seconds)
+        except Exception:
+            # Failures outside of a timed stage are not counted yet.
+            if self.metrics.counters["errors"] == counters["errors"]:
+                self.metrics.count("errors")
+            raise
+        finally:
+            if self.metrics_sink is not None:
+                counts = {
+                    name: value - counters[name] for name, value in self.metrics.counters.items()
+                }
+                self.metrics_sink(self.metrics.emf_line(stage_seconds, counts))
+
+    def _handle_event(self, event, stage_seconds):
+        requests = []
+        request_ids = []
+
+        with self.metrics.time("decode", stage_seconds):
+            for record in event["Records"]:
+                encoded_data = record["kinesis"]["data"]
+                input_record: dict = base64_decode(encoded_data)
+
+                requests.append(input_record["input"])
+                request_ids.append(input_record.get("request_id", "unknown"))
+
+        if not requests:
+            return {"predictions": []}
+
+        results = self.score_records(requests, stage_seconds)
+
+        predictions_events = []
+
+        with self.metrics.time("callbacks", stage_seconds):
+            for request_id, result in zip(request_ids, results, strict=True):
+                prediction_event = {
+                    "model": "loan_approval_prediction_model",
+                    "model_version": self.model_version,
+                    "prediction": {**result, "request_id": request_id},
+                }
 
-            for callback in self.callbacks:
-                callback(prediction_event)
+                for callback in self.callbacks:
+                    callback(prediction_event)
 
-            predictions_events.append(prediction_event)
+                predictions_events.append(prediction_event)
+
+            self.flush_callbacks()
 
         return {"predictions": predictions_events}
 
+    def flush_callbacks(self):
+        """Flushes callbacks that buffer prediction events, e.g. BufferedKinesisCallback."""
+        for callback in self.callbacks:
+            owner = getattr(callback, "__self__", callback)
+            flush = getattr(owner, "flush", None)
+            if flush is not None:
+                flush()
+
 
 class KinesisCallback:
     def __init__(self, kinesis_client, prediction_stream_name):
@@ -96,7 +216,103 @@ class KinesisCallback:
         )
 
 
+class BufferedKinesisCallback(KinesisCallback):
+    """
+    Buffers prediction events and writes them with PutRecords on `flush`.
+
+    Requests are split to respect the PutRecords limits and only the entries that
+    failed (e.g. throttled with ProvisionedThroughputExceededException) are retried.
+    """
+
+    MAX_RECORDS_PER_REQUEST = 500
+    MAX_BYTES_PER_REQUEST = 5 * 1024 * 1024
+
+    def __init__(self, kinesis_client, prediction_stream_name, max_retries=5, backoff=0.1):
+        super().__init__(kinesis_client, prediction_stream_name)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.buffer = []
+
+    def put_record(self, prediction_event):
+        request_id = prediction_event["prediction"]["request_id"]
+
+        self.buffer.append(
+            {
+                "Data": json.dumps(prediction_event).encode("utf-8"),
+                "PartitionKey": str(request_id),
+            }
+        )
+
+    def flush(self):
+        """
+        Writes the buffered events with PutRecords.
+
+        Events only leave the buffer once Kinesis acknowledged them. If a request raises,
+        or entries still fail after `max_retries`, the unacknowledged events are put back
+        in the buffer for the next flush before the error propagates.
+        """
+        requests = list(self._split_requests(self.buffer))
+        self.buffer = []
+
+        for index, pending in enumerate(requests):
+            try:
+                self._put_records(pending)
+            except Exception:
+                self.buffer = [entry for entries in requests[index:] for entry in entries]
+                raise
+
+    def _split_requests(self, entries):
+        request_entries = []
+        request_size = 0
+
+        for entry in entries:
+            entry_size = len(entry["Data"]) + len(entry["PartitionKey"].encode("utf-8"))
+
+            if request_entries and (
+                len(request_entries) == self.MAX_RECORDS_PER_REQUEST
+                or request_size + entry_size > self.MAX_BYTES_PER_REQUEST
+            ):
+                yield request_entries
+                request_entries = []
+                request_size = 0
+
+            request_entries.append(entry)
+            request_size += entry_size
+
+        if request_entries:
+            yield request_entries
+
+    def _put_records(self, entries):
+        """Writes `entries`, removing each one from the list once it is acknowledged."""
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+
+            response = self.kinesis_client.put_records(
+                StreamName=self.prediction_stream_name,
+                Records=entries,
+            )
+
+            if response.get("FailedRecordCount", 0) == 0:
+                entries.clear()
+                return
+
+            # Results are positional, failed entries carry an ErrorCode.
+            entries[:] = [
+                entry
+                for entry, result in zip(entries, response["Records"], strict=True)
+                if "ErrorCode" in result
+            ]
+
+        raise RuntimeError(
+            f"{len(entries)} prediction events could not be written to "
+            f"{self.prediction_stream_name} after {self.max_retries} retries"
+        )
+
+
 def create_kinesis_client():
+    import boto3
+
     endpoint_url = os.getenv("KINESIS_ENDPOINT_URL")
 
     if endpoint_url is None:
@@ -105,18 +321,47 @@ def create_kinesis_client():
     return boto3.client("kinesis", endpoint_url=endpoint_url)
 
 
-def init(prediction_stream_name: str, model_id: str, test_run: bool):
-    model = load_model(model_id)
+def init(
+    prediction_stream_name: str,
+    model_id: str,
+    test_run: bool,
+    threshold: float = scoring.DEFAULT_THRESHOLD,
+):
+    bundle_path = os.getenv("MODEL_BUNDLE_PATH")
+    # "surrogate" serves the cheaper surrogate stored in the bundle with the model.
+    flavor = os.getenv("SERVING_FLAVOR", "model")
+    check_flavor(flavor)
+
+    if bundle_path is not None:
+        bundle = load_bundle(bundle_path, flavor=flavor)
+        model = bundle.model
+        preprocessor = bundle.preprocessor
+        model_id = model_id or bundle.model_version
+    elif flavor == "surrogate":
+        raise ValueError(
+            "The surrogate is only served from a serving bundle, set MODEL_BUNDLE_PATH."
+        )
+    else:
+        model = load_model(model_id)
+        preprocessor = None
 
     callbacks = []
 
     if not test_run:
         kinesis_client = create_kinesis_client()
-        kinesis_callback = KinesisCallback(kinesis_client, prediction_stream_name)
+        kinesis_callback = BufferedKinesisCallback(kinesis_client, prediction_stream_name)
         callbacks.append(kinesis_callback.put_record)
     else:
         print("Running in test mode, no Kinesis callback will be used.")
 
-    model_service = ModelService(model=model, model_version=model_id, callbacks=callbacks)
+    model_service = ModelService(
+        model=model,
+        preprocessor=preprocessor,
+        model_version=model_id,
+        callbacks=callbacks,
+        threshold=threshold,
+        cache=prediction_cache.cache_from_env(os.environ),
+        metrics_sink=print,
+    )
 
     return model_service
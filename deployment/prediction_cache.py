@@ -0,0 +1,130 @@
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+
+
+def record_key(record, model_version):
+    """
+    Canonical hash of a feature record and the model version.
+
+    Keys are sorted and numbers are normalized to floats, so resubmissions that only
+    differ in field order or int/float formatting (5000 vs 5000.0) share a cache entry.
+    """
+    canonical = {
+        key: float(value) if isinstance(value, int | float) else value
+        for key, value in record.items()
+    }
+    payload = json.dumps(
+        [str(model_version), canonical], sort_keys=True, separators=(",", ":"), default=str
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class PredictionCache:
+    """
+    Thread-safe in-process LRU cache of predictions with optional TTL expiry.
+
+    A single instance lives for the whole Lambda container or uvicorn worker process, so
+    entries are shared across Kinesis records and HTTP requests.
+    """
+
+    def __init__(self, maxsize=10_000, ttl_seconds=None, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = None if self.ttl_seconds is None else self.clock() + self.ttl_seconds
+
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+def score_with_cache(cache, records, model_version, score_records, metrics=None):
+    """
+    Scores `records` through `cache`.
+
+    Cached results are reused and the misses are scored together with one
+    `score_records(missing_records)` call. Results keep the order of `records`. Hits and
+    misses are counted in `metrics` (see metrics.py) if given.
+    """
+    if cache is None:
+        return score_records(records)
+
+    keys = [record_key(record, model_version) for record in records]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+
+    if metrics is not None:
+        metrics.count("cache_hits", len(records) - len(missing))
+        metrics.count("cache_misses", len(missing))
+
+    if missing:
+        scored = score_records([records[i] for i in missing])
+        for i, result in zip(missing, scored, strict=True):
+            results[i] = result
+            cache.put(keys[i], result)
+
+    return results
+
+
+def cache_from_env(environ):
+    """Builds a cache from PREDICTION_CACHE_SIZE/PREDICTION_CACHE_TTL, None when disabled."""
+    maxsize = int(environ.get("PREDICTION_CACHE_SIZE", "0"))
+    if maxsize <= 0:
+        return None
+
+    ttl_seconds = environ.get("PREDICTION_CACHE_TTL")
+    return PredictionCache(
+        maxsize=maxsize, ttl_seconds=float(ttl_seconds) if ttl_seconds else None
+    )
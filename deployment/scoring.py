@@ -0,0 +1,45 @@
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.5
+
+
+def _sigmoid(x):
+    # tanh form avoids overflow warnings from exp for large |x|.
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def approval_probability(model, features):
+    """
+    Returns the calibrated probability of approval for every row, or None if the model
+    does not provide one.
+
+    For an `SVC(probability=True)` the Platt sigmoid fitted during training (`probA_`,
+    `probB_`) is applied to a single `decision_function` evaluation. This is the exact
+    Platt probability; sklearn's `predict_proba` approximates it with libsvm's pairwise
+    coupling and can disagree with `predict` near the boundary.
+    """
+    prob_a = getattr(model, "probA_", None)
+
+    if prob_a is not None and len(prob_a) == 1 and hasattr(model, "decision_function"):
+        decision = np.asarray(model.decision_function(features), dtype=np.float64)
+        return _sigmoid(model.probB_[0] - prob_a[0] * decision)
+
+    if hasattr(model, "predict_proba"):
+        return np.asarray(model.predict_proba(features))[:, -1]
+
+    return None
+
+
+def score(model, features, threshold=DEFAULT_THRESHOLD):
+    """
+    Scores a batch with one model evaluation.
+
+    Returns the approval decisions and the approval probabilities. When the model has no
+    probability output the decisions come from `predict` and the probabilities are None.
+    """
+    probability = approval_probability(model, features)
+
+    if probability is None:
+        return np.asarray(model.predict(features)).astype(bool), None
+
+    return probability >= threshold, probability
@@ -0,0 +1,218 @@
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import time
+
+import numpy as np
+
+# Serving flavors: the trained model itself, or its distilled surrogate.
+SERVING_FLAVORS = ("model", "surrogate")
+
+
+class SurrogateModel:
+    """
+    Cheaper stand-in for a binary SVC, served in its place.
+
+    The decision function is either linear (`coef`, `intercept`), the exact compaction of
+    a linear-kernel SVC's support vectors, or a `regressor` distilled from the SVC's
+    decision values. It exposes the `decision_function`/`predict` interface and the Platt
+    coefficients (`probA_`, `probB_`) of the SVC, so `scoring.score` computes
+    probabilities from its decision values exactly as it does for the SVC.
+    """
+
+    def __init__(
+        self, classes, regressor=None, coef=None, intercept=0.0, prob_a=None, prob_b=None
+    ):
+        self.regressor = regressor
+        self.coef = None if coef is None else np.asarray(coef, dtype=np.float64)
+        self.intercept = float(intercept)
+        self.classes_ = np.asarray(classes)
+        if prob_a is not None:
+            self.probA_ = np.asarray(prob_a)
+            self.probB_ = np.asarray(prob_b)
+
+    def decision_function(self, features):
+        # Fitted on plain arrays, so DataFrames and arrays score the same.
+        features = np.asarray(features, dtype=np.float64)
+        if self.regressor is None:
+            return features @ self.coef + self.intercept
+        return self.regressor.predict(features)
+
+    def predict(self, features):
+        return self.classes_[(self.decision_function(features) > 0).astype(int)]
+
+
+def check_flavor(flavor):
+    if flavor not in SERVING_FLAVORS:
+        raise ValueError(f"Unknown serving flavor {flavor!r}, expected one of {SERVING_FLAVORS}.")
+
+
+def augment(features, n_samples, rng, swap_probability=0.3):
+    """
+    Synthetic inputs for the teacher to label: rows of `features` with each value swapped,
+    with `swap_probability`, for the same column of another random row.
+
+    Every value stays one that occurs in its column, while the combinations cover the
+    input space around the data much more densely than the training rows alone.
+    """
+    rows = features[rng.integers(len(features), size=n_samples)]
+    donors = features[rng.integers(len(features), size=n_samples)]
+    swap = rng.random(rows.shape) < swap_probability
+    return np.where(swap, donors, rows)
+
+
+def distill(model, features, n_samples=50_000, seed=42):
+    """
+    Compacts a fitted binary SVC into a `SurrogateModel`.
+
+    A linear-kernel SVC collapses exactly into one weight vector. Any other kernel is
+    distilled into a gradient-boosted regressor trained on the SVC's decision values over
+    the training rows plus `n_samples` augmented inputs. Returns the surrogate and its
+    agreement with `model` on held-out augmented inputs and on the training rows.
+    """
+    if not hasattr(model, "kernel"):
+        raise ValueError(
+            f"Surrogates are distilled from a kernel SVC, not a {type(model).__name__}. "
+            "Kernel approximation models are cheap to score already, serve them as they are."
+        )
+
+    rng = np.random.default_rng(seed)
+    features = np.asarray(features, dtype=np.float64)
+    held_out = augment(features, max(n_samples // 5, 1), rng)
+    platt = {"prob_a": getattr(model, "probA_", None), "prob_b": getattr(model, "probB_", None)}
+
+    if model.kernel == "linear":
+        surrogate = SurrogateModel(
+            model.classes_, coef=model.coef_.ravel(), intercept=model.intercept_[0], **platt
+        )
+    else:
+        from sklearn.ensemble import HistGradientBoostingRegressor
+
+        inputs = np.vstack([features, augment(features, n_samples, rng)])
+        # Few, wide trees: scoring cost grows with the number of trees.
+        regressor = HistGradientBoostingRegressor(
+            max_iter=50, max_leaf_nodes=63, learning_rate=0.3, random_state=seed
+        )
+        with _without_feature_names(model):
+            regressor.fit(inputs, model.decision_function(inputs))
+        surrogate = SurrogateModel(model.classes_, regressor=regressor, **platt)
+
+    with _without_feature_names(model):
+        report = {
+            "train_rows_agreement": agreement(model, surrogate, features),
+            "held_out_agreement": agreement(model, surrogate, held_out),
+            "model_us_per_row": batch_cost(model, held_out),
+            "surrogate_us_per_row": batch_cost(surrogate, held_out),
+        }
+    return surrogate, report
+
+
+@contextmanager
+def _without_feature_names(model):
+    """Lets a model fitted on a DataFrame score plain arrays without warnings."""
+    feature_names = model.__dict__.pop("feature_names_in_", None)
+    try:
+        yield
+    finally:
+        if feature_names is not None:
+            model.feature_names_in_ = feature_names
+
+
+def agreement(model, surrogate, features):
+    """Decision agreement and mean absolute gap of the Platt probabilities."""
+    import scoring
+
+    approved, probability = scoring.score(model, features)
+    surrogate_approved, surrogate_probability = scoring.score(surrogate, features)
+
+    report = {"decision_agreement": float(np.mean(approved == surrogate_approved))}
+    if probability is not None and surrogate_probability is not None:
+        report["probability_mae"] = float(np.mean(np.abs(probability - surrogate_probability)))
+    return report
+
+
+def batch_cost(model, features):
+    start = time.perf_counter()
+    model.decision_function(features)
+    return (time.perf_counter() - start) / len(features) * 1e6
+
+
+def register_surrogate(surrogate, report, model_name, features):
+    """Logs the surrogate and its agreement report to MLflow and registers it."""
+    import mlflow
+    from mlflow.models import infer_signature
+
+    mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000"))
+    mlflow.set_experiment(os.getenv("MLFLOW_EXPERIMENT_NAME", "loan_approval_prediction"))
+
+    with mlflow.start_run(run_name="SVC_Distillation"):
+        mlflow.set_tag("serving_flavor", "surrogate")
+        if surrogate.regressor is None:
+            mlflow.log_param("compaction", "linear")
+        else:
+            mlflow.log_params({"compaction": "distilled", **surrogate.regressor.get_params()})
+        mlflow.log_metrics(flatten(report))
+
+        features = np.asarray(features, dtype=np.float64)
+        model_info = mlflow.sklearn.log_model(
+            sk_model=surrogate,
+            name="surrogate",
+            signature=infer_signature(features, surrogate.decision_function(features)),
+            # A custom class, pickled by reference to this module shipped alongside it.
+            serialization_format="cloudpickle",
+            code_paths=[__file__],
+            registered_model_name=model_name,
+        )
+
+    return model_info
+
+
+def flatten(report, prefix=""):
+    flat = {}
+    for key, value in report.items():
+        if isinstance(value, dict):
+            flat |= flatten(value, prefix=f"{prefix}{key}_")
+        else:
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def main(
+    model_path: Path = Path("models/model.pkl"),
+    features_path: Path = Path("data/processed/features.csv"),
+    output_path: Path = Path("models/surrogate.pkl"),
+    n_samples: int = 50_000,
+    register: bool = False,
+    model_name: str = "svc-loan-predictor-surrogate",
+):
+    """Distills the trained SVC into a surrogate and reports their agreement."""
+    import joblib
+
+    # Only the CLI needs the project package, Lambda images ship this module without it.
+    from lap.dataset_io import LABEL_COLUMN, read_table
+
+    with open(model_path, "rb") as f:
+        model = joblib.load(f)
+    features = read_table(features_path).drop(columns=[LABEL_COLUMN], errors="ignore")
+
+    surrogate, report = distill(model, features, n_samples=n_samples)
+    for key, value in flatten(report).items():
+        print(f"{key}: {value:.4f}")
+
+    joblib.dump(surrogate, output_path)
+    print(f"Surrogate saved to {output_path}")
+
+    if register:
+        model_info = register_surrogate(surrogate, report, model_name, features)
+        print(
+            f"Surrogate registered as '{model_name}' version {model_info.registered_model_version}"
+        )
+
+
+if __name__ == "__main__":
+    # Run through the imported module, so the pickled surrogate refers to
+    # `surrogate.SurrogateModel` and not to `__main__`.
+    from surrogate import main
+    import typer
+
+    typer.run(main)
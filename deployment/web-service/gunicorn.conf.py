@@ -0,0 +1,43 @@
+"""
+Gunicorn settings of the production web service: `gunicorn -c gunicorn.conf.py`.
+
+`predict.py` is imported once, in the master process, and the uvicorn workers are forked
+from it, so they share the loaded model and preprocessor copy-on-write instead of each
+unpickling their own. With MODEL_BUNDLE_PATH set, the model arrays are memory-mapped
+from the serving bundle and shared through the page cache as well.
+"""
+
+import gc
+import os
+import shutil
+import tempfile
+
+# The workers already use every core, keep numpy and scikit-learn single-threaded in each
+# of them. Set before the app, and so numpy, is imported.
+for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(variable, "1")
+
+# Each worker publishes its serving metrics here, so /metrics returns the server totals.
+os.environ.setdefault(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "loan-prediction-metrics")
+)
+
+wsgi_app = "predict:app"
+worker_class = "uvicorn.workers.UvicornWorker"
+bind = f"0.0.0.0:{os.getenv('PORT', '80')}"
+workers = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "30"))
+
+
+def on_starting(server):
+    # Called before the workers are forked. Counters restart from zero with the server.
+    shutil.rmtree(os.environ["METRICS_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["METRICS_DIR"])
+
+
+def when_ready(server):
+    # Called after the app is preloaded and before the workers are forked. Frozen objects
+    # are left out of garbage collections, which would otherwise write to, and so copy,
+    # every page of the model the workers share.
+    gc.freeze()
@@ -1,53 +1,247 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+import hashlib
+import os
 from typing import Literal
 
+from batching import MicroBatcher
+from bundle import load_bundle
+from compiled_preprocessor import CompiledPreprocessor
 import fastapi
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse, StreamingResponse
 import joblib
+from metrics import ServingMetrics, SharedMetrics
 import pandas as pd
-from pydantic import BaseModel, Field
+import prediction_cache
+from pydantic import BaseModel, Field, TypeAdapter, ValidationError
+import scoring
+from surrogate import check_flavor
 import uvicorn
 
-app = fastapi.FastAPI()
+# "model" serves the trained model, "surrogate" its cheaper distilled surrogate.
+SERVING_FLAVOR = os.getenv("SERVING_FLAVOR", "model")
+check_flavor(SERVING_FLAVOR)
 
-with open("./model.pkl", "rb") as model_file:
-    model = joblib.load(model_file)
+# When set, the model and preprocessor are loaded from the serving bundle (see bundle.py)
+# instead, its arrays memory-mapped and shared through the page cache by every worker.
+MODEL_BUNDLE_PATH = os.getenv("MODEL_BUNDLE_PATH")
+MODEL_PATH = os.getenv("MODEL_PATH", f"./{SERVING_FLAVOR}.pkl")
+PREPROCESSOR_PATH = os.getenv("PREPROCESSOR_PATH", "./preprocessor.pkl")
+CLEANER_PATH = os.getenv("CLEANER_PATH", "./cleaner.pkl")
+APPROVAL_THRESHOLD = float(os.getenv("APPROVAL_THRESHOLD", str(scoring.DEFAULT_THRESHOLD)))
+
+# Micro-batching window for concurrent /predict requests.
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "64"))
+MAX_BATCH_WAIT_MS = float(os.getenv("MAX_BATCH_WAIT_MS", "2"))
+
+# Threads scoring batches in each worker process. Scoring is CPU bound, so more threads
+# than cores per worker only add contention: scale out with worker processes instead.
+SCORING_THREADS = int(os.getenv("SCORING_THREADS", "1"))
+
+# Directory through which the worker processes of one server share their metrics, so that
+# /metrics returns the totals of all of them. Set by gunicorn.conf.py.
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_PUBLISH_INTERVAL_S = float(os.getenv("METRICS_PUBLISH_INTERVAL_S", "1"))
+
+# Number of NDJSON result lines written per chunk of a streamed batch response.
+STREAM_CHUNK_SIZE = 1000
+
+
+if MODEL_BUNDLE_PATH is not None:
+    serving_bundle = load_bundle(MODEL_BUNDLE_PATH, flavor=SERVING_FLAVOR)
+    MODEL_VERSION = os.getenv("MODEL_VERSION") or serving_bundle.model_version
+    model = serving_bundle.model
+    preprocessor = serving_bundle.preprocessor
+else:
+    with open(MODEL_PATH, "rb") as model_file:
+        # Cached predictions are keyed by model version, default to the model file digest.
+        MODEL_VERSION = (
+            os.getenv("MODEL_VERSION") or hashlib.file_digest(model_file, "sha256").hexdigest()
+        )
+        model_file.seek(0)
+        model = joblib.load(model_file)
+
+    # Missing fields are imputed with the training fill values when the cleaner is available.
+    cleaner = joblib.load(CLEANER_PATH) if os.path.exists(CLEANER_PATH) else None
+
+    with open(PREPROCESSOR_PATH, "rb") as preprocessor_file:
+        preprocessor = CompiledPreprocessor.from_column_transformer(
+            joblib.load(preprocessor_file), cleaner
+        )
 
-with open("./preprocessor.pkl", "rb") as preprocessor_file:
-    preprocessor = joblib.load(preprocessor_file)
 
 class PredictionRequest(BaseModel):
-    Gender: Literal["Male", "Female"]
-    Married: Literal["No", "Yes"]
-    Dependents: Literal["0", "1", "2", "3+"]
+    Gender: Literal["Male", "Female"] | None = None
+    Married: Literal["No", "Yes"] | None = None
+    Dependents: Literal["0", "1", "2", "3+"] | None = None
     Education: Literal["Graduate", "Not Graduate"]
-    Self_Employed: Literal["No", "Yes"]
+    Self_Employed: Literal["No", "Yes"] | None = None
     Property_Area: Literal["Urban", "Rural", "Semiurban"]
     ApplicantIncome: float | int = Field(..., description="Annual income of the applicant", ge=0.0)
-    CoapplicantIncome: float | int = Field(..., description="Annual income of the co-applicant", ge=0.0)
-    LoanAmount: float | int = Field(..., description="Loan amount in thousands", ge=9.0)
-    Loan_Amount_Term: float | int = Field(..., description="Term of loan in months", gt=0.0, le=480.0)
-    Credit_History: Literal[0, 1]
+    CoapplicantIncome: float | int = Field(
+        ..., description="Annual income of the co-applicant", ge=0.0
+    )
+    LoanAmount: float | int | None = Field(None, description="Loan amount in thousands", ge=9.0)
+    Loan_Amount_Term: float | int | None = Field(
+        None, description="Term of loan in months", gt=0.0, le=480.0
+    )
+    Credit_History: Literal[0, 1] | None = None
 
 
 class PredictionResponse(BaseModel):
     prediction: Literal["Approved", "Rejected"]
+    probability: float | None = Field(None, description="Calibrated probability of approval")
+
+
+prediction_batch_adapter = TypeAdapter(list[PredictionRequest])
+
+# Shared by every request served by this worker process, None when disabled.
+cache = prediction_cache.cache_from_env(os.environ)
+
+# Stage latencies and counters of this worker process, exposed at /metrics.
+metrics = ServingMetrics(MODEL_VERSION)
+shared_metrics = (
+    SharedMetrics(metrics, METRICS_DIR, interval=METRICS_PUBLISH_INTERVAL_S)
+    if METRICS_DIR
+    else None
+)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Runs in each worker, after gunicorn forked it.
+    if shared_metrics is not None:
+        shared_metrics.start()
+    yield
+    if shared_metrics is not None:
+        shared_metrics.stop()
+
+
+app = fastapi.FastAPI(lifespan=lifespan)
+
+
+def score(records: list[dict]) -> list[dict]:
+    """Scores validated applications, only evaluating the ones missing from the cache."""
+    metrics.count("records", len(records))
+    return prediction_cache.score_with_cache(
+        cache, records, MODEL_VERSION, score_uncached, metrics=metrics
+    )
+
+
+def score_uncached(records: list[dict]) -> list[dict]:
+    """Runs one vectorized transform and model evaluation over validated applications."""
+    metrics.count("batches")
+    try:
+        with metrics.time("transform"):
+            features = preprocessor.transform(records)
+    except ValueError as e:
+        raise fastapi.HTTPException(status_code=422, detail=str(e)) from e
+
+    with metrics.time("predict"):
+        # Bundled models are stored without feature names and score plain arrays.
+        if getattr(model, "feature_names_in_", None) is not None:
+            features = pd.DataFrame(features, columns=preprocessor.feature_names)
+        approved, probability = scoring.score(model, features, threshold=APPROVAL_THRESHOLD)
+
+    labels = ["Approved" if approve else "Rejected" for approve in approved]
+    probabilities = [None] * len(labels) if probability is None else probability.tolist()
+    return [
+        {"prediction": label, "probability": p}
+        for label, p in zip(labels, probabilities, strict=True)
+    ]
+
+
+# Scoring runs off the event loop in this bounded pool. Its threads only start on the
+# first submitted batch, so a pool created before gunicorn forks is safe to inherit.
+scoring_executor = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix="scoring")
+
+batcher = MicroBatcher(
+    score,
+    max_batch_size=MAX_BATCH_SIZE,
+    max_wait_ms=MAX_BATCH_WAIT_MS,
+    executor=scoring_executor,
+)
+
+
+def parse_batch(body: bytes, content_type: str) -> list[dict]:
+    """Validates a JSON array or NDJSON body of applications in a single pass."""
+    if content_type.startswith("application/x-ndjson"):
+        lines = [line for line in body.splitlines() if line.strip()]
+        body = b"[" + b",".join(lines) + b"]"
+
+    try:
+        with metrics.time("validation"):
+            applications = prediction_batch_adapter.validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors(include_url=False)) from e
+
+    return prediction_batch_adapter.dump_python(applications)
+
+
+def prediction_line(prediction: dict) -> str:
+    probability = prediction["probability"]
+    probability = "null" if probability is None else repr(probability)
+    return f'{{"prediction":"{prediction["prediction"]}","probability":{probability}}}\n'
+
+
+def stream_predictions(predictions: list[dict]):
+    for start in range(0, len(predictions), STREAM_CHUNK_SIZE):
+        chunk = predictions[start : start + STREAM_CHUNK_SIZE]
+        yield "".join(prediction_line(prediction) for prediction in chunk).encode("utf-8")
+
 
 # Hello world
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Loan Prediction API"}
 
+
 @app.post("/predict", response_model=PredictionResponse)
-def predict(request: PredictionRequest):
+async def predict(request: PredictionRequest):
     """
     Predicts loan approval based on the provided features.
+
+    Concurrent requests are coalesced by `batcher` and scored together.
     """
-    
-    df_request = pd.DataFrame([request.model_dump()])
-    df_request = preprocessor.transform(df_request)
-    prediction = model.predict(df_request)
-    prediction = ["Approved" if pred == 1 else "Rejected" for pred in prediction]
-    
-    return {"prediction": prediction[0]}
+
+    # Includes the time spent waiting for the micro-batch to fill.
+    with metrics.time("batched_request"):
+        prediction = await batcher.submit(request.model_dump())
+
+    return prediction
+
+
+@app.post("/predict_batch")
+async def predict_batch(request: fastapi.Request):
+    """
+    Predicts loan approval for a batch of applications.
+
+    The body is either a JSON array of applications or NDJSON (`application/x-ndjson`),
+    one application per line. Results are streamed back as NDJSON in request order.
+    """
+    body = await request.body()
+    records = parse_batch(body, request.headers.get("content-type", ""))
+    # The model cannot be evaluated on zero rows.
+    if not records:
+        return StreamingResponse(iter(()), media_type="application/x-ndjson")
+
+    loop = asyncio.get_running_loop()
+    predictions = await loop.run_in_executor(scoring_executor, score, records)
+
+    return StreamingResponse(stream_predictions(predictions), media_type="application/x-ndjson")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """
+    Stage latency histograms and counters in the Prometheus text format, summed over the
+    worker processes when they share METRICS_DIR.
+    """
+    text = metrics.render() if shared_metrics is None else shared_metrics.render()
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
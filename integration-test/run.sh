@@ -44,5 +44,15 @@ if [ ${ERROR_CODE} != 0 ]; then
     exit ${ERROR_CODE}
 fi
 
+python test_kinesis_batch.py
+
+ERROR_CODE=$?
+
+if [ ${ERROR_CODE} != 0 ]; then
+    docker compose logs
+    docker compose down
+    exit ${ERROR_CODE}
+fi
+
 
 docker compose down
\ No newline at end of file
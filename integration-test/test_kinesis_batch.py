@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+import boto3
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "deployment"))
+
+from model import BufferedKinesisCallback
+
+kinesis_endpoint = os.getenv("KINESIS_ENDPOINT_URL", "http://localhost:4566")
+kinesis_client = boto3.client("kinesis", endpoint_url=kinesis_endpoint)
+
+stream_name = os.getenv("BATCH_PREDICTIONS_STREAM_NAME", "loan_predictions_batch")
+shard_id = "shardId-000000000000"
+num_events = 1200
+
+kinesis_client.create_stream(StreamName=stream_name, ShardCount=1)
+kinesis_client.get_waiter("stream_exists").wait(StreamName=stream_name)
+
+callback = BufferedKinesisCallback(kinesis_client, stream_name)
+
+for i in range(num_events):
+    callback.put_record(
+        {
+            "model": "loan_approval_prediction_model",
+            "model_version": "Test123",
+            "prediction": {"approved": i % 2 == 0, "request_id": str(i)},
+        }
+    )
+
+callback.flush()
+
+
+shard_iterator_id = kinesis_client.get_shard_iterator(
+    StreamName=stream_name,
+    ShardId=shard_id,
+    ShardIteratorType="TRIM_HORIZON",
+)["ShardIterator"]
+
+records = []
+while shard_iterator_id is not None and len(records) < num_events:
+    records_response = kinesis_client.get_records(ShardIterator=shard_iterator_id, Limit=1000)
+    records.extend(records_response["Records"])
+    shard_iterator_id = records_response.get("NextShardIterator")
+    if not records_response["Records"]:
+        break
+
+request_ids = [json.loads(record["Data"])["prediction"]["request_id"] for record in records]
+print(f"Read {len(request_ids)} records from {stream_name}")
+
+assert len(request_ids) == num_events, f"Expected {num_events} records, found {len(request_ids)}"
+assert sorted(map(int, request_ids)) == list(range(num_events))
+
+kinesis_client.delete_stream(StreamName=stream_name)
+
+print("all good")
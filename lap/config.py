@@ -21,6 +21,34 @@ MODELS_DIR = PROJ_ROOT / "models"
 
 REPORTS_DIR = PROJ_ROOT / "reports"
 FIGURES_DIR = REPORTS_DIR / "figures"
+# Per-task profiles written when LAP_PROFILE is set (see lap/profiling.py)
+PROFILES_DIR = REPORTS_DIR / "profiles"
+
+# Outputs of pipeline stages, keyed by the hashes of their inputs (see lap/stage_cache.py)
+STAGE_CACHE_DIR = Path(os.getenv("STAGE_CACHE_DIR", PROJ_ROOT / ".stage_cache"))
+# Cached keys kept per stage after a pipeline run, the least recently used are pruned
+STAGE_CACHE_KEEP = int(os.getenv("STAGE_CACHE_KEEP", "3"))
+
+# Local index of the MLflow runs, for best-run lookups (see lap/run_index.py)
+RUN_INDEX_PATH = Path(os.getenv("RUN_INDEX_PATH", PROJ_ROOT / ".run_index.sqlite"))
+
+# Datasets: "csv", "parquet" or "arrow" (Arrow IPC). Parquet and Arrow store the features
+# and the labels together in one training file.
+DATASET_FORMAT = os.getenv("DATASET_FORMAT", "csv")
+DATASET_SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+
+if DATASET_FORMAT not in DATASET_SUFFIXES:
+    raise ValueError(f"DATASET_FORMAT must be one of {list(DATASET_SUFFIXES)}.")
+
+CLEANED_DATA_PATH = INTERIM_DATA_DIR / f"cleaned{DATASET_SUFFIXES[DATASET_FORMAT]}"
+
+if DATASET_FORMAT == "csv":
+    FEATURES_PATH = PROCESSED_DATA_DIR / "features.csv"
+    LABELS_PATH = PROCESSED_DATA_DIR / "labels.csv"
+else:
+    FEATURES_PATH = LABELS_PATH = (
+        PROCESSED_DATA_DIR / f"training{DATASET_SUFFIXES[DATASET_FORMAT]}"
+    )
 
 # MLFlow
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://localhost:5000")
@@ -1,3 +1,4 @@
+from collections import Counter
 import os
 from pathlib import Path
 from pickle import dump
@@ -6,7 +7,8 @@ import shutil
 from dotenv import load_dotenv
 import kagglehub
 from loguru import logger
-from pandas import DataFrame, read_csv
+import numpy as np
+from pandas import DataFrame, Series
 from prefect import flow, get_run_logger, task
 from sklearn.compose import ColumnTransformer
 from sklearn.impute import SimpleImputer
@@ -19,19 +21,66 @@ from sklearn.preprocessing import (
 from tqdm import tqdm
 import typer
 
+from lap import profiling
 from lap.config import (
-    INTERIM_DATA_DIR,
+    CLEANED_DATA_PATH,
+    FEATURES_PATH,
+    LABELS_PATH,
     MODELS_DIR,
-    PROCESSED_DATA_DIR,
     RAW_DATA_DIR,
 )
+from lap.dataset_io import (
+    CLEANED_SCHEMA,
+    ChunkWriter,
+    TrainingDataWriter,
+    iter_table_chunks,
+    read_table,
+    write_table,
+    write_training_data,
+)
 
 load_dotenv()
 
 app = typer.Typer()
 
+COLUMNS_WITH_NULLS = [
+    "Gender",
+    "Married",
+    "Dependents",
+    "Self_Employed",
+    "LoanAmount",
+    "Loan_Amount_Term",
+    "Credit_History",
+]
+MEAN_IMPUTED_COLUMNS = ["LoanAmount"]
+MOST_FREQUENT_CAT_COLUMNS = ["Gender", "Married", "Dependents", "Self_Employed"]
+MOST_FREQUENT_NUM_COLUMNS = ["Loan_Amount_Term", "Credit_History"]
+
+BINARY_COLUMNS = ["Gender", "Married", "Education", "Self_Employed", "Credit_History"]
+CAT_COLUMNS = ["Property_Area"]
+ORD_COLUMNS = ["Dependents", "Loan_Amount_Term"]
+NUM_COLUMNS = ["ApplicantIncome", "CoapplicantIncome", "LoanAmount"]
+
+# Raw CSV column types, pinned so every chunk of a streamed file is parsed the same way.
+RAW_CSV_DTYPES = {
+    "Loan_ID": "str",
+    "Gender": "str",
+    "Married": "str",
+    "Dependents": "str",
+    "Education": "str",
+    "Self_Employed": "str",
+    "ApplicantIncome": "int64",
+    "CoapplicantIncome": "float64",
+    "LoanAmount": "float64",
+    "Loan_Amount_Term": "float64",
+    "Credit_History": "float64",
+    "Property_Area": "str",
+    "Loan_Status": "str",
+}
+
 
 @task(name="download_data")
+@profiling.profiled
 def download_data(
     dataset_name: str = "ninzaami/loan-predication",
     output_path: Path = RAW_DATA_DIR / "loan_pred.csv",
@@ -46,50 +95,103 @@ def download_data(
     logger.info("Dataset downloaded successfully.")
 
 
+def prepare_raw_data(df: DataFrame) -> DataFrame:
+    """Drops the application ID and encodes the loan status as 1/0."""
+    prepared_df = df.drop(columns=["Loan_ID"])
+    prepared_df["Loan_Status"] = prepared_df["Loan_Status"].map({"Y": 1, "N": 0})
+    return prepared_df
+
+
+def build_cleaner() -> ColumnTransformer:
+    """
+    Unfitted cleaning transformer, imputing every column with nulls in one transform.
+
+    Strings and numbers get separate most-frequent imputers so neither changes dtype. The
+    fitted imputation values are saved with the model and applied again at inference.
+    """
+    return ColumnTransformer(
+        transformers=[
+            ("mean", SimpleImputer(strategy="mean"), MEAN_IMPUTED_COLUMNS),
+            (
+                "most_frequent_categorical",
+                SimpleImputer(strategy="most_frequent"),
+                MOST_FREQUENT_CAT_COLUMNS,
+            ),
+            (
+                "most_frequent_numerical",
+                SimpleImputer(strategy="most_frequent"),
+                MOST_FREQUENT_NUM_COLUMNS,
+            ),
+        ],
+        remainder="passthrough",
+        verbose_feature_names_out=False,
+    ).set_output(transform="pandas")
+
+
+def apply_cleaner(cleaner: ColumnTransformer, prepared_df: DataFrame) -> DataFrame:
+    """Imputes the features of `prepared_df` with a fitted cleaner, keeping the column order."""
+    features_df = prepared_df.drop(columns=["Loan_Status"])
+    cleaned_df = cleaner.transform(features_df)[features_df.columns]
+    cleaned_df["Loan_Status"] = prepared_df["Loan_Status"]
+    return cleaned_df
+
+
+def build_preprocessor() -> ColumnTransformer:
+    """Unfitted feature preprocessor: ordinal, one-hot and standard scaling."""
+    bin_pipeline = Pipeline(steps=[("encoder", OrdinalEncoder())]).set_output(transform="pandas")
+
+    cat_pipeline = Pipeline(steps=[("encoder", OneHotEncoder(sparse_output=False))]).set_output(
+        transform="pandas"
+    )
+
+    ord_pipeline = Pipeline(steps=[("encoder", OrdinalEncoder())]).set_output(transform="pandas")
+
+    num_pipeline = Pipeline(steps=[("scaler", StandardScaler())]).set_output(transform="pandas")
+
+    return ColumnTransformer(
+        transformers=[
+            ("binary", bin_pipeline, BINARY_COLUMNS),
+            ("categorical", cat_pipeline, CAT_COLUMNS),
+            ("ordinal", ord_pipeline, ORD_COLUMNS),
+            ("numerical", num_pipeline, NUM_COLUMNS),
+        ],
+        remainder="drop",
+    ).set_output(transform="pandas")
+
+
 @task(name="clean_data")
+@profiling.profiled
 def clean_data(
     input_path: Path = RAW_DATA_DIR / "loan_pred.csv",
-    output_path: Path = INTERIM_DATA_DIR / "cleaned.csv",
+    output_path: Path = CLEANED_DATA_PATH,
+    cleaner_save_path: Path = MODELS_DIR / "cleaner.pkl",
 ):
     logger.info(f"Reading data from {input_path}")
-    df: DataFrame = read_csv(input_path)
+    df: DataFrame = read_table(input_path)
 
     logger.info("Cleaning data...")
 
-    cleaned_df: DataFrame = df.copy()
-    cleaned_df.drop(columns=["Loan_ID"], inplace=True)
-    cleaned_df["Loan_Status"] = cleaned_df["Loan_Status"].map({"Y": 1, "N": 0})
-
-    col_w_nulls = [
-        "Gender",
-        "Married",
-        "Dependents",
-        "Self_Employed",
-        "LoanAmount",
-        "Loan_Amount_Term",
-        "Credit_History",
-    ]
-
-    for col in tqdm(col_w_nulls):
-        if col in ["LoanAmount"]:
-            mean_imputer = SimpleImputer(strategy="mean")
-            cleaned_df[col] = mean_imputer.fit_transform(cleaned_df[[col]]).flatten()
-        else:
-            mf_imputer = SimpleImputer(strategy="most_frequent")
-            cleaned_df[col] = mf_imputer.fit_transform(cleaned_df[[col]]).flatten()
+    prepared_df: DataFrame = prepare_raw_data(df)
+    cleaner = build_cleaner().fit(prepared_df.drop(columns=["Loan_Status"]))
+    cleaned_df = apply_cleaner(cleaner, prepared_df)
 
     logger.info(f"Writing cleaned data to {output_path}")
-    cleaned_df.to_csv(output_path, index=False)
+    write_table(cleaned_df, output_path, schema=CLEANED_SCHEMA)
+
+    logger.info(f"Saving cleaner to {cleaner_save_path}")
+    with open(cleaner_save_path, "wb") as f:
+        dump(cleaner, f)
     logger.info("Data cleaning complete.")
 
     return cleaned_df
 
 
 @task(name="process_data")
+@profiling.profiled
 def preproccess_data(
     cleaned_df: DataFrame,
-    output_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    output_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
     preprocessor_save_path: Path = MODELS_DIR / "preprocessor.pkl",
 ):
     logger.info("Processing data...")
@@ -97,59 +199,224 @@ def preproccess_data(
     features_df: DataFrame = cleaned_df.drop(columns=["Loan_Status"])
     target_df: DataFrame = cleaned_df[["Loan_Status"]]
 
-    binary_columns = ["Gender", "Married", "Education", "Self_Employed", "Credit_History"]
-    cat_columns = ["Property_Area"]
-    ord_columns = ["Dependents", "Loan_Amount_Term"]
-    num_columns = ["ApplicantIncome", "CoapplicantIncome", "LoanAmount"]
+    preprocessor = build_preprocessor()
 
-    bin_pipeline = Pipeline(steps=[("encoder", OrdinalEncoder())]).set_output(transform="pandas")
+    transformed_df = preprocessor.fit_transform(features_df)
 
-    cat_pipeline = Pipeline(steps=[("encoder", OneHotEncoder(sparse_output=False))]).set_output(
-        transform="pandas"
-    )
+    logger.info(f"Writing features to {output_path} and labels to {labels_path}")
+    write_training_data(transformed_df, target_df, output_path, labels_path)
 
-    ord_pipeline = Pipeline(steps=[("encoder", OrdinalEncoder())]).set_output(transform="pandas")
+    logger.info(f"Saving preprocessor to {preprocessor_save_path}")
+    with open(preprocessor_save_path, "wb") as f:
+        dump(preprocessor, f)
+    logger.info(f"Preprocessor saved to {preprocessor_save_path}")
+    logger.info("Data processing complete.")
 
-    num_pipeline = Pipeline(steps=[("scaler", StandardScaler())]).set_output(transform="pandas")
 
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ("binary", bin_pipeline, binary_columns),
-            ("categorical", cat_pipeline, cat_columns),
-            ("ordinal", ord_pipeline, ord_columns),
-            ("numerical", num_pipeline, num_columns),
-        ],
-        remainder="drop",
-    ).set_output(transform="pandas")
+class ChunkStatistics:
+    """
+    Statistics of the raw data needed to clean and preprocess it, accumulated chunk by chunk.
 
-    transformed_df = preprocessor.fit_transform(features_df)
+    Keeps value counts of the categorical columns (imputation modes and encoder
+    vocabularies), sums for the mean imputation, the running scaler moments and the count
+    of approved loans, so memory does not grow with the number of rows.
+    """
+
+    def __init__(self):
+        self.n_rows = 0
+        self.positives = 0
+        self.dtypes = None
+        self.value_counts = {col: Counter() for col in BINARY_COLUMNS + CAT_COLUMNS + ORD_COLUMNS}
+        self.sums = dict.fromkeys(MEAN_IMPUTED_COLUMNS, 0.0)
+        self.counts = dict.fromkeys(MEAN_IMPUTED_COLUMNS, 0)
+        self.scaler = StandardScaler()
+
+    def update(self, prepared_df: DataFrame):
+        if self.dtypes is None:
+            self.dtypes = prepared_df.dtypes.drop("Loan_Status")
+
+        self.n_rows += len(prepared_df)
+        self.positives += int(prepared_df["Loan_Status"].sum())
+        for col, counts in self.value_counts.items():
+            counts.update(prepared_df[col].value_counts().to_dict())
+        for col in MEAN_IMPUTED_COLUMNS:
+            self.sums[col] += prepared_df[col].sum()
+            self.counts[col] += prepared_df[col].count()
+
+        # NaNs are ignored, as in a full fit.
+        self.scaler.partial_fit(prepared_df[NUM_COLUMNS])
+
+    def fill_values(self) -> dict:
+        """Imputation values, matching SimpleImputer's mean and most_frequent strategies."""
+        fill_values = {col: self.sums[col] / self.counts[col] for col in MEAN_IMPUTED_COLUMNS}
+
+        for col in COLUMNS_WITH_NULLS:
+            if col not in MEAN_IMPUTED_COLUMNS:
+                counts = self.value_counts[col]
+                top_count = max(counts.values())
+                # Ties go to the smallest value, like SimpleImputer.
+                fill_values[col] = min(value for value, n in counts.items() if n == top_count)
+
+        return fill_values
+
+    def fit_preprocessor(self) -> ColumnTransformer:
+        """
+        Fitted preprocessor equivalent to fitting `build_preprocessor` on the cleaned data.
+
+        The encoders are fitted on a small frame holding every category seen, the imputed
+        values are among them. The scaler moments are then replaced by the streamed ones,
+        with mean-imputed columns corrected for the rows that were filled with their mean.
+        """
+        preprocessor = build_preprocessor().fit(self._vocabulary_frame())
+
+        mean = self.scaler.mean_.copy()
+        var = self.scaler.var_.copy()
+        n_samples_seen = np.broadcast_to(self.scaler.n_samples_seen_, mean.shape).copy()
+
+        for i, col in enumerate(NUM_COLUMNS):
+            if col in MEAN_IMPUTED_COLUMNS:
+                var[i] *= n_samples_seen[i] / self.n_rows
+                n_samples_seen[i] = self.n_rows
+
+        scaler = preprocessor.named_transformers_["numerical"].named_steps["scaler"]
+        scaler.mean_ = mean
+        scaler.var_ = var
+        scaler.scale_ = np.where(var == 0, 1.0, np.sqrt(var))
+        scaler.n_samples_seen_ = (
+            int(n_samples_seen[0])
+            if (n_samples_seen == n_samples_seen[0]).all()
+            else n_samples_seen
+        )
+
+        return preprocessor
+
+    def fit_cleaner(self) -> ColumnTransformer:
+        """Fitted cleaner equivalent to fitting `build_cleaner` on the raw data."""
+        cleaner = build_cleaner().fit(self._vocabulary_frame())
+        fill_values = self.fill_values()
+
+        for _, imputer, columns in cleaner.transformers_:
+            if isinstance(imputer, SimpleImputer):
+                imputer.statistics_ = np.array(
+                    [fill_values[col] for col in columns], dtype=imputer.statistics_.dtype
+                )
+
+        return cleaner
+
+    def _vocabulary_frame(self) -> DataFrame:
+        """Small frame holding every category seen, numerical columns are zeros."""
+        vocabularies = {col: sorted(counts) for col, counts in self.value_counts.items()}
+        n_rows = max(len(values) for values in vocabularies.values())
+
+        return DataFrame(
+            {
+                col: Series(self._pad(vocabularies.get(col, [0]), n_rows), dtype=dtype)
+                for col, dtype in self.dtypes.items()
+            }
+        )
+
+    @staticmethod
+    def _pad(values, length):
+        return list(values) + [values[0]] * (length - len(values))
+
+
+@task(name="collect_statistics")
+@profiling.profiled
+def collect_statistics(
+    input_path: Path = RAW_DATA_DIR / "loan_pred.csv",
+    chunksize: int = 100_000,
+) -> ChunkStatistics:
+    """First streaming pass, gathers the cleaning and preprocessing statistics."""
+    logger.info(f"Collecting statistics from {input_path} in chunks of {chunksize} rows")
+    statistics = ChunkStatistics()
 
-    logger.info(f"Writing features to {output_path}")
-    transformed_df.to_csv(output_path, index=False)
+    for chunk in tqdm(iter_table_chunks(input_path, chunksize, dtype=RAW_CSV_DTYPES)):
+        statistics.update(prepare_raw_data(chunk))
 
-    logger.info(f"Writing labels to {labels_path}")
-    target_df.to_csv(labels_path, index=False)
+    logger.info(f"Collected statistics of {statistics.n_rows} rows.")
+    return statistics
 
-    logger.info(f"Saving preprocessor to {preprocessor_save_path}")
+
+@task(name="stream_process_data")
+@profiling.profiled
+def stream_process_data(
+    statistics: ChunkStatistics,
+    input_path: Path = RAW_DATA_DIR / "loan_pred.csv",
+    cleaned_output_path: Path = CLEANED_DATA_PATH,
+    output_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
+    preprocessor_save_path: Path = MODELS_DIR / "preprocessor.pkl",
+    cleaner_save_path: Path = MODELS_DIR / "cleaner.pkl",
+    chunksize: int = 100_000,
+):
+    """Second streaming pass, cleans and transforms every chunk and appends it to the outputs."""
+    cleaner = statistics.fit_cleaner()
+    preprocessor = statistics.fit_preprocessor()
+
+    logger.info(f"Writing cleaned data to {cleaned_output_path}")
+    logger.info(f"Writing features to {output_path} and labels to {labels_path}")
+
+    with (
+        ChunkWriter(cleaned_output_path, schema=CLEANED_SCHEMA) as cleaned_writer,
+        TrainingDataWriter(output_path, labels_path) as training_writer,
+    ):
+        for chunk in tqdm(iter_table_chunks(input_path, chunksize, dtype=RAW_CSV_DTYPES)):
+            cleaned_df = apply_cleaner(cleaner, prepare_raw_data(chunk))
+            cleaned_writer.write(cleaned_df)
+
+            training_writer.write(
+                preprocessor.transform(cleaned_df.drop(columns=["Loan_Status"])),
+                cleaned_df[["Loan_Status"]],
+            )
+
+    logger.info(
+        f"Saving cleaner to {cleaner_save_path} and preprocessor to {preprocessor_save_path}"
+    )
+    with open(cleaner_save_path, "wb") as f:
+        dump(cleaner, f)
     with open(preprocessor_save_path, "wb") as f:
         dump(preprocessor, f)
-    logger.info(f"Preprocessor saved to {preprocessor_save_path}")
     logger.info("Data processing complete.")
 
 
 @flow(name="Data Preprocessing")
 def data_preprocessing_flow(
     raw_data_path: Path = RAW_DATA_DIR / "loan_pred.csv",
-    cleaned_data_path: Path = INTERIM_DATA_DIR / "cleaned.csv",
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    cleaned_data_path: Path = CLEANED_DATA_PATH,
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
     preprocessor_save_path: Path = MODELS_DIR / "preprocessor.pkl",
+    cleaner_save_path: Path = MODELS_DIR / "cleaner.pkl",
+    chunksize: int | None = None,
 ):
-    """Cleans and preprocesses the data, preparing it for model training."""
+    """
+    Cleans and preprocesses the data, preparing it for model training.
+
+    With `chunksize` the raw data is streamed twice in chunks of that many rows instead of
+    being loaded at once, so memory stays bounded by the chunk size.
+    """
     logger.remove()
     logger.add(sink=get_run_logger().info, format="{message}")
 
-    cleaned_df = clean_data(input_path=raw_data_path, output_path=cleaned_data_path)
+    if chunksize is not None:
+        statistics = collect_statistics(input_path=raw_data_path, chunksize=chunksize)
+        stream_process_data(
+            statistics=statistics,
+            input_path=raw_data_path,
+            cleaned_output_path=cleaned_data_path,
+            output_path=features_path,
+            labels_path=labels_path,
+            preprocessor_save_path=preprocessor_save_path,
+            cleaner_save_path=cleaner_save_path,
+            chunksize=chunksize,
+        )
+        return
+
+    cleaned_df = clean_data(
+        input_path=raw_data_path,
+        output_path=cleaned_data_path,
+        cleaner_save_path=cleaner_save_path,
+    )
     preproccess_data(
         cleaned_df=cleaned_df,
         output_path=features_path,
@@ -161,22 +428,27 @@ def data_preprocessing_flow(
 @app.command()
 def main(
     raw_data_path: Path = RAW_DATA_DIR / "loan_pred.csv",
-    cleaned_data_path: Path = INTERIM_DATA_DIR / "cleaned.csv",
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    cleaned_data_path: Path = CLEANED_DATA_PATH,
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
     preprocessor_save_path: Path = MODELS_DIR / "preprocessor.pkl",
+    cleaner_save_path: Path = MODELS_DIR / "cleaner.pkl",
+    chunksize: int = typer.Option(None, help="Stream the raw data in chunks of this many rows."),
+    profile: str = typer.Option(None, help=profiling.PROFILE_HELP),
 ):
     """Runs the complete dataset obtention and preprocessing pipeline."""
-
-    download_data()
-
-    data_preprocessing_flow(
-        raw_data_path=raw_data_path,
-        cleaned_data_path=cleaned_data_path,
-        features_path=features_path,
-        labels_path=labels_path,
-        preprocessor_save_path=preprocessor_save_path,
-    )
+    with profiling.session(profile, run_name="Data_Preprocessing_Profile"):
+        download_data()
+
+        data_preprocessing_flow(
+            raw_data_path=raw_data_path,
+            cleaned_data_path=cleaned_data_path,
+            features_path=features_path,
+            labels_path=labels_path,
+            preprocessor_save_path=preprocessor_save_path,
+            cleaner_save_path=cleaner_save_path,
+            chunksize=chunksize,
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,231 @@
+from pathlib import Path
+
+from pandas import DataFrame, concat, read_csv
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from lap.config import DATASET_SUFFIXES
+
+LABEL_COLUMN = "Loan_Status"
+
+CLEANED_SCHEMA = pa.schema(
+    [
+        ("Gender", pa.string()),
+        ("Married", pa.string()),
+        ("Dependents", pa.string()),
+        ("Education", pa.string()),
+        ("Self_Employed", pa.string()),
+        ("ApplicantIncome", pa.int64()),
+        ("CoapplicantIncome", pa.float64()),
+        ("LoanAmount", pa.float64()),
+        ("Loan_Amount_Term", pa.float64()),
+        ("Credit_History", pa.float64()),
+        ("Property_Area", pa.string()),
+        (LABEL_COLUMN, pa.int64()),
+    ]
+)
+
+
+def training_schema(feature_names) -> pa.Schema:
+    """Schema of a training file: the float64 features followed by the label."""
+    return pa.schema(
+        [(name, pa.float64()) for name in feature_names] + [(LABEL_COLUMN, pa.int64())]
+    )
+
+
+def dataset_format(path: Path) -> str:
+    """Storage format of `path`, from its suffix."""
+    for fmt, suffix in DATASET_SUFFIXES.items():
+        if Path(path).suffix == suffix:
+            return fmt
+    raise ValueError(f"Unsupported dataset file {path}, expected one of {DATASET_SUFFIXES}.")
+
+
+def write_table(df: DataFrame, path: Path, schema: pa.Schema | None = None):
+    """
+    Writes `df` as CSV, Parquet or Arrow IPC depending on the suffix of `path`.
+
+    Parquet and Arrow files are written with `schema`, so a column that does not match
+    its declared type fails here instead of silently changing dtype downstream.
+    """
+    fmt = dataset_format(path)
+
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return
+
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    if fmt == "parquet":
+        pq.write_table(table, path)
+    else:
+        # Uncompressed, so reads can map the buffers straight from the file.
+        with pa.OSFile(str(path), "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_table(path: Path, columns: list[str] | None = None) -> DataFrame:
+    """
+    Reads a CSV, Parquet or Arrow IPC file into a DataFrame.
+
+    Parquet and Arrow files are memory-mapped. Arrow IPC columns are converted to pandas
+    without copying where their dtype allows it (numeric columns without nulls).
+    """
+    fmt = dataset_format(path)
+
+    if fmt == "csv":
+        return read_csv(path, usecols=columns)
+
+    if fmt == "parquet":
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    else:
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        if columns is not None:
+            table = table.select(columns)
+
+    return table.to_pandas(split_blocks=True)
+
+
+def write_training_data(
+    features: DataFrame, labels: DataFrame, features_path: Path, labels_path: Path
+):
+    """Writes features and labels, as a single file when both paths are the same."""
+    if Path(features_path) != Path(labels_path):
+        write_table(features, features_path)
+        write_table(labels, labels_path, schema=pa.schema([(LABEL_COLUMN, pa.int64())]))
+        return
+
+    write_table(
+        concat([features, labels[[LABEL_COLUMN]]], axis=1),
+        features_path,
+        schema=training_schema(features.columns),
+    )
+
+
+def read_training_data(features_path: Path, labels_path: Path) -> tuple[DataFrame, DataFrame]:
+    """Reads features and labels written by `write_training_data`."""
+    if Path(features_path) != Path(labels_path):
+        return read_table(features_path), read_table(labels_path)
+
+    data = read_table(features_path)
+    return data.drop(columns=[LABEL_COLUMN]), data[[LABEL_COLUMN]]
+
+
+def iter_table_chunks(path: Path, chunksize: int, dtype: dict | None = None, skip_rows: int = 0):
+    """
+    Yields a CSV, Parquet or Arrow IPC file as DataFrames of at most `chunksize` rows.
+
+    `dtype` pins the CSV column types, so every chunk gets the same dtypes whatever
+    values it happens to contain. The first `skip_rows` data rows are skipped.
+    """
+    fmt = dataset_format(path)
+
+    if fmt == "csv":
+        chunks = read_csv(path, chunksize=chunksize, dtype=dtype, skiprows=range(1, skip_rows + 1))
+        # Skipping every row leaves a single empty chunk.
+        yield from (chunk for chunk in chunks if len(chunk))
+    elif fmt == "parquet":
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+            if skip_rows >= batch.num_rows:
+                skip_rows -= batch.num_rows
+                continue
+            yield batch.slice(skip_rows).to_pandas()
+            skip_rows = 0
+    else:
+        with pa.memory_map(str(path)) as source:
+            table = pa.ipc.open_file(source).read_all()
+        for offset in range(skip_rows, table.num_rows, chunksize):
+            yield table.slice(offset, chunksize).to_pandas()
+
+
+class ChunkWriter:
+    """
+    Writes a CSV, Parquet or Arrow IPC file chunk by chunk.
+
+    The Parquet/Arrow schema is `schema`, or inferred from the first chunk when None.
+    """
+
+    def __init__(self, path: Path, schema: pa.Schema | None = None):
+        self.path = path
+        self.schema = schema
+        self.format = dataset_format(path)
+        self._sink = None
+        self._writer = None
+        self._header = True
+
+    def write(self, df: DataFrame):
+        if self.format == "csv":
+            df.to_csv(
+                self.path, mode="w" if self._header else "a", header=self._header, index=False
+            )
+            self._header = False
+            return
+
+        if self._writer is None:
+            if self.schema is None:
+                self.schema = pa.Schema.from_pandas(df, preserve_index=False)
+            if self.format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self.schema)
+            else:
+                self._sink = pa.OSFile(str(self.path), "wb")
+                self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+        self._writer.write_table(
+            pa.Table.from_pandas(df, schema=self.schema, preserve_index=False)
+        )
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TrainingDataWriter:
+    """Chunked counterpart of `write_training_data`."""
+
+    def __init__(self, features_path: Path, labels_path: Path):
+        self.single_file = Path(features_path) == Path(labels_path)
+        self.features_path = features_path
+        self.labels_path = labels_path
+        self._features_writer = None
+        self._labels_writer = None
+
+    def write(self, features: DataFrame, labels: DataFrame):
+        features = features.reset_index(drop=True)
+        labels = labels[[LABEL_COLUMN]].reset_index(drop=True)
+
+        if self._features_writer is None:
+            if self.single_file:
+                self._features_writer = ChunkWriter(
+                    self.features_path, schema=training_schema(features.columns)
+                )
+            else:
+                self._features_writer = ChunkWriter(self.features_path)
+                self._labels_writer = ChunkWriter(
+                    self.labels_path, schema=pa.schema([(LABEL_COLUMN, pa.int64())])
+                )
+
+        if self.single_file:
+            self._features_writer.write(concat([features, labels], axis=1))
+        else:
+            self._features_writer.write(features)
+            self._labels_writer.write(labels)
+
+    def close(self):
+        for writer in (self._features_writer, self._labels_writer):
+            if writer is not None:
+                writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
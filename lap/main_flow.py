@@ -1,23 +1,141 @@
+from pathlib import Path
+
 from prefect import flow
+import typer
 
+from lap import dataset, dataset_io, profiling, run_index, tracking
+from lap.config import (
+    CLEANED_DATA_PATH,
+    DATASET_FORMAT,
+    FEATURES_PATH,
+    LABELS_PATH,
+    MLFLOW_EXPERIMENT_NAME,
+    MLFLOW_TRACKING_URI,
+    MODELS_DIR,
+    RAW_DATA_DIR,
+    STAGE_CACHE_KEEP,
+)
 from lap.dataset import data_preprocessing_flow
+from lap.modeling import families, hp_optim, train
 from lap.modeling.hp_optim import hp_optim_flow
 from lap.modeling.train import final_training_flow
+from lap.stage_cache import StageCache
+
+app = typer.Typer()
+
+STAGES = ("data", "hp_optim", "training")
+
+
+def source_files(*modules) -> list[Path]:
+    return [Path(module.__file__) for module in modules]
+
+
+def with_downstream(stages) -> list[str]:
+    """The given stages and every stage after the earliest of them, in pipeline order."""
+    if not stages:
+        return []
+    return list(STAGES[min(STAGES.index(stage) for stage in stages) :])
 
 
 @flow(name="Main Pipeline for Processing Data and Retraining Model")
-def main():
+def main_flow(
+    raw_data_path: Path = RAW_DATA_DIR / "loan_pred.csv",
+    chunksize: int | None = None,
+    num_trials: int = 10,
+    n_jobs: int = 1,
+    force: bool = False,
+    invalidate: list[str] | None = None,
+):
     """
     The main production pipeline that runs all steps in order:
     1. Data Preprocessing
     2. Hyperparameter Optimization
     3. Final Model Training
+
+    Each stage is skipped when the stage cache holds its outputs for the same input files,
+    code and parameters; the cached outputs are restored instead. A stage's key includes
+    the key of the stage before it, so a change to a stage's inputs, code or parameters
+    reruns everything after it. `force` reruns every stage and `invalidate` drops the
+    cached outputs of the given stages and of every stage after them. Only the
+    STAGE_CACHE_KEEP most recently used keys of each stage are kept.
     """
-    # Call the flows directly. `wait_for` ensures they run in the correct order.
-    data_run = data_preprocessing_flow()
-    hp_run = hp_optim_flow(wait_for=[data_run])
-    final_training_flow(wait_for=[hp_run])
+    cache = StageCache()
+    for stage in with_downstream(invalidate):
+        cache.invalidate(stage)
+
+    preprocessor_path = MODELS_DIR / "preprocessor.pkl"
+    cleaner_path = MODELS_DIR / "cleaner.pkl"
+    _, data_key = cache.run(
+        "data",
+        lambda: data_preprocessing_flow(
+            raw_data_path=raw_data_path,
+            preprocessor_save_path=preprocessor_path,
+            cleaner_save_path=cleaner_path,
+            chunksize=chunksize,
+        ),
+        inputs=[raw_data_path],
+        code=source_files(dataset, dataset_io),
+        params={"chunksize": chunksize, "dataset_format": DATASET_FORMAT},
+        outputs=[CLEANED_DATA_PATH, FEATURES_PATH, LABELS_PATH, preprocessor_path, cleaner_path],
+        force=force,
+    )
+
+    _, hp_key = cache.run(
+        "hp_optim",
+        lambda: hp_optim_flow(num_trials=num_trials, n_jobs=n_jobs),
+        inputs=[FEATURES_PATH, LABELS_PATH],
+        code=source_files(hp_optim, families, dataset_io, tracking),
+        params={
+            "data": data_key,
+            "num_trials": num_trials,
+            "mlflow_tracking_uri": MLFLOW_TRACKING_URI,
+            "mlflow_experiment_name": MLFLOW_EXPERIMENT_NAME,
+        },
+        force=force,
+    )
+
+    model_path = MODELS_DIR / "model.pkl"
+    cache.run(
+        "training",
+        lambda: final_training_flow(model_output_path=model_path),
+        inputs=[FEATURES_PATH, LABELS_PATH],
+        code=source_files(train, families, dataset_io, run_index),
+        params={"hp_optim": hp_key},
+        outputs=[model_path],
+        force=force,
+    )
+    cache.prune(keep=STAGE_CACHE_KEEP)
+
+
+@app.command()
+def main(
+    raw_data_path: Path = RAW_DATA_DIR / "loan_pred.csv",
+    chunksize: int = typer.Option(None, help="Stream the raw data in chunks of this many rows."),
+    num_trials: int = 10,
+    n_jobs: int = typer.Option(1, help="Trials evaluated concurrently, -1 for all cores."),
+    force: bool = typer.Option(False, help="Rerun every stage, ignoring the stage cache."),
+    invalidate: list[str] = typer.Option(
+        None,
+        help=f"Drop the cached outputs of a stage ({', '.join(STAGES)}) and of the later ones. "
+        "Repeatable.",
+    ),
+    profile: str = typer.Option(None, help=profiling.PROFILE_HELP),
+):
+    """Runs the whole pipeline, reusing the outputs of unchanged stages."""
+    for stage in invalidate or ():
+        if stage not in STAGES:
+            raise typer.BadParameter(f"Unknown stage {stage!r}, expected one of {STAGES}.")
+
+    with profiling.session(profile, run_name="Main_Pipeline_Profile"):
+        main_flow(
+            raw_data_path=raw_data_path,
+            chunksize=chunksize,
+            num_trials=num_trials,
+            n_jobs=n_jobs,
+            force=force,
+            invalidate=invalidate,
+        )
 
 
 if __name__ == "__main__":
-    main()
+    app()
@@ -0,0 +1,93 @@
+from hyperopt import hp
+from hyperopt.pyll import scope
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.svm import SVC
+
+# "svc" is the exact kernel SVC. "kernel_approx" maps the features through an explicit
+# approximation of the RBF kernel (Nystroem or random Fourier features) and fits a linear
+# classifier on them, so training is linear in the rows and scoring does not depend on the
+# number of support vectors.
+MODEL_FAMILIES = ("svc", "kernel_approx")
+
+SEARCH_SPACES = {
+    "svc": {
+        "C": hp.loguniform("C", -2, 2),
+        "kernel": hp.choice("kernel", ["linear", "rbf", "poly"]),
+        "gamma": hp.loguniform("gamma", -2, 2),
+    },
+    "kernel_approx": {
+        "C": hp.loguniform("C", -2, 2),
+        "gamma": hp.loguniform("gamma", -4, 1),
+        "kernel_approximation": hp.choice("kernel_approximation", ["nystroem", "rbf_sampler"]),
+        "n_components": scope.int(hp.quniform("n_components", 50, 500, 50)),
+    },
+}
+
+# Hyperparameters of the model selection candidates.
+DEFAULT_PARAMS = {
+    "svc": {},
+    "kernel_approx": {
+        "C": 1.0,
+        "gamma": 0.1,
+        "kernel_approximation": "nystroem",
+        "n_components": 100,
+    },
+}
+
+MODEL_NAMES = {"svc": "SVC", "kernel_approx": "Kernel Approximation"}
+
+HP_OPTIM_RUN_NAMES = {
+    "svc": "SVC_Hyperparameter_Optimization",
+    "kernel_approx": "Kernel_Approximation_Hyperparameter_Optimization",
+}
+
+REGISTERED_MODEL_NAMES = {"svc": "svc-loan-predictor", "kernel_approx": "kernel-approx-predictor"}
+
+
+def check_family(model_family: str):
+    if model_family not in MODEL_FAMILIES:
+        raise ValueError(
+            f"Unknown model family {model_family!r}, expected one of {MODEL_FAMILIES}."
+        )
+
+
+def build_model(model_family: str, params: dict, random_state: int = 42, probability=False):
+    """Unfitted model of `model_family` with the given hyperparameters."""
+    check_family(model_family)
+
+    if model_family == "svc":
+        return SVC(**params, random_state=random_state, probability=probability)
+
+    params = dict(params)
+    approximation = {"nystroem": Nystroem, "rbf_sampler": RBFSampler}[
+        params.pop("kernel_approximation")
+    ]
+    return Pipeline(
+        steps=[
+            (
+                "features",
+                approximation(
+                    gamma=params.pop("gamma"),
+                    n_components=params.pop("n_components"),
+                    random_state=random_state,
+                ),
+            ),
+            ("classifier", LogisticRegression(**params, max_iter=1000, random_state=random_state)),
+        ]
+    )
+
+
+def parse_params(model_family: str, params: dict) -> dict:
+    """Converts hyperparameters read back from MLflow, where they are strings, to their types."""
+    check_family(model_family)
+    parsed = dict(params)
+
+    for key in ("C", "gamma"):
+        if key in parsed:
+            parsed[key] = float(parsed[key])
+    if "n_components" in parsed:
+        parsed["n_components"] = int(float(parsed["n_components"]))
+
+    return parsed
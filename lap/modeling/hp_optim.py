@@ -1,96 +1,486 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+import os
 from pathlib import Path
+import time
 
-from hyperopt import STATUS_OK, Trials, fmin, hp, space_eval, tpe
+from hyperopt import STATUS_OK, Trials, fmin, space_eval, tpe
+from hyperopt.base import JOB_STATE_DONE, JOB_STATE_RUNNING, Domain, spec_from_misc
+from hyperopt.pyll.stochastic import sample
+from hyperopt.utils import coarse_utcnow
 from loguru import logger
 import mlflow
-from pandas import DataFrame, read_csv
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
+import numpy as np
+from pandas import DataFrame
 from prefect import flow, get_run_logger, task
-from sklearn.model_selection import cross_val_score, train_test_split
-from sklearn.svm import SVC
+from sklearn.metrics import f1_score
+from sklearn.model_selection import StratifiedKFold, cross_val_score, train_test_split
 import typer
 
-from lap.config import MLFLOW_EXPERIMENT_NAME, MLFLOW_TRACKING_URI, PROCESSED_DATA_DIR
+from lap import profiling, tracking
+from lap.config import FEATURES_PATH, LABELS_PATH, MLFLOW_EXPERIMENT_NAME, MLFLOW_TRACKING_URI
+from lap.dataset_io import read_training_data
+from lap.modeling.families import (
+    HP_OPTIM_RUN_NAMES,
+    MODEL_NAMES,
+    SEARCH_SPACES,
+    build_model,
+    check_family,
+)
 
 app = typer.Typer()
 
+# Smallest training subset of a successive halving rung, so early folds stay meaningful.
+MIN_RUNG_ROWS = 100
+
+
+def cv_score(
+    params: dict, X_train: DataFrame, y_train, cv_n_jobs: int = 1, model_family: str = "svc"
+) -> float:
+    """Mean 5-fold weighted F1 of a `model_family` model with the given hyperparameters."""
+    model = build_model(model_family, params)
+    return cross_val_score(
+        model, X_train, y_train, cv=5, scoring="f1_weighted", n_jobs=cv_n_jobs
+    ).mean()
+
+
+# State of each worker process of the parallel search, set once by `_init_worker`.
+_worker_state = {}
+
+
+def _init_worker(
+    X_train, y_train, tracking_uri, experiment_id, parent_run_id, cv_n_jobs, model_family
+):
+    mlflow.set_tracking_uri(tracking_uri)
+    _worker_state.update(
+        X_train=X_train,
+        y_train=y_train,
+        experiment_id=experiment_id,
+        parent_run_id=parent_run_id,
+        cv_n_jobs=cv_n_jobs,
+        model_family=model_family,
+    )
+
+
+def _evaluate_trial(params: dict) -> dict:
+    # Workers have no active parent run, so the nested run is linked through its tag.
+    with tracking.start_run(
+        experiment_id=_worker_state["experiment_id"],
+        tags={
+            MLFLOW_PARENT_RUN_ID: _worker_state["parent_run_id"],
+            "model_name": MODEL_NAMES[_worker_state["model_family"]],
+        },
+    ) as run_logger:
+        run_logger.log_params(params)
+
+        score = cv_score(
+            params,
+            _worker_state["X_train"],
+            _worker_state["y_train"],
+            _worker_state["cv_n_jobs"],
+            _worker_state["model_family"],
+        )
+
+        run_logger.log_metric("f1_weighted_cv_score", score)
+
+    return {"loss": -score, "status": STATUS_OK}
+
+
+def parallel_search(
+    X_train: DataFrame,
+    y_train,
+    num_trials: int,
+    n_jobs: int,
+    cv_n_jobs: int = 1,
+    model_family: str = "svc",
+) -> Trials:
+    """
+    Runs the TPE search with up to `n_jobs` trials evaluated concurrently in worker processes.
+
+    Whenever workers free up, TPE is asked for one suggestion per free worker, based on all
+    the trials finished so far. Past its random startup trials `tpe.suggest` only returns
+    one suggestion per call, so it is called once per worker, each time with its own seed.
+    Each trial logs its own MLflow run, nested under the active run.
+    """
+    parent_run = mlflow.active_run()
+    search_space = SEARCH_SPACES[model_family]
+    domain = Domain(lambda params: None, search_space)
+    trials = Trials()
+    rstate = np.random.default_rng()
+
+    executor = ProcessPoolExecutor(
+        max_workers=n_jobs,
+        mp_context=get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(
+            X_train,
+            y_train,
+            mlflow.get_tracking_uri(),
+            parent_run.info.experiment_id,
+            parent_run.info.run_id,
+            cv_n_jobs,
+            model_family,
+        ),
+    )
+
+    pending = {}
+    n_submitted = 0
+
+    with executor:
+        while n_submitted < num_trials or pending:
+            n_free = min(n_jobs - len(pending), num_trials - n_submitted)
+
+            if n_free > 0:
+                new_ids = trials.new_trial_ids(n_free)
+                trials.refresh()
+                docs = [
+                    doc
+                    for new_id in new_ids
+                    for doc in tpe.suggest([new_id], domain, trials, rstate.integers(2**31 - 1))
+                ]
+
+                for doc in docs:
+                    doc["state"] = JOB_STATE_RUNNING
+                    doc["book_time"] = coarse_utcnow()
+
+                trials.insert_trial_docs(docs)
+                trials.refresh()
+
+                for doc in docs:
+                    params = space_eval(search_space, spec_from_misc(doc["misc"]))
+                    pending[executor.submit(_evaluate_trial, params)] = doc
+                n_submitted += len(docs)
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                doc = pending.pop(future)
+                doc["result"] = future.result()
+                doc["state"] = JOB_STATE_DONE
+                doc["refresh_time"] = coarse_utcnow()
+
+            trials.refresh()
+            logger.info(f"Finished {len(trials.losses()) - len(pending)}/{num_trials} trials")
+
+    return trials
+
+
+def budgeted_cv_score(
+    params: dict,
+    X,
+    y,
+    folds: int,
+    time_budget: float | None = None,
+    model_family: str = "svc",
+) -> tuple[float, bool]:
+    """
+    Mean stratified k-fold weighted F1, fitted fold by fold.
+
+    Returns the score and whether `time_budget` seconds ran out. The budget is checked
+    after every fold, so an over-budget trial stops without fitting its remaining folds.
+    """
+    start = time.perf_counter()
+    scores = []
+
+    for train_index, test_index in StratifiedKFold(n_splits=folds).split(X, y):
+        model = build_model(model_family, params)
+        model.fit(X.iloc[train_index], y[train_index])
+        scores.append(
+            f1_score(y[test_index], model.predict(X.iloc[test_index]), average="weighted")
+        )
+
+        if time_budget is not None and time.perf_counter() - start > time_budget:
+            return float(np.mean(scores)), True
+
+    return float(np.mean(scores)), False
+
+
+def halving_schedule(num_trials: int, eta: int = 3, min_folds: int = 2, max_folds: int = 5):
+    """
+    Rungs of the successive halving search as (candidates, data fraction, folds).
+
+    Every rung keeps the best 1/`eta` of the candidates, on `eta` times more data and
+    more folds, until the last rung scores the survivors on the full training set with
+    `max_folds` folds.
+    """
+    n_rungs = 1
+    while num_trials // eta**n_rungs >= 1:
+        n_rungs += 1
+
+    schedule = []
+    for rung in range(n_rungs):
+        progress = rung / (n_rungs - 1) if n_rungs > 1 else 1.0
+        schedule.append(
+            (
+                max(num_trials // eta**rung, 1),
+                float(eta ** (rung - n_rungs + 1)),
+                round(min_folds + (max_folds - min_folds) * progress),
+            )
+        )
+    return schedule
+
+
+def successive_halving_search(
+    X_train: DataFrame,
+    y_train,
+    num_trials: int,
+    eta: int = 3,
+    trial_time_budget: float | None = None,
+    seed: int = 42,
+    model_family: str = "svc",
+) -> list[dict]:
+    """
+    Scores `num_trials` random candidates from the search space with successive halving.
+
+    Candidates are scored on growing, nested subsets of the training data with a growing
+    number of folds, and only the best 1/`eta` move on to the next rung. Candidates that
+    exceed `trial_time_budget` seconds in total are pruned on the spot. Each candidate
+    logs a nested MLflow run once it is pruned or finishes the last rung, with its score
+    per rung and `pruned`/`pruned_at_rung`/`prune_reason` tags.
+    """
+    rng = np.random.default_rng(seed)
+    schedule = halving_schedule(num_trials, eta=eta)
+    order = rng.permutation(len(X_train))
+
+    candidates = [
+        {"params": sample(SEARCH_SPACES[model_family], rng=rng), "scores": [], "elapsed": 0.0}
+        for _ in range(num_trials)
+    ]
+    alive = candidates
+
+    def log_candidate(candidate, pruned_at_rung=None, prune_reason=None):
+        with tracking.start_run(nested=True) as run_logger:
+            run_logger.set_tags(
+                {
+                    "model_name": MODEL_NAMES[model_family],
+                    "search_mode": "halving",
+                    "pruned": str(pruned_at_rung is not None).lower(),
+                }
+            )
+            if pruned_at_rung is not None:
+                run_logger.set_tags(
+                    {"pruned_at_rung": pruned_at_rung, "prune_reason": prune_reason}
+                )
+            run_logger.log_params(candidate["params"])
+            for rung, score in enumerate(candidate["scores"]):
+                run_logger.log_metric("f1_weighted_cv_score", score, step=rung)
+            run_logger.log_metric("trial_time_s", candidate["elapsed"])
+
+    for rung, (_, fraction, folds) in enumerate(schedule):
+        subset = order[: max(int(len(order) * fraction), min(MIN_RUNG_ROWS, len(order)))]
+        X_rung, y_rung = X_train.iloc[subset], y_train[subset]
+        logger.info(
+            f"Rung {rung}: {len(alive)} candidates on {len(subset)} rows with {folds} folds"
+        )
+
+        scored = []
+        for candidate in alive:
+            budget = None
+            if trial_time_budget is not None:
+                budget = trial_time_budget - candidate["elapsed"]
+
+            start = time.perf_counter()
+            score, timed_out = budgeted_cv_score(
+                candidate["params"],
+                X_rung,
+                y_rung,
+                folds,
+                time_budget=budget,
+                model_family=model_family,
+            )
+            candidate["elapsed"] += time.perf_counter() - start
+            candidate["scores"].append(score)
+
+            if timed_out:
+                candidate["status"] = "pruned"
+                log_candidate(candidate, pruned_at_rung=rung, prune_reason="time_budget")
+            else:
+                scored.append(candidate)
+
+        scored.sort(key=lambda candidate: candidate["scores"][-1], reverse=True)
+        is_last_rung = rung == len(schedule) - 1
+        survivors = scored if is_last_rung else scored[: schedule[rung + 1][0]]
+
+        for candidate in scored[len(survivors) :]:
+            candidate["status"] = "pruned"
+            log_candidate(candidate, pruned_at_rung=rung, prune_reason="rank")
+
+        alive = survivors
+        if not alive:
+            break
+
+    for candidate in alive:
+        candidate["status"] = "completed"
+        log_candidate(candidate)
+
+    pruned = sum(candidate["status"] == "pruned" for candidate in candidates)
+    logger.info(f"Successive halving pruned {pruned}/{num_trials} candidates")
+
+    return candidates
+
 
 @task(name="hyperparameter_optimization")
+@profiling.profiled
 def optimize_hyperparameters(
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
     num_trials: int = 10,
+    n_jobs: int = 1,
+    cv_n_jobs: int = 1,
+    search_mode: str = "tpe",
+    eta: int = 3,
+    trial_time_budget: float | None = None,
+    model_family: str = "svc",
 ):
-    """This function will perform hyperparameter optimization for the SVC model."""
+    """
+    This function will perform hyperparameter optimization for the `model_family` model,
+    the exact SVC or the kernel approximation (see lap/modeling/families.py).
+
+    With `n_jobs` > 1 (or -1 for all cores) trials run concurrently in a process pool,
+    `cv_n_jobs` parallelizes the cross-validation folds of each trial.
+
+    `search_mode="halving"` replaces TPE with successive halving over `num_trials` random
+    candidates, pruning the worst on small subsets of the data and any candidate that
+    runs over `trial_time_budget` seconds.
+    """
+
+    check_family(model_family)
+    search_space = SEARCH_SPACES[model_family]
 
     logger.info("Reading features and labels...")
-    features: DataFrame = read_csv(features_path)
-    labels: DataFrame = read_csv(labels_path)
+    features, labels = read_training_data(features_path, labels_path)
 
     X_train, _, y_train, _ = train_test_split(features, labels, test_size=0.2, random_state=42)
 
-    def objective(params):
-        with mlflow.start_run(nested=True):
-            mlflow.set_tag("model_name", "SVC")
-            mlflow.log_params(params)
+    if n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    if search_mode == "halving":
+        logger.info(f"Running successive halving over {num_trials} candidates...")
+        candidates = successive_halving_search(
+            X_train,
+            y_train.values.ravel(),
+            num_trials,
+            eta=eta,
+            trial_time_budget=trial_time_budget,
+            model_family=model_family,
+        )
+        completed = [c for c in candidates if c["status"] == "completed"]
+        if not completed:
+            raise ValueError("Every candidate was pruned, increase the trial time budget.")
 
-            model = SVC(**params, random_state=42)
+        best = max(completed, key=lambda candidate: candidate["scores"][-1])
+        best_params, best_score = best["params"], best["scores"][-1]
+    elif search_mode != "tpe":
+        raise ValueError(f"Unknown search mode {search_mode!r}, expected 'tpe' or 'halving'.")
+    elif n_jobs > 1:
+        logger.info(f"Running {num_trials} trials on {n_jobs} worker processes...")
+        trials = parallel_search(
+            X_train,
+            y_train.values.ravel(),
+            num_trials,
+            n_jobs=n_jobs,
+            cv_n_jobs=cv_n_jobs,
+            model_family=model_family,
+        )
+        best_params_raw = trials.argmin
+    else:
 
-            score = cross_val_score(
-                model, X_train, y_train.values.ravel(), cv=5, scoring="f1_weighted"
-            ).mean()
+        def objective(params):
+            with tracking.start_run(nested=True) as run_logger:
+                run_logger.set_tag("model_name", MODEL_NAMES[model_family])
+                run_logger.log_params(params)
 
-            mlflow.log_metric("f1_weighted_cv_score", score)
+                score = cv_score(params, X_train, y_train.values.ravel(), cv_n_jobs, model_family)
 
-            return {"loss": -score, "status": STATUS_OK}
+                run_logger.log_metric("f1_weighted_cv_score", score)
 
-    search_space = {
-        "C": hp.loguniform("C", -2, 2),
-        "kernel": hp.choice("kernel", ["linear", "rbf", "poly"]),
-        "gamma": hp.loguniform("gamma", -2, 2),
-    }
+                return {"loss": -score, "status": STATUS_OK}
 
-    trials = Trials()
-    best_params_raw = fmin(
-        fn=objective, space=search_space, algo=tpe.suggest, max_evals=num_trials, trials=trials
-    )
+        trials = Trials()
+        best_params_raw = fmin(
+            fn=objective,
+            space=search_space,
+            algo=tpe.suggest,
+            max_evals=num_trials,
+            trials=trials,
+        )
+
+    if search_mode == "tpe":
+        best_params = space_eval(search_space, best_params_raw)
+        best_score = -sorted(trials.results, key=lambda x: x["loss"])[0]["loss"]
 
-    best_params = space_eval(search_space, best_params_raw)
     logger.info(f"Best parameters found: {best_params}")
 
     # Log the best trial information to the parent run
-    best_run = sorted(trials.results, key=lambda x: x["loss"])[0]
-    mlflow.log_metric("best_cv_f1_score", -best_run["loss"])
+    mlflow.set_tags({"search_mode": search_mode, "model_family": model_family})
+    mlflow.log_metric("best_cv_f1_score", best_score)
     mlflow.log_params(best_params)
 
-    return trials
+    return best_params
 
 
 @flow(name="Hyperparameter Optimization")
 def hp_optim_flow(
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
     num_trials: int = 10,
+    n_jobs: int = 1,
+    cv_n_jobs: int = 1,
+    search_mode: str = "tpe",
+    eta: int = 3,
+    trial_time_budget: float | None = None,
+    model_family: str = "svc",
 ):
+    check_family(model_family)
+
     logger.remove()
     logger.add(sink=get_run_logger().info, format="{message}")
 
     mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
     mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
 
-    with mlflow.start_run(run_name="SVC_Hyperparameter_Optimization"):
-        optimize_hyperparameters(
-            features_path=features_path, labels_path=labels_path, num_trials=num_trials
+    with mlflow.start_run(run_name=HP_OPTIM_RUN_NAMES[model_family]):
+        return optimize_hyperparameters(
+            features_path=features_path,
+            labels_path=labels_path,
+            num_trials=num_trials,
+            n_jobs=n_jobs,
+            cv_n_jobs=cv_n_jobs,
+            search_mode=search_mode,
+            eta=eta,
+            trial_time_budget=trial_time_budget,
+            model_family=model_family,
         )
 
 
 @app.command()
 def main(
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
     num_trials: int = 10,
+    n_jobs: int = typer.Option(1, help="Trials evaluated concurrently, -1 for all cores."),
+    cv_n_jobs: int = typer.Option(1, help="Parallel cross-validation folds per trial."),
+    search_mode: str = typer.Option("tpe", help="'tpe' or 'halving' (successive halving)."),
+    eta: int = typer.Option(3, help="Halving rate of the successive halving search."),
+    trial_time_budget: float = typer.Option(None, help="Seconds per halving candidate."),
+    model_family: str = typer.Option("svc", help="'svc' or 'kernel_approx'."),
+    profile: str = typer.Option(None, help=profiling.PROFILE_HELP),
 ):
     """Runs the hyperparameter optimization flow."""
-    hp_optim_flow(features_path=features_path, labels_path=labels_path, num_trials=num_trials)
+    with profiling.session(profile, run_name="Hyperparameter_Optimization_Profile"):
+        hp_optim_flow(
+            features_path=features_path,
+            labels_path=labels_path,
+            num_trials=num_trials,
+            n_jobs=n_jobs,
+            cv_n_jobs=cv_n_jobs,
+            search_mode=search_mode,
+            eta=eta,
+            trial_time_budget=trial_time_budget,
+            model_family=model_family,
+        )
 
 
 if __name__ == "__main__":
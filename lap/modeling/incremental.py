@@ -0,0 +1,398 @@
+from copy import deepcopy
+import hashlib
+from pathlib import Path
+from pickle import dump
+import shutil
+import time
+
+import joblib
+from loguru import logger
+import mlflow
+from mlflow.models import infer_signature
+import numpy as np
+from prefect import flow, get_run_logger, task
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import f1_score
+import typer
+
+from lap import profiling, tracking
+from lap.config import MLFLOW_EXPERIMENT_NAME, MLFLOW_TRACKING_URI, MODELS_DIR, RAW_DATA_DIR
+from lap.dataset import RAW_CSV_DTYPES, ChunkStatistics, apply_cleaner, prepare_raw_data
+from lap.dataset_io import LABEL_COLUMN, iter_table_chunks
+
+app = typer.Typer()
+
+CLASSES = np.array([0, 1])
+
+# Bytes of the raw file fingerprinted to detect history being rewritten instead of appended.
+HEAD_BYTES = 64 * 1024
+
+
+class IncrementalState:
+    """
+    What an incremental retrain keeps from the previous one.
+
+    `statistics` covers every raw row ingested so far, `reference` only the rows of the
+    last full refit, against which new rows are checked for drift.
+    """
+
+    def __init__(self, model, statistics, reference, rows_seen, head_digest):
+        self.model = model
+        self.statistics = statistics
+        self.reference = reference
+        self.rows_seen = rows_seen
+        self.head_digest = head_digest
+        self.cleaner = statistics.fit_cleaner()
+        self.preprocessor = statistics.fit_preprocessor()
+
+
+def head_digest(path: Path, n_bytes: int = HEAD_BYTES) -> tuple[int, str]:
+    """Length and sha256 of the first `n_bytes` of a file, fewer if it is shorter."""
+    with open(path, "rb") as f:
+        head = f.read(n_bytes)
+    return len(head), hashlib.sha256(head).hexdigest()
+
+
+def read_prepared_chunks(path: Path, chunksize: int, skip_rows: int = 0):
+    for chunk in iter_table_chunks(path, chunksize, dtype=RAW_CSV_DTYPES, skip_rows=skip_rows):
+        yield prepare_raw_data(chunk)
+
+
+def transform_chunk(state: IncrementalState, prepared_df):
+    cleaned_df = apply_cleaner(state.cleaner, prepared_df)
+    features = state.preprocessor.transform(cleaned_df.drop(columns=[LABEL_COLUMN]))
+    return features, cleaned_df[LABEL_COLUMN].to_numpy()
+
+
+def drift_report(reference: ChunkStatistics, batch: ChunkStatistics) -> dict:
+    """
+    Drift of a batch of new rows from the rows of the last full refit.
+
+    `mean_shift` is the largest shift of a numerical column mean, in reference standard
+    deviations, `label_shift` the change of the approval rate. New categories change the
+    encoded feature space, so the warm-started model cannot take them.
+    """
+    scale = np.sqrt(reference.scaler.var_)
+    scale = np.where(scale == 0, 1.0, scale)
+
+    return {
+        "mean_shift": float(
+            np.nanmax(np.abs(batch.scaler.mean_ - reference.scaler.mean_) / scale)
+        ),
+        "label_shift": abs(
+            batch.positives / batch.n_rows - reference.positives / reference.n_rows
+        ),
+        "new_categories": {
+            col: sorted(set(counts) - set(reference.value_counts[col]), key=str)
+            for col, counts in batch.value_counts.items()
+            if set(counts) - set(reference.value_counts[col])
+        },
+    }
+
+
+def refit_reason(
+    drift: dict,
+    reference_rows: int,
+    rows_since_refit: int,
+    max_mean_shift: float,
+    max_label_shift: float,
+    max_new_fraction: float,
+) -> str | None:
+    """Why the drift calls for a full refit, None when a partial fit is enough."""
+    if drift["new_categories"]:
+        return f"new categories {drift['new_categories']}"
+    if drift["mean_shift"] > max_mean_shift:
+        return f"mean shift {drift['mean_shift']:.3f} > {max_mean_shift}"
+    if drift["label_shift"] > max_label_shift:
+        return f"label shift {drift['label_shift']:.3f} > {max_label_shift}"
+    if rows_since_refit > max_new_fraction * reference_rows:
+        return f"{rows_since_refit} rows since the last full refit"
+    return None
+
+
+def fit_full_history(
+    raw_data_path: Path, chunksize: int, epochs: int, seed: int = 42
+) -> IncrementalState:
+    """Refits the cleaner, the preprocessor and an SGD model on the whole raw data."""
+    statistics = ChunkStatistics()
+    for prepared_df in read_prepared_chunks(raw_data_path, chunksize):
+        statistics.update(prepared_df)
+
+    model = SGDClassifier(loss="log_loss", random_state=seed)
+    state = IncrementalState(
+        model=model,
+        statistics=statistics,
+        reference=deepcopy(statistics),
+        rows_seen=statistics.n_rows,
+        head_digest=head_digest(raw_data_path),
+    )
+
+    for _ in range(epochs):
+        for prepared_df in read_prepared_chunks(raw_data_path, chunksize):
+            model.partial_fit(*transform_chunk(state, prepared_df), classes=CLASSES)
+
+    return state
+
+
+@task(name="incremental_retrain")
+@profiling.profiled
+def incremental_retrain(
+    state: IncrementalState | None,
+    raw_data_path: Path = RAW_DATA_DIR / "loan_pred.csv",
+    chunksize: int = 100_000,
+    epochs: int = 5,
+    max_mean_shift: float = 0.25,
+    max_label_shift: float = 0.1,
+    max_new_fraction: float = 1.0,
+) -> tuple[IncrementalState, dict]:
+    """
+    Updates the model with the raw rows appended since `state` was saved.
+
+    The new rows are read twice: once to update the cleaning and preprocessing statistics
+    and check them for drift, once to score them with the current model and then
+    partially fit it. The whole history is refitted only without a state, when the start
+    of the raw file changed, or when the drift crosses a threshold. The scaler moments move
+    with every update, `max_mean_shift` bounds how far they get from the ones the model
+    was first fitted with.
+    """
+    start = time.perf_counter()
+    report = {"rows_seen": state.rows_seen if state else 0, "rows_ingested": 0}
+
+    reason = None
+    if state is None:
+        reason = "no previous state"
+    elif head_digest(raw_data_path, state.head_digest[0]) != state.head_digest:
+        reason = "raw data history changed"
+
+    if reason is None:
+        statistics = deepcopy(state.statistics)
+        batch = ChunkStatistics()
+        for prepared_df in read_prepared_chunks(raw_data_path, chunksize, state.rows_seen):
+            statistics.update(prepared_df)
+            batch.update(prepared_df)
+
+        if batch.n_rows == 0:
+            logger.info("No new rows since the last retrain.")
+            return state, report | {"mode": "up_to_date"}
+
+        drift = drift_report(state.reference, batch)
+        report |= {"mean_shift": drift["mean_shift"], "label_shift": drift["label_shift"]}
+        reason = refit_reason(
+            drift,
+            reference_rows=state.reference.n_rows,
+            rows_since_refit=statistics.n_rows - state.reference.n_rows,
+            max_mean_shift=max_mean_shift,
+            max_label_shift=max_label_shift,
+            max_new_fraction=max_new_fraction,
+        )
+
+    if reason is not None:
+        logger.info(f"Full refit: {reason}")
+        rows_seen = report["rows_seen"]
+        state = fit_full_history(raw_data_path, chunksize, epochs)
+        return state, report | {
+            "mode": "full",
+            "reason": reason,
+            "rows_ingested": state.rows_seen - rows_seen,
+            "rows_seen": state.rows_seen,
+            "train_time_s": time.perf_counter() - start,
+        }
+
+    logger.info(f"Partial fit on {batch.n_rows} new rows")
+    previous_rows = state.rows_seen
+    state = IncrementalState(
+        model=deepcopy(state.model),
+        statistics=statistics,
+        reference=state.reference,
+        rows_seen=statistics.n_rows,
+        head_digest=state.head_digest,
+    )
+
+    y_true, y_pred = [], []
+    for prepared_df in read_prepared_chunks(raw_data_path, chunksize, previous_rows):
+        features, labels = transform_chunk(state, prepared_df)
+        # Scored before the model sees them, so this is an out-of-sample F1.
+        y_true.append(labels)
+        y_pred.append(state.model.predict(features))
+        state.model.partial_fit(features, labels, classes=CLASSES)
+
+    return state, report | {
+        "mode": "partial",
+        "rows_ingested": batch.n_rows,
+        "rows_seen": state.rows_seen,
+        "new_rows_f1": f1_score(
+            np.concatenate(y_true), np.concatenate(y_pred), average="weighted"
+        ),
+        "train_time_s": time.perf_counter() - start,
+    }
+
+
+@task(name="save_incremental_artifacts")
+@profiling.profiled
+def save_artifacts(
+    state: IncrementalState,
+    state_path: Path,
+    model_output_path: Path,
+    preprocessor_save_path: Path,
+    cleaner_save_path: Path,
+):
+    """Saves the state for the next retrain and the artifacts served with the model."""
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    joblib.dump(state, state_path)
+    joblib.dump(state.model, model_output_path)
+
+    with open(cleaner_save_path, "wb") as f:
+        dump(state.cleaner, f)
+    with open(preprocessor_save_path, "wb") as f:
+        dump(state.preprocessor, f)
+    logger.success(f"Saved the model to {model_output_path} and the state to {state_path}")
+
+
+@task(name="promote_incremental_artifacts")
+@profiling.profiled
+def promote_artifacts(
+    model_output_path: Path,
+    preprocessor_save_path: Path,
+    cleaner_save_path: Path,
+    production_dir: Path = MODELS_DIR,
+):
+    """
+    Replaces the served model, preprocessor and cleaner in `production_dir` with the SGD
+    ones.
+
+    The serving bundle and `preprocessor.json` are built from these files and have to be
+    rebuilt afterwards. The surrogate only applies to the SVC.
+    """
+    for source, name in (
+        (model_output_path, "model.pkl"),
+        (preprocessor_save_path, "preprocessor.pkl"),
+        (cleaner_save_path, "cleaner.pkl"),
+    ):
+        shutil.copyfile(source, production_dir / name)
+    logger.warning(
+        f"Promoted the SGD model to {production_dir / 'model.pkl'}, "
+        "rebuild the serving bundle with `make bundle`."
+    )
+
+
+@flow(name="Incremental Model Training")
+def incremental_training_flow(
+    model_name: str = "sgd-loan-predictor",
+    raw_data_path: Path = RAW_DATA_DIR / "loan_pred.csv",
+    state_path: Path = MODELS_DIR / "incremental_state.joblib",
+    model_output_path: Path = MODELS_DIR / "sgd_model.pkl",
+    preprocessor_save_path: Path = MODELS_DIR / "sgd_preprocessor.pkl",
+    cleaner_save_path: Path = MODELS_DIR / "sgd_cleaner.pkl",
+    chunksize: int = 100_000,
+    epochs: int = 5,
+    max_mean_shift: float = 0.25,
+    max_label_shift: float = 0.1,
+    max_new_fraction: float = 1.0,
+    full_refit: bool = False,
+    promote: bool = False,
+):
+    """
+    Retrains an SGD model on the rows appended to the raw data since the last run.
+
+    The artifacts are written next to the production ones, which they only replace with
+    `promote`.
+    """
+    logger.remove()
+    logger.add(sink=get_run_logger().info, format="{message}")
+
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+
+    state = None
+    if state_path.exists() and not full_refit:
+        state = joblib.load(state_path)
+
+    state, report = incremental_retrain(
+        state,
+        raw_data_path=raw_data_path,
+        chunksize=chunksize,
+        epochs=epochs,
+        max_mean_shift=max_mean_shift,
+        max_label_shift=max_label_shift,
+        max_new_fraction=max_new_fraction,
+    )
+    if report["mode"] == "up_to_date":
+        return report
+
+    save_artifacts(state, state_path, model_output_path, preprocessor_save_path, cleaner_save_path)
+    if promote:
+        promote_artifacts(model_output_path, preprocessor_save_path, cleaner_save_path)
+
+    with tracking.start_run(run_name="Incremental_Training") as run_logger:
+        run_logger.set_tags({"mode": report["mode"], "refit_reason": report.get("reason", "")})
+        run_logger.log_params(
+            {
+                "epochs": epochs,
+                "max_mean_shift": max_mean_shift,
+                "max_label_shift": max_label_shift,
+                "max_new_fraction": max_new_fraction,
+            }
+        )
+        run_logger.log_metrics(
+            {key: value for key, value in report.items() if key not in ("mode", "reason")}
+        )
+        run_logger.flush()
+
+        features, _ = transform_chunk(
+            state, next(read_prepared_chunks(raw_data_path, chunksize=100))
+        )
+        model_info = mlflow.sklearn.log_model(
+            sk_model=state.model,
+            name="model",
+            signature=infer_signature(features, state.model.predict(features)),
+            registered_model_name=model_name,
+        )
+    logger.success(
+        f"{report['mode'].capitalize()} retrain registered as '{model_name}' "
+        f"version {model_info.registered_model_version}."
+    )
+    return report
+
+
+@app.command()
+def main(
+    model_name: str = "sgd-loan-predictor",
+    raw_data_path: Path = RAW_DATA_DIR / "loan_pred.csv",
+    state_path: Path = MODELS_DIR / "incremental_state.joblib",
+    model_output_path: Path = MODELS_DIR / "sgd_model.pkl",
+    chunksize: int = typer.Option(100_000, help="Rows of raw data read at a time."),
+    epochs: int = typer.Option(5, help="Passes over the whole history on a full refit."),
+    max_mean_shift: float = typer.Option(
+        0.25, help="Numerical mean shift, in standard deviations, that forces a full refit."
+    ),
+    max_label_shift: float = typer.Option(
+        0.1, help="Approval rate change that forces a full refit."
+    ),
+    max_new_fraction: float = typer.Option(
+        1.0, help="New rows, as a fraction of the last full refit, that force a full refit."
+    ),
+    full_refit: bool = typer.Option(False, help="Refit on the whole history."),
+    promote: bool = typer.Option(
+        False, help="Replace the served model.pkl, preprocessor.pkl and cleaner.pkl."
+    ),
+    profile: str = typer.Option(None, help=profiling.PROFILE_HELP),
+):
+    """Runs the incremental training flow."""
+    with profiling.session(profile, run_name="Incremental_Training_Profile"):
+        incremental_training_flow(
+            model_name=model_name,
+            raw_data_path=raw_data_path,
+            state_path=state_path,
+            model_output_path=model_output_path,
+            chunksize=chunksize,
+            epochs=epochs,
+            max_mean_shift=max_mean_shift,
+            max_label_shift=max_label_shift,
+            max_new_fraction=max_new_fraction,
+            full_refit=full_refit,
+            promote=promote,
+        )
+
+
+if __name__ == "__main__":
+    app()
@@ -1,10 +1,13 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+import os
 from pathlib import Path
+import time
 
 from loguru import logger
 import mlflow
-from mlflow.client import MlflowClient
 from mlflow.models import infer_signature
-from pandas import DataFrame, read_csv
+from pandas import DataFrame
 from prefect import flow, get_run_logger, task
 from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
@@ -15,7 +18,11 @@ from tqdm import tqdm
 import typer
 from xgboost import XGBClassifier
 
-from lap.config import MLFLOW_EXPERIMENT_NAME, MLFLOW_TRACKING_URI, PROCESSED_DATA_DIR
+from lap import profiling, tracking
+from lap.config import FEATURES_PATH, LABELS_PATH, MLFLOW_EXPERIMENT_NAME, MLFLOW_TRACKING_URI
+from lap.dataset_io import read_training_data
+from lap.modeling.families import DEFAULT_PARAMS, build_model
+from lap.run_index import RunIndex
 
 app = typer.Typer()
 
@@ -35,94 +42,153 @@ def get_metrics(y_true, y_pred, training: bool = True):
     }
 
 
-@task(
-    name="train_model",
-)
-def train_model(
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
-):
-    """This function will train a number of models and log them to MLflow."""
+def fit_and_evaluate(model, X_train, y_train, X_test, y_test) -> dict:
+    """Fits `model`, then returns it with its metrics, fit and predict times."""
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_time = time.perf_counter() - start
 
-    logger.info("Reading features and labels...")
-    features: DataFrame = read_csv(features_path)
-    labels: DataFrame = read_csv(labels_path)
+    start = time.perf_counter()
+    y_tr_pred = model.predict(X_train)
+    y_test_pred = model.predict(X_test)
+    predict_time = time.perf_counter() - start
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        features, labels, test_size=0.2, random_state=42
-    )
+    return {
+        "model": model,
+        "y_tr_pred": y_tr_pred,
+        "metrics": {
+            **get_metrics(y_train, y_tr_pred, training=True),
+            **get_metrics(y_test, y_test_pred, training=False),
+            "fit_time": fit_time,
+            "predict_time": predict_time,
+        },
+    }
+
+
+def log_model_run(model_name: str, X_train: DataFrame, result: dict):
+    """Logs a fitted candidate model, its parameters and metrics as one MLflow run."""
+    model = result["model"]
+
+    with tracking.start_run(run_name=model_name) as run_logger:
+        run_logger.set_tag("model_name", model_name)
+        run_logger.log_params(model.get_params())
+
+        # Log both training and test metrics, and the timings
+        run_logger.log_metrics(result["metrics"])
+
+        signature = infer_signature(X_train, result["y_tr_pred"])
+        # Tree ensembles are not loadable with skops' default trusted types.
+        mlflow.sklearn.log_model(
+            sk_model=model, name="model", signature=signature, serialization_format="cloudpickle"
+        )
+
+    logger.success(f"{model_name} trained and logged successfully.")
 
-    models = {
+
+def candidate_models() -> dict:
+    """Default models compared by `train_model`, by name."""
+    return {
         "Logistic Regression": LogisticRegression(random_state=42),
         "RandomForest Classifier": RandomForestClassifier(random_state=42),
         "Gradient Boosting Classifier": GradientBoostingClassifier(random_state=42),
         "Support Vector Classifier": SVC(random_state=42),
+        "Kernel Approximation Classifier": build_model(
+            "kernel_approx", DEFAULT_PARAMS["kernel_approx"]
+        ),
         "XGBoost Classifier": XGBClassifier(random_state=42),
     }
 
-    for model_name, model in tqdm(models.items(), desc="Training models"):
-        with mlflow.start_run(run_name=model_name):
-            logger.info(f"Training default {model_name}...")
 
-            mlflow.set_tag("model_name", model_name)
+@task(
+    name="train_model",
+)
+@profiling.profiled
+def train_model(
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
+    n_jobs: int = 1,
+):
+    """
+    This function will train a number of models and log them to MLflow.
+
+    With `n_jobs` > 1 (or -1 for all cores) the models are fitted concurrently in a process
+    pool, and models with their own `n_jobs` share the remaining cores. The MLflow runs
+    are still logged from this process, one per model, as the fits finish.
+    """
 
-            model.fit(X_train, y_train.values.ravel())
+    logger.info("Reading features and labels...")
+    features, labels = read_training_data(features_path, labels_path)
 
-            mlflow.log_params(model.get_params())
+    X_train, X_test, y_train, y_test = train_test_split(
+        features, labels, test_size=0.2, random_state=42
+    )
+    y_train, y_test = y_train.values.ravel(), y_test.values.ravel()
 
-            y_tr_pred = model.predict(X_train)
-            y_test_pred = model.predict(X_test)
+    models = candidate_models()
 
-            signature = infer_signature(X_train, y_tr_pred)
+    if n_jobs < 0:
+        n_jobs = os.cpu_count()
 
-            tr_metrics = get_metrics(y_train.values.ravel(), y_tr_pred, training=True)
-            test_metrics = get_metrics(y_test.values.ravel(), y_test_pred, training=False)
+    if n_jobs <= 1:
+        for model_name, model in tqdm(models.items(), desc="Training models"):
+            logger.info(f"Training default {model_name}...")
+            result = fit_and_evaluate(model, X_train, y_train, X_test, y_test)
+            log_model_run(model_name, X_train, result)
+    else:
+        n_workers = min(n_jobs, len(models))
+        threads_per_model = max(os.cpu_count() // n_workers, 1)
 
-            # Log both training and test metrics
-            for metric, value in tr_metrics.items():
-                mlflow.log_metric(metric, value)
-            for metric, value in test_metrics.items():
-                mlflow.log_metric(metric, value)
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=get_context("spawn")
+        ) as executor:
+            futures = {}
+            for model_name, model in models.items():
+                if "n_jobs" in model.get_params():
+                    model.set_params(n_jobs=threads_per_model)
 
-            mlflow.sklearn.log_model(sk_model=model, name="model", signature=signature)
+                logger.info(f"Training default {model_name}...")
+                future = executor.submit(fit_and_evaluate, model, X_train, y_train, X_test, y_test)
+                futures[future] = model_name
 
-            logger.success(f"{model_name} trained and logged successfully.")
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Training models"):
+                log_model_run(futures[future], X_train, future.result())
 
-    select_best_model()
+    return select_best_model()
 
 
 @task(name="Select Best Model")
-def select_best_model():
-    """Select the best model based on the logged metrics."""
+@profiling.profiled
+def select_best_model() -> dict | None:
+    """
+    Selects the run with the best test F1 score, as returned by `RunIndex.best_run`.
+
+    The lookup is served by the local run index, which only fetches the runs logged
+    since its last sync.
+    """
     logger.info("Selecting the best model based on logged metrics...")
 
-    client = MlflowClient(tracking_uri=MLFLOW_TRACKING_URI)
-    runs = client.search_runs(
-        experiment_ids=mlflow.get_experiment_by_name(MLFLOW_EXPERIMENT_NAME).experiment_id,
-        filter_string="",
-        run_view_type=mlflow.entities.ViewType.ACTIVE_ONLY,
-        max_results=1000,
-        order_by=["metrics.test_f1 DESC"],
-    )
-
-    best_run = runs[0] if runs else None
+    with RunIndex(tracking_uri=MLFLOW_TRACKING_URI) as run_index:
+        best_run = run_index.best_run(MLFLOW_EXPERIMENT_NAME, "test_f1")
 
     if best_run:
         logger.success(
-            f"Best model found: {best_run.data.tags['model_name']}"
-            + "with test F1 score: {best_run.data.metrics['test_f1']}"
+            f"Best model found: {best_run['tags'].get('model_name', best_run['run_name'])} "
+            f"with test F1 score: {best_run['metrics']['test_f1']}"
         )
-        logger.info(f"Run ID: {best_run.info.run_id}")
+        logger.info(f"Run ID: {best_run['run_id']}")
     else:
         logger.warning("No runs found.")
 
+    return best_run
+
 
 @flow(
     name="Model Selection",
 )
 def training_flow(
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
+    n_jobs: int = 1,
 ):
     # Configure Loguru to use Prefect's logger
     logger.remove()
@@ -131,15 +197,18 @@ def training_flow(
     mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
     mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
 
-    train_model(features_path=features_path, labels_path=labels_path)
+    train_model(features_path=features_path, labels_path=labels_path, n_jobs=n_jobs)
 
 
 @app.command()
 def main(
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
+    n_jobs: int = typer.Option(1, help="Models fitted concurrently, -1 for all cores."),
+    profile: str = typer.Option(None, help=profiling.PROFILE_HELP),
 ):
-    training_flow(features_path=features_path, labels_path=labels_path)
+    with profiling.session(profile, run_name="Model_Selection_Profile"):
+        training_flow(features_path=features_path, labels_path=labels_path, n_jobs=n_jobs)
 
 
 if __name__ == "__main__":
@@ -3,59 +3,67 @@ from pathlib import Path
 import joblib
 from loguru import logger
 import mlflow
-from mlflow.client import MlflowClient
 from mlflow.models import infer_signature
-from pandas import DataFrame, read_csv
+from pandas import DataFrame
 from prefect import flow, get_run_logger, task
-from sklearn.svm import SVC
 import typer
 
+from lap import profiling
 from lap.config import (
+    FEATURES_PATH,
+    LABELS_PATH,
     MLFLOW_EXPERIMENT_NAME,
     MLFLOW_TRACKING_URI,
     MODELS_DIR,
-    PROCESSED_DATA_DIR,
 )
+from lap.dataset_io import read_training_data
+from lap.modeling.families import (
+    HP_OPTIM_RUN_NAMES,
+    REGISTERED_MODEL_NAMES,
+    build_model,
+    check_family,
+    parse_params,
+)
+from lap.run_index import RunIndex
 
 app = typer.Typer()
 
 
 @task
-def search_best_run(experiment_name: str):
-    """Searches for the best run in MLflow based on F1 score."""
+@profiling.profiled
+def search_best_run(experiment_name: str, model_family: str = "svc"):
+    """
+    Searches for the best `model_family` optimization run based on F1 score.
+
+    The lookup is served by the local run index, synced with MLflow beforehand.
+    """
     logger.info("Searching for best hyperparameters in MLflow...")
-    client = MlflowClient()
-    runs = client.search_runs(
-        experiment_ids=mlflow.get_experiment_by_name(experiment_name).experiment_id,
-        filter_string="run_name = 'SVC_Hyperparameter_Optimization'",
-        order_by=["metrics.best_cv_f1_score DESC"],
-        max_results=1,
-    )
+    with RunIndex() as run_index:
+        best_run = run_index.best_run(
+            experiment_name, "best_cv_f1_score", run_name=HP_OPTIM_RUN_NAMES[model_family]
+        )
 
-    if not runs:
+    if best_run is None:
         msg = "No hyperparameter optimization runs found. Please run hp_optim.py first."
         logger.error(msg)
         raise ValueError(msg)
 
-    best_run = runs[0]
-    best_params = best_run.data.params
     # Convert string params to their correct types
-    best_params["C"] = float(best_params["C"])
-    best_params["gamma"] = float(best_params["gamma"])
-    logger.success(f"Found best parameters from run {best_run.info.run_id}: {best_params}")
-    return best_params, best_run.info.run_id
+    best_params = parse_params(model_family, best_run["params"])
+    logger.success(f"Found best parameters from run {best_run['run_id']}: {best_params}")
+    return best_params, best_run["run_id"]
 
 
 @task
+@profiling.profiled
 def load_data(features_path: Path, labels_path: Path) -> tuple[DataFrame, DataFrame]:
     """Loads training data."""
     logger.info("Loading training data...")
-    features = read_csv(features_path)
-    labels = read_csv(labels_path)
-    return features, labels
+    return read_training_data(features_path, labels_path)
 
 
 @task
+@profiling.profiled
 def train_final_model(
     features: DataFrame,
     labels: DataFrame,
@@ -63,14 +71,15 @@ def train_final_model(
     best_run_id: str,
     model_name: str,
     model_output_path: Path,
+    model_family: str = "svc",
 ):
     """Trains, logs, registers, and saves the final model."""
     with mlflow.start_run(run_name="Final_Model_Training"):
         logger.info("Training final model with best parameters...")
         mlflow.log_params(best_params)
-        mlflow.set_tag("source_hp_optim_run_id", best_run_id)
+        mlflow.set_tags({"source_hp_optim_run_id": best_run_id, "model_family": model_family})
 
-        final_model = SVC(**best_params, random_state=42, probability=True)
+        final_model = build_model(model_family, best_params, probability=True)
         final_model.fit(features, labels.values.ravel())
 
         # Log and register the model in MLflow
@@ -96,19 +105,28 @@ def train_final_model(
 
 @flow(name="Final Model Training")
 def final_training_flow(
-    model_name: str = "svc-loan-predictor",
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    model_name: str | None = None,
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
     model_output_path: Path = MODELS_DIR / "model.pkl",
+    model_family: str = "svc",
 ):
-    """Orchestrates the final model training process."""
+    """
+    Orchestrates the final model training process.
+
+    The model is registered as `model_name`, by default the registered model name of
+    `model_family`.
+    """
+    check_family(model_family)
+    model_name = model_name or REGISTERED_MODEL_NAMES[model_family]
+
     logger.remove()
     logger.add(sink=get_run_logger().info, format="{message}")
 
     mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
     mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
 
-    best_params, best_run_id = search_best_run(MLFLOW_EXPERIMENT_NAME)
+    best_params, best_run_id = search_best_run(MLFLOW_EXPERIMENT_NAME, model_family)
     features, labels = load_data(features_path, labels_path)
     train_final_model(
         features=features,
@@ -117,23 +135,28 @@ def final_training_flow(
         best_run_id=best_run_id,
         model_name=model_name,
         model_output_path=model_output_path,
+        model_family=model_family,
     )
 
 
 @app.command()
 def main(
-    model_name: str = "svc-loan-predictor",
-    features_path: Path = PROCESSED_DATA_DIR / "features.csv",
-    labels_path: Path = PROCESSED_DATA_DIR / "labels.csv",
+    model_name: str = typer.Option(None, help="Registered model name, by family by default."),
+    features_path: Path = FEATURES_PATH,
+    labels_path: Path = LABELS_PATH,
     model_output_path: Path = MODELS_DIR / "model.pkl",
+    model_family: str = typer.Option("svc", help="'svc' or 'kernel_approx'."),
+    profile: str = typer.Option(None, help=profiling.PROFILE_HELP),
 ):
     """CLI entrypoint to run the final training flow."""
-    final_training_flow(
-        model_name=model_name,
-        features_path=features_path,
-        labels_path=labels_path,
-        model_output_path=model_output_path,
-    )
+    with profiling.session(profile, run_name="Final_Training_Profile"):
+        final_training_flow(
+            model_name=model_name,
+            features_path=features_path,
+            labels_path=labels_path,
+            model_output_path=model_output_path,
+            model_family=model_family,
+        )
 
 
 if __name__ == "__main__":
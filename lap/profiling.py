@@ -0,0 +1,259 @@
+from collections import Counter
+from contextlib import contextmanager
+import cProfile
+from datetime import datetime
+import functools
+import json
+import os
+from pathlib import Path
+import resource
+import sys
+import threading
+import time
+
+from loguru import logger
+
+from lap.config import MLFLOW_EXPERIMENT_NAME, MLFLOW_TRACKING_URI, PROFILES_DIR
+
+# LAP_PROFILE: unset or "off" disables profiling. "basic" records wall time, CPU time and
+# peak RSS per task, "cprofile" adds a cProfile dump and "sampling" a sampled call stack
+# profile in collapsed-stack format (flamegraph.pl, speedscope).
+PROFILE_MODES = ("off", "basic", "cprofile", "sampling")
+
+PROFILE_HELP = "Profile each task: 'basic', 'cprofile' or 'sampling' (or set LAP_PROFILE)."
+
+# Interval between two stack samples of the "sampling" mode.
+SAMPLING_INTERVAL_S = float(os.getenv("LAP_PROFILE_INTERVAL_MS", "5")) / 1000
+
+_counter_lock = threading.Lock()
+_task_counter = Counter()
+
+# Profiled tasks running on each thread. A task called from another profiled task (e.g.
+# select_best_model from train_model) does not start its own cProfile, as only one can be
+# active, nor reset the peak RSS of the enclosing task.
+_nesting = threading.local()
+
+
+def profile_mode() -> str:
+    mode = os.getenv("LAP_PROFILE", "off").strip().lower() or "off"
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown LAP_PROFILE {mode!r}, expected one of {PROFILE_MODES}.")
+    return mode
+
+
+def session_dir() -> Path:
+    """
+    Directory of the current profiling session, `reports/profiles/<timestamp>`.
+
+    It is created on first use and kept in LAP_PROFILE_DIR, so processes spawned
+    afterwards write to the same session.
+    """
+    if "LAP_PROFILE_DIR" not in os.environ:
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        os.environ["LAP_PROFILE_DIR"] = str(PROFILES_DIR / timestamp)
+
+    path = Path(os.environ["LAP_PROFILE_DIR"])
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def profiled(fn):
+    """
+    Profiles each call of a Prefect task function when LAP_PROFILE is set.
+
+    Applied under `@task`, so the profile covers the task body but not Prefect's own
+    orchestration. Each call writes `<task>-<n>.json` with its wall time, CPU time (of
+    the process, and of the child processes it waited for) and peak RSS to the session
+    directory, plus its cProfile or sampling output depending on the mode.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        mode = profile_mode()
+        if mode == "off":
+            return fn(*args, **kwargs)
+
+        with _counter_lock:
+            _task_counter[fn.__name__] += 1
+            name = f"{fn.__name__}-{_task_counter[fn.__name__]}"
+        output_dir = session_dir()
+
+        with _profile(name, mode, output_dir):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def _profile(name: str, mode: str, output_dir: Path):
+    nested = getattr(_nesting, "depth", 0) > 0
+    profiler = cProfile.Profile() if mode == "cprofile" and not nested else None
+    sampler = StackSampler(threading.get_ident()) if mode == "sampling" else None
+    rss_reset = not nested and _reset_peak_rss()
+    _nesting.depth = getattr(_nesting, "depth", 0) + 1
+
+    children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    status = "failed"
+
+    if profiler is not None:
+        profiler.enable()
+    if sampler is not None:
+        sampler.start()
+    try:
+        yield
+        status = "completed"
+    finally:
+        _nesting.depth -= 1
+        if profiler is not None:
+            profiler.disable()
+        if sampler is not None:
+            sampler.stop()
+
+        wall_s = time.perf_counter() - wall_start
+        cpu_s = time.process_time() - cpu_start
+        children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        summary = {
+            "task": name,
+            "status": status,
+            "mode": mode,
+            "wall_s": wall_s,
+            "cpu_s": cpu_s,
+            "children_cpu_s": (children_end.ru_utime + children_end.ru_stime)
+            - (children_start.ru_utime + children_start.ru_stime),
+            "peak_rss_mb": _peak_rss_mb(),
+            # Without a reset, the peak also covers what ran before the task.
+            "peak_rss_scope": "task" if rss_reset else "process",
+        }
+        with open(output_dir / f"{name}.json", "wt") as f:
+            json.dump(summary, f, indent=2)
+        if profiler is not None:
+            profiler.dump_stats(output_dir / f"{name}.prof")
+        if sampler is not None:
+            sampler.write(output_dir / f"{name}.collapsed")
+
+        logger.info(
+            f"Profiled {name}: wall {wall_s:.2f}s, CPU {cpu_s:.2f}s, "
+            f"peak RSS {summary['peak_rss_mb']:.0f} MB"
+        )
+
+
+class StackSampler:
+    """Samples the call stack of one thread at a fixed interval, from a daemon thread."""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLING_INTERVAL_S):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lap-stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def write(self, path: Path):
+        """Writes one `frame;frame;... count` line per distinct stack."""
+        with open(path, "wt") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _reset_peak_rss() -> bool:
+    """Resets the process's peak RSS (VmHWM) on Linux, returns False where unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "wt") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024**2 if sys.platform == "darwin" else maxrss / 1024
+
+
+@contextmanager
+def session(mode: str | None, run_name: str):
+    """
+    Profiling session of one CLI invocation.
+
+    `mode`, if given, overrides LAP_PROFILE for this process and the processes it spawns.
+    When profiling is on, the task summaries are collected into `summary.json` at the
+    end and the session directory is logged as artifacts of an MLflow run `run_name`,
+    with each task's wall time, CPU time and peak RSS as metrics.
+    """
+    if mode is not None:
+        os.environ["LAP_PROFILE"] = mode
+    if profile_mode() == "off":
+        yield
+        return
+
+    output_dir = session_dir()
+    try:
+        yield
+    finally:
+        summaries = summarize(output_dir)
+        logger.info(f"Profiles of {len(summaries)} task runs written to {output_dir}")
+        try:
+            log_to_mlflow(output_dir, summaries, run_name)
+        except Exception as e:
+            logger.warning(f"Profiles could not be logged to MLflow: {e!r}")
+
+
+def summarize(output_dir: Path) -> list[dict]:
+    summaries = []
+    for path in sorted(output_dir.glob("*.json")):
+        if path.name != "summary.json":
+            with open(path) as f:
+                summaries.append(json.load(f))
+
+    summaries.sort(key=lambda summary: summary["wall_s"], reverse=True)
+    with open(output_dir / "summary.json", "wt") as f:
+        json.dump(summaries, f, indent=2)
+    return summaries
+
+
+def log_to_mlflow(output_dir: Path, summaries: list[dict], run_name: str):
+    import mlflow
+
+    from lap import tracking
+
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+    mlflow.set_experiment(MLFLOW_EXPERIMENT_NAME)
+
+    with tracking.start_run(run_name=run_name) as run_logger:
+        run_logger.set_tags({"profiling": "true", "profile_mode": profile_mode()})
+        for summary in summaries:
+            run_logger.log_metrics(
+                {
+                    f"{summary['task']}_{key}": summary[key]
+                    for key in ("wall_s", "cpu_s", "children_cpu_s", "peak_rss_mb")
+                }
+            )
+        mlflow.log_artifacts(str(output_dir), artifact_path="profiles")
@@ -0,0 +1,221 @@
+from pathlib import Path
+import sqlite3
+
+from loguru import logger
+import mlflow
+from mlflow.client import MlflowClient
+from mlflow.entities import ViewType
+import typer
+
+from lap.config import MLFLOW_EXPERIMENT_NAME, MLFLOW_TRACKING_URI, RUN_INDEX_PATH
+
+app = typer.Typer()
+
+# Runs fetched per search_runs call while syncing.
+SYNC_PAGE_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS sync_state (
+    experiment_id TEXT PRIMARY KEY,
+    last_start_time INTEGER
+);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    experiment_id TEXT,
+    run_name TEXT,
+    status TEXT,
+    start_time INTEGER
+);
+CREATE TABLE IF NOT EXISTS metrics (run_id TEXT, key TEXT, value REAL, PRIMARY KEY (run_id, key));
+CREATE TABLE IF NOT EXISTS params (run_id TEXT, key TEXT, value TEXT, PRIMARY KEY (run_id, key));
+CREATE TABLE IF NOT EXISTS tags (run_id TEXT, key TEXT, value TEXT, PRIMARY KEY (run_id, key));
+CREATE INDEX IF NOT EXISTS runs_by_experiment ON runs (experiment_id, run_name);
+CREATE INDEX IF NOT EXISTS metrics_by_value ON metrics (key, value);
+"""
+
+# Runs in these states may still log metrics, so they are fetched again on the next sync.
+UNFINISHED_STATUSES = ("RUNNING", "SCHEDULED")
+
+
+class RunIndex:
+    """
+    Local SQLite index of the runs, metrics, params and tags of MLflow experiments.
+
+    `sync` only fetches runs started since the last sync (and runs that were unfinished
+    then), so best-run lookups are answered locally however many runs the experiment has.
+    The index belongs to one tracking URI and is cleared if opened with another. Deleted
+    runs stay in the index until `rebuild`.
+    """
+
+    def __init__(self, path: Path = RUN_INDEX_PATH, tracking_uri: str | None = None):
+        self.tracking_uri = tracking_uri or mlflow.get_tracking_uri()
+        self.client = MlflowClient(tracking_uri=self.tracking_uri)
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'tracking_uri'"
+        ).fetchone()
+        if row is None or row[0] != self.tracking_uri:
+            self.clear()
+
+    def clear(self):
+        with self.connection:
+            for table in ("sync_state", "runs", "metrics", "params", "tags"):
+                self.connection.execute(f"DELETE FROM {table}")
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('tracking_uri', ?)", (self.tracking_uri,)
+            )
+
+    def rebuild(self, experiment_id: str) -> int:
+        """Drops the index and syncs `experiment_id` from scratch."""
+        self.clear()
+        return self.sync(experiment_id)
+
+    def sync(self, experiment_id: str) -> int:
+        """Fetches the runs of `experiment_id` started since the last sync."""
+        row = self.connection.execute(
+            "SELECT last_start_time FROM sync_state WHERE experiment_id = ?", (experiment_id,)
+        ).fetchone()
+        since = row[0] if row else 0
+
+        unfinished = self.connection.execute(
+            "SELECT MIN(start_time) FROM runs WHERE experiment_id = ? AND status IN (?, ?)",
+            (experiment_id, *UNFINISHED_STATUSES),
+        ).fetchone()[0]
+        if unfinished is not None:
+            since = min(since, unfinished)
+
+        n_runs, latest, page_token = 0, since, None
+        while True:
+            # Runs started at exactly `since` are fetched again, the upsert dedups them.
+            page = self.client.search_runs(
+                experiment_ids=[experiment_id],
+                filter_string=f"attributes.start_time >= {since}",
+                run_view_type=ViewType.ACTIVE_ONLY,
+                max_results=SYNC_PAGE_SIZE,
+                order_by=["attributes.start_time ASC"],
+                page_token=page_token,
+            )
+            with self.connection:
+                for run in page:
+                    self._upsert(run)
+            n_runs += len(page)
+            latest = max([latest, *(run.info.start_time for run in page)])
+
+            page_token = page.token
+            if not page_token:
+                break
+
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (experiment_id, latest)
+            )
+
+        logger.info(f"Synced {n_runs} runs of experiment {experiment_id} into the run index")
+        return n_runs
+
+    def best_run(
+        self,
+        experiment_name: str,
+        metric: str,
+        run_name: str | None = None,
+        sync: bool = True,
+    ) -> dict | None:
+        """
+        Run of `experiment_name` with the highest `metric`, optionally among runs named
+        `run_name`, as a dict of run_id, run_name, metrics, params and tags.
+
+        Returns None when no run has logged `metric`.
+        """
+        experiment = self.client.get_experiment_by_name(experiment_name)
+        if experiment is None:
+            raise ValueError(f"Experiment {experiment_name!r} does not exist.")
+        if sync:
+            self.sync(experiment.experiment_id)
+
+        query = (
+            "SELECT runs.run_id FROM runs JOIN metrics ON metrics.run_id = runs.run_id "
+            "WHERE runs.experiment_id = ? AND metrics.key = ? AND metrics.value IS NOT NULL"
+        )
+        args = [experiment.experiment_id, metric]
+        if run_name is not None:
+            query += " AND runs.run_name = ?"
+            args.append(run_name)
+        row = self.connection.execute(
+            query + " ORDER BY metrics.value DESC, runs.start_time DESC LIMIT 1", args
+        ).fetchone()
+
+        return None if row is None else self.get_run(row[0])
+
+    def get_run(self, run_id: str) -> dict:
+        run_name = self.connection.execute(
+            "SELECT run_name FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()[0]
+
+        run = {"run_id": run_id, "run_name": run_name}
+        for table in ("metrics", "params", "tags"):
+            run[table] = dict(
+                self.connection.execute(
+                    f"SELECT key, value FROM {table} WHERE run_id = ?", (run_id,)
+                )
+            )
+        return run
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _upsert(self, run):
+        run_id = run.info.run_id
+        self.connection.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?)",
+            (
+                run_id,
+                run.info.experiment_id,
+                run.info.run_name,
+                run.info.status,
+                run.info.start_time,
+            ),
+        )
+        for table, values in (
+            ("metrics", run.data.metrics),
+            ("params", run.data.params),
+            ("tags", run.data.tags),
+        ):
+            self.connection.execute(f"DELETE FROM {table} WHERE run_id = ?", (run_id,))
+            self.connection.executemany(
+                f"INSERT INTO {table} VALUES (?, ?, ?)",
+                [(run_id, key, value) for key, value in values.items()],
+            )
+
+
+@app.command()
+def main(
+    experiment_name: str = MLFLOW_EXPERIMENT_NAME,
+    rebuild: bool = typer.Option(False, help="Drop the index and sync from scratch."),
+):
+    """Syncs the local run index with the MLflow experiment."""
+    mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
+
+    with RunIndex() as run_index:
+        experiment = run_index.client.get_experiment_by_name(experiment_name)
+        if experiment is None:
+            raise typer.BadParameter(f"Experiment {experiment_name!r} does not exist.")
+
+        if rebuild:
+            run_index.rebuild(experiment.experiment_id)
+        else:
+            run_index.sync(experiment.experiment_id)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,181 @@
+import hashlib
+import json
+from pathlib import Path
+import shutil
+
+from loguru import logger
+
+from lap.config import STAGE_CACHE_DIR
+
+
+def file_digest(path: Path) -> str:
+    """sha256 of a file's contents."""
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class StageCache:
+    """
+    Content-addressed cache of pipeline stage outputs.
+
+    A stage key hashes the contents of its input files and code, and its parameters. When
+    a stage finishes, its output files are copied into `objects/` under their digests and
+    a manifest maps the key to them. On a later run with the same key the outputs are
+    restored from the objects (only if missing or changed) and the stage is skipped.
+
+    Digests of unchanged files are memoized by size and modification time, so hashing
+    large raw dumps is paid once.
+
+    Every new key adds a manifest and its objects, so the cache grows with each change of
+    inputs, code or parameters until `prune` drops the least recently used keys.
+    """
+
+    def __init__(self, cache_dir: Path = STAGE_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.manifests_dir = self.cache_dir / "manifests"
+        self._digests_path = self.cache_dir / "digests.json"
+        self._digests = None
+
+    def digest(self, path: Path) -> str:
+        """Memoized `file_digest`."""
+        if self._digests is None:
+            self._digests = (
+                json.loads(self._digests_path.read_text()) if self._digests_path.exists() else {}
+            )
+
+        path = Path(path).resolve()
+        stat = path.stat()
+        signature = [stat.st_size, stat.st_mtime_ns]
+
+        entry = self._digests.get(str(path))
+        if entry is not None and entry["signature"] == signature:
+            return entry["digest"]
+
+        digest = file_digest(path)
+        self._digests[str(path)] = {"signature": signature, "digest": digest}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._digests_path.write_text(json.dumps(self._digests))
+        return digest
+
+    def key(
+        self,
+        stage: str,
+        inputs: list[Path] = (),
+        code: list[Path] = (),
+        params: dict | None = None,
+    ) -> str:
+        """Cache key of `stage` for the given input files, code files and parameters."""
+        payload = {
+            "stage": stage,
+            "inputs": {str(path): self.digest(path) for path in inputs},
+            "code": {Path(path).name: self.digest(path) for path in code},
+            "params": params or {},
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def restore(self, stage: str, key: str):
+        """
+        Restores the outputs cached for `key` and returns the stage result.
+
+        Returns None on a miss, including when a cached object has gone missing.
+        """
+        manifest_path = self._manifest_path(stage, key)
+        if not manifest_path.exists():
+            return None
+
+        manifest = json.loads(manifest_path.read_text())
+        objects = {path: self.objects_dir / digest for path, digest in manifest["outputs"].items()}
+        if not all(object_path.exists() for object_path in objects.values()):
+            logger.warning(f"Cached outputs of stage {stage} are incomplete, rerunning it.")
+            return None
+
+        for path, object_path in objects.items():
+            path = Path(path)
+            if not path.exists() or self.digest(path) != object_path.name:
+                logger.info(f"Restoring {path} from the stage cache")
+                path.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copyfile(object_path, path)
+
+        # Marks the key as recently used for `prune`.
+        manifest_path.touch()
+        return manifest["result"]
+
+    def store(self, stage: str, key: str, outputs: list[Path] = (), result=None):
+        """Stores the outputs and the JSON-serializable result of a finished stage."""
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        manifest = {"stage": stage, "key": key, "outputs": {}, "result": result}
+
+        for path in dict.fromkeys(Path(path) for path in outputs):
+            digest = self.digest(path)
+            object_path = self.objects_dir / digest
+            if not object_path.exists():
+                shutil.copyfile(path, object_path)
+            manifest["outputs"][str(path)] = digest
+
+        manifest_path = self._manifest_path(stage, key)
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest, indent=2, default=str))
+
+    def invalidate(self, stage: str | None = None):
+        """Drops the manifests of `stage`, or the whole cache when None."""
+        if stage is None:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            return
+
+        shutil.rmtree(self.manifests_dir / stage, ignore_errors=True)
+        self.prune()
+
+    def prune(self, keep: int | None = None):
+        """
+        Keeps the `keep` most recently used manifests of each stage, all of them when None,
+        and deletes the objects no remaining manifest refers to.
+        """
+        referenced = set()
+        for stage_dir in self.manifests_dir.glob("*"):
+            manifest_paths = sorted(
+                stage_dir.glob("*.json"), key=lambda path: path.stat().st_mtime_ns, reverse=True
+            )
+            for i, manifest_path in enumerate(manifest_paths):
+                if keep is not None and i >= keep:
+                    manifest_path.unlink()
+                else:
+                    referenced.update(json.loads(manifest_path.read_text())["outputs"].values())
+
+        for object_path in self.objects_dir.glob("*"):
+            if object_path.name not in referenced:
+                object_path.unlink()
+
+    def run(
+        self,
+        stage: str,
+        fn,
+        inputs: list[Path] = (),
+        code: list[Path] = (),
+        params: dict | None = None,
+        outputs: list[Path] = (),
+        force: bool = False,
+    ):
+        """
+        Runs `fn()` unless the cache has its outputs for the current inputs, code and params.
+
+        Returns the stage result and its key, which later stages can take as a parameter so
+        they rerun whenever this one does.
+        """
+        key = self.key(stage, inputs=inputs, code=code, params=params)
+
+        if not force:
+            result = self.restore(stage, key)
+            if result is not None:
+                logger.success(f"Stage {stage} is up to date, reusing cached outputs.")
+                return result["value"], key
+
+        logger.info(f"Running stage {stage}...")
+        value = fn()
+        self.store(stage, key, outputs=outputs, result={"value": value})
+        return value, key
+
+    def _manifest_path(self, stage: str, key: str) -> Path:
+        return self.manifests_dir / stage / f"{key}.json"
@@ -0,0 +1,161 @@
+from contextlib import contextmanager
+import queue
+import threading
+import time
+
+from loguru import logger
+import mlflow
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+# Limits of a single log_batch request enforced by the tracking server.
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_TAGS_PER_BATCH = 100
+# Requests an entity may fail in before it is dropped, so one the server always rejects
+# does not fail every later request with it.
+MAX_WRITE_ATTEMPTS = 3
+
+_CLOSE = object()
+
+
+class BatchLogger:
+    """
+    Buffers params, metrics and tags of one MLflow run and writes them with `log_batch`.
+
+    Logging calls only enqueue, a background thread sends everything queued within
+    `flush_interval` seconds as one request (split at the tracking server's batch limits).
+    `flush` blocks until everything logged so far is written and re-raises the first error
+    of the background thread, `close` flushes and stops the thread. Entities a request
+    failed to write are kept and sent again with the next one, at the latest on `close`,
+    and dropped with a warning after MAX_WRITE_ATTEMPTS failed requests.
+    """
+
+    def __init__(self, run_id, client=None, flush_interval=1.0):
+        self.run_id = run_id
+        self.client = client or MlflowClient()
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._error = None
+        self._unsent = []
+        self._thread = threading.Thread(target=self._run, name="mlflow-batch-logger", daemon=True)
+        self._thread.start()
+
+    def log_param(self, key, value):
+        self._queue.put(Param(key, str(value)))
+
+    def log_params(self, params):
+        for key, value in params.items():
+            self.log_param(key, value)
+
+    def log_metric(self, key, value, step=0):
+        self._queue.put(Metric(key, float(value), int(time.time() * 1000), step))
+
+    def log_metrics(self, metrics, step=0):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step=step)
+
+    def set_tag(self, key, value):
+        self._queue.put(RunTag(key, str(value)))
+
+    def set_tags(self, tags):
+        for key, value in tags.items():
+            self.set_tag(key, value)
+
+    def flush(self):
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait()
+
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def close(self):
+        self._queue.put(_CLOSE)
+        self._thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            pending, marker = self._collect()
+            self._write(pending)
+
+            if marker is _CLOSE:
+                return
+            if marker is not None:
+                marker.set()
+
+    def _collect(self):
+        """Waits for entities until the flush interval is over or a flush/close comes in."""
+        pending = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+
+        while isinstance(item, Metric | Param | RunTag):
+            pending.append(item)
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return pending, None
+
+        return pending, item
+
+    def _write(self, entities):
+        unsent, self._unsent = self._unsent, []
+        attempts = {id(entity): n for entity, n in unsent}
+        entities = [entity for entity, _ in unsent] + entities
+        metrics = [e for e in entities if isinstance(e, Metric)]
+        # Repeated keys in one request are rejected, the first param and last tag win.
+        params = list({e.key: e for e in reversed(entities) if isinstance(e, Param)}.values())
+        tags = list({e.key: e for e in entities if isinstance(e, RunTag)}.values())
+
+        while metrics or params or tags:
+            try:
+                self.client.log_batch(
+                    self.run_id,
+                    metrics=metrics[:MAX_METRICS_PER_BATCH],
+                    params=params[:MAX_PARAMS_TAGS_PER_BATCH],
+                    tags=tags[:MAX_PARAMS_TAGS_PER_BATCH],
+                )
+            except Exception as e:
+                if self._error is None:
+                    self._error = e
+                failed = [
+                    (entity, attempts.get(id(entity), 0) + 1) for entity in metrics + params + tags
+                ]
+                self._unsent = [(entity, n) for entity, n in failed if n < MAX_WRITE_ATTEMPTS]
+                n_dropped = len(failed) - len(self._unsent)
+                if n_dropped:
+                    logger.warning(
+                        f"Dropping {n_dropped} entities of run {self.run_id} after "
+                        f"{MAX_WRITE_ATTEMPTS} failed requests: {e!r}"
+                    )
+                return
+
+            metrics = metrics[MAX_METRICS_PER_BATCH:]
+            params = params[MAX_PARAMS_TAGS_PER_BATCH:]
+            tags = tags[MAX_PARAMS_TAGS_PER_BATCH:]
+
+
+@contextmanager
+def start_run(flush_interval=1.0, **kwargs):
+    """
+    Starts an MLflow run like `mlflow.start_run` and yields a `BatchLogger` for it.
+
+    Everything logged through the logger is written before the run is ended, also when
+    the block raises. A logging error is then only reported as a warning, so it does not
+    mask the block's own exception.
+    """
+    with mlflow.start_run(**kwargs) as run:
+        batch_logger = BatchLogger(run.info.run_id, flush_interval=flush_interval)
+        try:
+            yield batch_logger
+        except BaseException:
+            try:
+                batch_logger.close()
+            except Exception as e:
+                logger.warning(f"Run {run.info.run_id} could not be fully logged: {e!r}")
+            raise
+        batch_logger.close()
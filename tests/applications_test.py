@@ -0,0 +1,33 @@
+import os
+
+from benchmarks.applications import ApplicationGenerator
+from benchmarks.common import load_model_service
+from benchmarks.inference import kinesis_event
+
+os.environ.setdefault("MODEL_PATH", "./models/model.pkl")
+os.environ.setdefault("PREPROCESSOR_PATH", "./models/preprocessor.pkl")
+os.environ.setdefault("CLEANER_PATH", "./models/cleaner.pkl")
+
+import predict
+
+
+def test_generated_applications_follow_the_request_schema():
+    applications = ApplicationGenerator.from_csv().sample(2_000)
+
+    requests = predict.prediction_batch_adapter.validate_python(applications)
+
+    assert len(requests) == 2_000
+    # Optional fields are sometimes missing, as in the raw data.
+    assert any(application["Credit_History"] is None for application in applications)
+    assert all(application["Education"] is not None for application in applications)
+
+
+def test_generated_applications_are_scored_by_the_lambda_handler():
+    applications = ApplicationGenerator.from_csv().sample(100, seed=0)
+    service = load_model_service()
+
+    predictions = service.lambda_handler(kinesis_event(applications))["predictions"]
+
+    assert [event["prediction"]["request_id"] for event in predictions] == [
+        str(i) for i in range(100)
+    ]
@@ -0,0 +1,45 @@
+import asyncio
+
+from batching import MicroBatcher
+
+
+class ScorerMock:
+    """Doubles every item, failing on negative ones."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, items):
+        self.batches.append(list(items))
+        if any(item < 0 for item in items):
+            raise ValueError("negative item")
+        return [item * 2 for item in items]
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    scorer = ScorerMock()
+    batcher = MicroBatcher(scorer, max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(20)))
+
+    results = asyncio.run(run())
+
+    assert results == [i * 2 for i in range(20)]
+    assert [len(batch) for batch in scorer.batches] == [8, 8, 4]
+
+
+def test_micro_batcher_isolates_failing_rows():
+    scorer = ScorerMock()
+    batcher = MicroBatcher(scorer, max_batch_size=8, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(
+            *(batcher.submit(i) for i in (1, -1, 3)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+
+    assert results[0] == 2
+    assert isinstance(results[1], ValueError)
+    assert results[2] == 6
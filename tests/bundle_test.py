@@ -0,0 +1,157 @@
+import json
+import os
+from pathlib import Path
+import uuid
+
+import bundle
+import deployment.model as model_module
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from lap.modeling import families
+
+
+def load_artifacts():
+    with open("./models/model.pkl", "rb") as f:
+        model = joblib.load(f)
+    with open("./models/preprocessor.pkl", "rb") as f:
+        preprocessor = joblib.load(f)
+    return model, preprocessor
+
+
+def load_records():
+    df = pd.read_csv("./data/interim/cleaned.csv").drop(columns=["Loan_Status"])
+    return df.to_dict("records")
+
+
+def test_bundle_scores_like_sklearn_artifacts(tmp_path):
+    model, preprocessor = load_artifacts()
+    bundle_path = tmp_path / "serving_bundle.joblib"
+    bundle.build_bundle(model, preprocessor, "Test123", bundle_path)
+
+    serving_bundle = bundle.load_bundle(bundle_path)
+
+    assert serving_bundle.model_version == "Test123"
+    assert isinstance(serving_bundle.model.support_vectors_, np.memmap)
+
+    records = load_records()
+    expected_service = model_module.ModelService(model=model, preprocessor=preprocessor)
+    bundle_service = model_module.ModelService(
+        model=serving_bundle.model, preprocessor=serving_bundle.preprocessor
+    )
+
+    features = bundle_service.prepare_batch_features(records)
+    assert isinstance(features, np.ndarray), "Bundle scoring should not need pandas"
+
+    expected_approved, expected_probability = expected_service.score(
+        expected_service.prepare_batch_features(records)
+    )
+    approved, probability = bundle_service.score(features)
+
+    assert np.array_equal(approved, expected_approved)
+    assert np.allclose(probability, expected_probability, rtol=0, atol=1e-6)
+
+
+def test_bundle_round_trips_a_kernel_approximation_pipeline(tmp_path):
+    _, preprocessor = load_artifacts()
+    features = pd.read_csv("./data/processed/features.csv")
+    labels = pd.read_csv("./data/processed/labels.csv").values.ravel()
+    model = families.build_model(
+        "kernel_approx",
+        {"C": 1.0, "gamma": 0.1, "kernel_approximation": "nystroem", "n_components": 50},
+        probability=True,
+    ).fit(features, labels)
+    bundle_path = tmp_path / "serving_bundle.joblib"
+    bundle.build_bundle(model, preprocessor, "Test123", bundle_path)
+
+    serving_bundle = bundle.load_bundle(bundle_path)
+
+    records = load_records()
+    expected_service = model_module.ModelService(model=model, preprocessor=preprocessor)
+    bundle_service = model_module.ModelService(
+        model=serving_bundle.model, preprocessor=serving_bundle.preprocessor
+    )
+    features = bundle_service.prepare_batch_features(records)
+    assert isinstance(features, np.ndarray)
+
+    expected_approved, expected_probability = expected_service.score(
+        expected_service.prepare_batch_features(records)
+    )
+    approved, probability = bundle_service.score(features)
+
+    assert np.array_equal(approved, expected_approved)
+    assert np.allclose(probability, expected_probability, rtol=0, atol=1e-6)
+    # The fitted model itself keeps its feature names.
+    assert list(model.feature_names_in_) == preprocessor.get_feature_names_out().tolist()
+
+
+def test_init_from_bundle(tmp_path, monkeypatch):
+    model, preprocessor = load_artifacts()
+    bundle_path = tmp_path / "serving_bundle.joblib"
+    bundle.build_bundle(model, preprocessor, "bundle-version", bundle_path)
+    monkeypatch.setenv("MODEL_BUNDLE_PATH", str(bundle_path))
+
+    model_service = model_module.init(prediction_stream_name=None, model_id=None, test_run=True)
+
+    assert model_service.model_version == "bundle-version"
+    with open("./integration-test/event.json", "rt") as f:
+        predictions = model_service.lambda_handler(json.load(f))["predictions"]
+    assert predictions[0]["prediction"]["request_id"] == "12345"
+
+
+def test_load_bundle_rejects_unknown_version(tmp_path):
+    bundle_path = tmp_path / "serving_bundle.joblib"
+    joblib.dump({"format_version": 999}, bundle_path)
+
+    with pytest.raises(ValueError, match="version"):
+        bundle.load_bundle(bundle_path)
+
+
+def test_load_bundle_warns_about_another_sklearn_version(tmp_path):
+    model, preprocessor = load_artifacts()
+    bundle_path = tmp_path / "serving_bundle.joblib"
+    bundle.build_bundle(model, preprocessor, "bundle-version", bundle_path)
+    contents = joblib.load(bundle_path)
+    contents["sklearn_version"] = "0.24.2"
+    joblib.dump(contents, bundle_path)
+
+    with pytest.warns(UserWarning, match="scikit-learn 0.24.2"):
+        bundle.load_bundle(bundle_path)
+
+
+class FakeS3:
+    """S3 client serving one object, whose ETag changes when it is replaced."""
+
+    def __init__(self, body):
+        self.body, self.etag, self.downloads = body, uuid.uuid4().hex, 0
+
+    def head_object(self, Bucket, Key):
+        return {"ETag": f'"{self.etag}"'}
+
+    def download_file(self, bucket, key, filename):
+        self.downloads += 1
+        with open(filename, "wb") as f:
+            f.write(self.body)
+
+
+def test_s3_download_is_cached_per_etag(monkeypatch):
+    import boto3
+
+    s3 = FakeS3(b"first")
+    monkeypatch.setattr(boto3, "client", lambda service: s3)
+
+    first_path = bundle._download_from_s3("s3://bucket/bundles/serving_bundle.joblib")
+    assert bundle._download_from_s3("s3://bucket/bundles/serving_bundle.joblib") == first_path
+    assert s3.downloads == 1
+
+    s3.body, s3.etag = b"second", uuid.uuid4().hex
+    second_path = bundle._download_from_s3("s3://bucket/bundles/serving_bundle.joblib")
+    try:
+        assert second_path != first_path and second_path.endswith(".joblib")
+        assert Path(second_path).read_bytes() == b"second"
+        assert s3.downloads == 2
+    finally:
+        os.remove(first_path)
+        os.remove(second_path)
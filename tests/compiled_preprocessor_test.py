@@ -0,0 +1,103 @@
+from compiled_preprocessor import CompiledPreprocessor
+import deployment.model as model_module
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def load_preprocessor():
+    with open("./models/preprocessor.pkl", "rb") as f:
+        return joblib.load(f)
+
+
+def load_cleaned_features():
+    return pd.read_csv("./data/interim/cleaned.csv").drop(columns=["Loan_Status"])
+
+
+def test_compiled_preprocessor_matches_column_transformer(tmp_path):
+    preprocessor = load_preprocessor()
+    features = load_cleaned_features()
+
+    compiled_path = tmp_path / "preprocessor.json"
+    CompiledPreprocessor.from_column_transformer(preprocessor).save(compiled_path)
+    compiled = CompiledPreprocessor.load(compiled_path)
+
+    expected = preprocessor.transform(features)
+    records = features.to_dict("records")
+
+    assert compiled.feature_names == expected.columns.tolist()
+
+    actual = compiled.transform(records, dtype=np.float64)
+    assert actual.dtype == np.float64
+    assert np.array_equal(actual, expected.to_numpy()), "float64 output is not bit-identical"
+
+    actual = compiled.transform(records)
+    assert actual.dtype == np.float32
+    assert np.array_equal(actual, expected.to_numpy(dtype=np.float32))
+
+
+def test_compiled_preprocessor_rejects_unknown_category():
+    compiled = CompiledPreprocessor.from_column_transformer(load_preprocessor())
+    record = load_cleaned_features().to_dict("records")[0]
+    record["Property_Area"] = "Downtown"
+
+    with pytest.raises(ValueError, match="Property_Area"):
+        compiled.transform([record])
+
+
+def test_model_service_with_compiled_preprocessor():
+    preprocessor = load_preprocessor()
+    compiled = CompiledPreprocessor.from_column_transformer(preprocessor)
+    records = load_cleaned_features().head(5).to_dict("records")
+
+    with open("./models/model.pkl", "rb") as f:
+        model = joblib.load(f)
+
+    sklearn_service = model_module.ModelService(model=model, preprocessor=preprocessor)
+    compiled_service = model_module.ModelService(model=model, preprocessor=compiled)
+
+    expected = sklearn_service.prepare_batch_features(records)
+    actual = compiled_service.prepare_batch_features(records)
+
+    assert actual.columns.tolist() == expected.columns.tolist()
+    assert np.array_equal(actual.to_numpy(), expected.to_numpy(dtype=np.float32))
+
+
+def test_compiled_preprocessor_imputes_missing_fields_like_cleaner():
+    preprocessor = load_preprocessor()
+    cleaner = joblib.load("./models/cleaner.pkl")
+    compiled = CompiledPreprocessor.from_dict(
+        CompiledPreprocessor.from_column_transformer(preprocessor, cleaner).to_dict()
+    )
+
+    raw = pd.read_csv("./data/raw/loan_pred.csv").drop(columns=["Loan_ID", "Loan_Status"])
+    raw = raw[raw.isna().any(axis=1)]
+    expected = preprocessor.transform(cleaner.transform(raw)[raw.columns])
+
+    # Missing fields arrive as nulls or are left out of the record entirely.
+    records = [
+        {
+            key: None if pd.isna(value) else value
+            for key, value in record.items()
+            if i % 2 == 0 or not pd.isna(value)
+        }
+        for i, record in enumerate(raw.to_dict("records"))
+    ]
+
+    actual = compiled.transform(records, dtype=np.float64)
+    assert np.array_equal(actual, expected.to_numpy())
+
+
+def test_compiled_preprocessor_loads_version_1_without_fill_values():
+    data = CompiledPreprocessor.from_column_transformer(load_preprocessor()).to_dict()
+    data["format_version"] = 1
+    del data["fill_values"]
+
+    compiled = CompiledPreprocessor.from_dict(data)
+    record = load_cleaned_features().to_dict("records")[0]
+    del record["Gender"]
+
+    assert compiled.fill_values == {}
+    with pytest.raises(ValueError, match="Gender"):
+        compiled.transform([record])
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from lap import dataset_io
+
+
+def load_training_data():
+    features = pd.read_csv("./data/processed/features.csv")
+    labels = pd.read_csv("./data/processed/labels.csv")
+    return features, labels
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_training_data_round_trips_through_one_file(tmp_path, suffix):
+    features, labels = load_training_data()
+    path = tmp_path / f"training{suffix}"
+
+    dataset_io.write_training_data(features, labels, path, path)
+    read_features, read_labels = dataset_io.read_training_data(path, path)
+
+    pd.testing.assert_frame_equal(read_features, features)
+    pd.testing.assert_frame_equal(read_labels, labels)
+
+
+def test_arrow_reads_are_memory_mapped(tmp_path):
+    features, labels = load_training_data()
+    path = tmp_path / "training.arrow"
+    dataset_io.write_training_data(features, labels, path, path)
+
+    read_features, _ = dataset_io.read_training_data(path, path)
+
+    # Zero-copy columns are views on the mapped file, not arrays owned by pandas.
+    assert not read_features["numerical__LoanAmount"].to_numpy().flags.owndata
+
+
+def test_cleaned_schema_rejects_mismatched_columns(tmp_path):
+    cleaned = pd.read_csv("./data/interim/cleaned.csv")
+    cleaned["ApplicantIncome"] = "unknown"
+
+    with pytest.raises((pa.ArrowInvalid, pa.ArrowTypeError)):
+        dataset_io.write_table(
+            cleaned, tmp_path / "cleaned.parquet", schema=dataset_io.CLEANED_SCHEMA
+        )
+
+
+def test_unknown_suffix_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="Unsupported dataset file"):
+        dataset_io.write_table(pd.DataFrame({"a": np.arange(3)}), tmp_path / "data.xlsx")
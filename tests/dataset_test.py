@@ -0,0 +1,55 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from lap import dataset
+
+RAW_DATA_PATH = "./data/raw/loan_pred.csv"
+
+
+def test_streaming_matches_in_memory_preprocessing(tmp_path):
+    cleaned_df = dataset.clean_data.fn(
+        RAW_DATA_PATH, tmp_path / "cleaned.csv", tmp_path / "cleaner.pkl"
+    )
+    dataset.preproccess_data.fn(
+        cleaned_df, tmp_path / "features.csv", tmp_path / "labels.csv", tmp_path / "pre.pkl"
+    )
+
+    statistics = dataset.collect_statistics.fn(RAW_DATA_PATH, chunksize=100)
+    dataset.stream_process_data.fn(
+        statistics,
+        RAW_DATA_PATH,
+        tmp_path / "streamed_cleaned.csv",
+        tmp_path / "streamed_features.csv",
+        tmp_path / "streamed_labels.csv",
+        tmp_path / "streamed_pre.pkl",
+        tmp_path / "streamed_cleaner.pkl",
+        chunksize=100,
+    )
+
+    for name in ("cleaned.csv", "features.csv", "labels.csv"):
+        assert (tmp_path / name).read_text() == (tmp_path / f"streamed_{name}").read_text()
+
+    with open(tmp_path / "pre.pkl", "rb") as f:
+        preprocessor = pickle.load(f)
+    with open(tmp_path / "streamed_pre.pkl", "rb") as f:
+        streamed_preprocessor = pickle.load(f)
+
+    features = cleaned_df.drop(columns=["Loan_Status"])
+    pd.testing.assert_frame_equal(
+        streamed_preprocessor.transform(features), preprocessor.transform(features), rtol=1e-12
+    )
+
+
+def test_fill_values_break_ties_like_simple_imputer():
+    statistics = dataset.ChunkStatistics()
+    chunk = pd.read_csv(RAW_DATA_PATH, nrows=2, dtype=dataset.RAW_CSV_DTYPES)
+    chunk["Dependents"] = ["2", "1"]
+    chunk["LoanAmount"] = [100.0, np.nan]
+    statistics.update(dataset.prepare_raw_data(chunk))
+
+    fill_values = statistics.fill_values()
+
+    assert fill_values["Dependents"] == "1"
+    assert fill_values["LoanAmount"] == 100.0
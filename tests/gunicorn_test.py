@@ -0,0 +1,86 @@
+import os
+from pathlib import Path
+import socket
+import subprocess
+import sys
+import time
+
+import bundle
+import httpx
+import joblib
+import pytest
+
+WEB_SERVICE_DIR = Path("./deployment/web-service").resolve()
+
+APPLICATION = {
+    "Education": "Graduate",
+    "Property_Area": "Urban",
+    "ApplicantIncome": 5000,
+    "CoapplicantIncome": 0,
+    "LoanAmount": 120,
+    "Loan_Amount_Term": 360,
+    "Credit_History": 1,
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def bundle_path(tmp_path):
+    model = joblib.load("./models/model.pkl")
+    preprocessor = joblib.load("./models/preprocessor.pkl")
+    cleaner = joblib.load("./models/cleaner.pkl")
+    path = tmp_path / "serving_bundle.joblib"
+    bundle.build_bundle(model, preprocessor, "bundle-version", path, cleaner=cleaner)
+    return path
+
+
+def test_preloaded_workers_serve_the_bundled_model(bundle_path, tmp_path):
+    port = free_port()
+    env = os.environ | {
+        "PORT": str(port),
+        "WEB_CONCURRENCY": "2",
+        "MODEL_BUNDLE_PATH": str(bundle_path),
+        "PYTHONPATH": str(WEB_SERVICE_DIR.parent),
+        "METRICS_DIR": str(tmp_path / "metrics"),
+        "METRICS_PUBLISH_INTERVAL_S": "0.05",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+        cwd=WEB_SERVICE_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                response = httpx.post(f"http://127.0.0.1:{port}/predict", json=APPLICATION)
+                break
+            except httpx.TransportError:
+                assert server.poll() is None, "gunicorn exited"
+                assert time.monotonic() < deadline, "gunicorn did not start"
+                time.sleep(0.2)
+
+        assert response.status_code == 200
+        assert response.json()["prediction"] in ("Approved", "Rejected")
+
+        for _ in range(9):
+            httpx.post(f"http://127.0.0.1:{port}/predict", json=APPLICATION).raise_for_status()
+
+        # Whichever worker serves the scrape, it reports the totals of both.
+        expected = 'loan_prediction_records_total{model_version="bundle-version"} 10'
+        deadline = time.monotonic() + 10
+        while expected not in httpx.get(f"http://127.0.0.1:{port}/metrics").text:
+            assert time.monotonic() < deadline, "metrics were not aggregated"
+            time.sleep(0.1)
+        assert len(list((tmp_path / "metrics").glob("*.json"))) == 2
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
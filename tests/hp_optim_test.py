@@ -0,0 +1,124 @@
+import functools
+
+from hyperopt import tpe
+import mlflow
+import pandas as pd
+
+from lap.modeling import families, hp_optim
+
+
+def load_training_data():
+    features = pd.read_csv("./data/processed/features.csv")
+    labels = pd.read_csv("./data/processed/labels.csv").values.ravel()
+    return features, labels
+
+
+def test_halving_schedule_grows_data_and_folds():
+    schedule = hp_optim.halving_schedule(27, eta=3)
+
+    assert [n for n, _, _ in schedule] == [27, 9, 3, 1]
+    assert [fraction for _, fraction, _ in schedule] == [1 / 27, 1 / 9, 1 / 3, 1.0]
+    assert [folds for _, _, folds in schedule] == [2, 3, 4, 5]
+
+
+def test_successive_halving_logs_pruned_candidates(tmp_path):
+    mlflow.set_tracking_uri(f"sqlite:///{tmp_path / 'mlflow.db'}")
+    mlflow.set_experiment("hp_optim_test")
+    features, labels = load_training_data()
+
+    with mlflow.start_run() as parent_run:
+        candidates = hp_optim.successive_halving_search(features, labels, num_trials=9)
+
+    statuses = [candidate["status"] for candidate in candidates]
+    assert statuses.count("completed") == 1
+    assert statuses.count("pruned") == 8
+
+    runs = mlflow.search_runs(
+        filter_string=f"tags.mlflow.parentRunId = '{parent_run.info.run_id}'"
+    )
+    assert len(runs) == 9
+    assert (runs["tags.pruned"] == "true").sum() == 8
+    assert set(runs["tags.prune_reason"].dropna()) == {"rank"}
+
+
+def test_successive_halving_prunes_candidates_over_budget(tmp_path):
+    mlflow.set_tracking_uri(f"sqlite:///{tmp_path / 'mlflow.db'}")
+    mlflow.set_experiment("hp_optim_test")
+    features, labels = load_training_data()
+
+    with mlflow.start_run():
+        candidates = hp_optim.successive_halving_search(
+            features, labels, num_trials=3, trial_time_budget=0.0
+        )
+
+    # A zero budget stops every candidate after its first fold.
+    assert all(candidate["status"] == "pruned" for candidate in candidates)
+    assert all(len(candidate["scores"]) == 1 for candidate in candidates)
+
+
+def test_kernel_approximation_family_is_searched_and_rebuilt(tmp_path):
+    mlflow.set_tracking_uri(f"sqlite:///{tmp_path / 'mlflow.db'}")
+    mlflow.set_experiment("hp_optim_test")
+    features, labels = load_training_data()
+
+    with mlflow.start_run():
+        candidates = hp_optim.successive_halving_search(
+            features, labels, num_trials=3, model_family="kernel_approx"
+        )
+
+    best = next(candidate for candidate in candidates if candidate["status"] == "completed")
+    assert 0 < best["scores"][-1] <= 1
+
+    # Parameters come back from MLflow as strings.
+    params = families.parse_params(
+        "kernel_approx", {key: str(value) for key, value in best["params"].items()}
+    )
+    model = families.build_model("kernel_approx", params).fit(features, labels)
+    assert model.decision_function(features.head()).shape == (5,)
+
+
+def test_parallel_search_logs_nested_trial_runs(tmp_path):
+    mlflow.set_tracking_uri(f"sqlite:///{tmp_path / 'mlflow.db'}")
+    mlflow.set_experiment("hp_optim_test")
+    features, labels = load_training_data()
+
+    with mlflow.start_run() as parent_run:
+        trials = hp_optim.parallel_search(
+            features, labels, num_trials=4, n_jobs=2, model_family="kernel_approx"
+        )
+
+    assert len(trials.losses()) == 4
+    assert all(loss is not None for loss in trials.losses())
+
+    runs = mlflow.search_runs(
+        filter_string=f"tags.mlflow.parentRunId = '{parent_run.info.run_id}'"
+    )
+    assert len(runs) == 4
+
+
+def test_parallel_search_keeps_every_worker_busy_past_the_startup_trials(tmp_path, monkeypatch):
+    mlflow.set_tracking_uri(f"sqlite:///{tmp_path / 'mlflow.db'}")
+    mlflow.set_experiment("hp_optim_test")
+    features, labels = load_training_data()
+
+    # Past n_startup_jobs TPE models the finished trials instead of sampling at random.
+    suggest = functools.partial(tpe.suggest, n_startup_jobs=2)
+    suggestions = []
+
+    def recording_suggest(new_ids, domain, trials, seed):
+        docs = suggest(new_ids, domain, trials, seed)
+        suggestions.append((len(trials.losses()), len(docs)))
+        return docs
+
+    monkeypatch.setattr(hp_optim.tpe, "suggest", recording_suggest)
+
+    with mlflow.start_run():
+        trials = hp_optim.parallel_search(
+            features, labels, num_trials=6, n_jobs=2, model_family="kernel_approx"
+        )
+
+    assert len(trials.losses()) == 6
+    assert all(loss is not None for loss in trials.losses())
+    assert len(set(trials.tids)) == 6
+    assert all(n_docs == 1 for _, n_docs in suggestions)
+    assert any(n_known > 2 for n_known, _ in suggestions)
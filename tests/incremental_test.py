@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from lap.modeling import incremental
+
+RAW_DATA_PATH = "./data/raw/loan_pred.csv"
+
+THRESHOLDS = {"max_mean_shift": 1.0, "max_label_shift": 0.5, "max_new_fraction": 1.0}
+
+
+def write_rows(raw, path, rows, mode="w"):
+    raw.iloc[rows].to_csv(path, mode=mode, header=mode == "w", index=False)
+
+
+def retrain(state, path):
+    return incremental.incremental_retrain.fn(state, path, chunksize=128, **THRESHOLDS)
+
+
+def test_appended_rows_are_partially_fitted(tmp_path):
+    raw = pd.read_csv(RAW_DATA_PATH)
+    path = tmp_path / "raw.csv"
+    write_rows(raw, path, slice(0, 500))
+
+    state, report = retrain(None, path)
+    assert report["mode"] == "full" and state.rows_seen == 500
+
+    write_rows(raw, path, slice(500, None), mode="a")
+    updated, report = retrain(state, path)
+
+    assert report["mode"] == "partial"
+    assert report["rows_ingested"] == len(raw) - 500 and updated.rows_seen == len(raw)
+    assert updated.reference.n_rows == 500
+    assert 0 <= report["new_rows_f1"] <= 1
+
+    # Same preprocessing statistics as a pass over the whole file.
+    full = incremental.fit_full_history(path, chunksize=1000, epochs=1)
+    updated_scaler = updated.preprocessor.named_transformers_["numerical"]["scaler"]
+    full_scaler = full.preprocessor.named_transformers_["numerical"]["scaler"]
+    assert np.allclose(updated_scaler.mean_, full_scaler.mean_)
+    assert np.allclose(updated_scaler.var_, full_scaler.var_)
+    assert updated.statistics.fill_values() == full.statistics.fill_values()
+
+    _, report = retrain(updated, path)
+    assert report["mode"] == "up_to_date"
+
+
+def test_drift_and_rewritten_history_force_a_full_refit(tmp_path):
+    raw = pd.read_csv(RAW_DATA_PATH)
+    path = tmp_path / "raw.csv"
+    write_rows(raw, path, slice(0, 400))
+    state, _ = retrain(None, path)
+
+    new_rows = raw.iloc[400:450].copy()
+    new_rows["Property_Area"] = "Downtown"
+    new_rows.to_csv(path, mode="a", header=False, index=False)
+
+    refitted, report = retrain(state, path)
+    assert report["mode"] == "full" and "Property_Area" in report["reason"]
+    assert refitted.reference.n_rows == 450
+
+    write_rows(raw, path, slice(100, 500))
+    _, report = retrain(refitted, path)
+    assert report["mode"] == "full" and report["reason"] == "raw data history changed"
+
+
+def test_artifacts_only_replace_production_ones_when_promoted(tmp_path):
+    raw = pd.read_csv(RAW_DATA_PATH)
+    path = tmp_path / "raw.csv"
+    write_rows(raw, path, slice(0, 300))
+    state, _ = retrain(None, path)
+
+    production_dir = tmp_path / "models"
+    production_dir.mkdir()
+    (production_dir / "model.pkl").write_bytes(b"svc")
+    paths = [production_dir / f"sgd_{name}.pkl" for name in ("model", "preprocessor", "cleaner")]
+    incremental.save_artifacts.fn(state, tmp_path / "state.joblib", *paths)
+
+    assert (production_dir / "model.pkl").read_bytes() == b"svc"
+
+    incremental.promote_artifacts.fn(*paths, production_dir=production_dir)
+
+    assert (production_dir / "model.pkl").read_bytes() == paths[0].read_bytes()
+    assert (production_dir / "cleaner.pkl").exists()
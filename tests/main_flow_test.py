@@ -0,0 +1,7 @@
+from lap.main_flow import with_downstream
+
+
+def test_invalidating_a_stage_invalidates_the_stages_after_it():
+    assert with_downstream(["data"]) == ["data", "hp_optim", "training"]
+    assert with_downstream(["training", "hp_optim"]) == ["hp_optim", "training"]
+    assert with_downstream(None) == []
@@ -0,0 +1,87 @@
+import json
+
+import deployment.model as model_module
+import joblib
+from metrics import ServingMetrics, SharedMetrics
+from prediction_cache import PredictionCache
+import pytest
+
+
+class ModelMock:
+    def predict(self, X):
+        return [1] * len(X)
+
+
+def test_render_prometheus_histograms_and_counters():
+    metrics = ServingMetrics("v1", buckets=(0.01, 0.1))
+    metrics.observe("transform", 0.005)
+    metrics.observe("transform", 0.05)
+    metrics.observe("transform", 0.5)
+    metrics.count("records", 3)
+    with pytest.raises(ValueError), metrics.time("predict"):
+        raise ValueError("bad record")
+
+    lines = metrics.render().splitlines()
+
+    assert 'loan_prediction_records_total{model_version="v1"} 3' in lines
+    assert 'loan_prediction_errors_total{model_version="v1"} 1' in lines
+    buckets = [line.split()[-1] for line in lines if 'stage="transform",le=' in line]
+    assert buckets == ["1", "2", "3"]
+    assert 'loan_prediction_stage_seconds_count{model_version="v1",stage="predict"} 1' in lines
+
+
+def test_shared_metrics_render_the_totals_of_every_worker(tmp_path):
+    workers = [ServingMetrics("v1", buckets=(0.01, 0.1)) for _ in range(2)]
+    shared = [SharedMetrics(worker, tmp_path, name=str(i)) for i, worker in enumerate(workers)]
+    workers[0].count("records", 2)
+    workers[0].observe("predict", 0.005)
+    workers[1].count("records", 3)
+    workers[1].observe("predict", 0.05)
+    shared[1].publish()
+
+    lines = shared[0].render().splitlines()
+
+    assert 'loan_prediction_records_total{model_version="v1"} 5' in lines
+    assert 'loan_prediction_stage_seconds_count{model_version="v1",stage="predict"} 2' in lines
+
+
+def test_lambda_handler_emits_embedded_metric_format_lines():
+    log_lines = []
+    model_service = model_module.ModelService(
+        model=ModelMock(),
+        preprocessor=joblib.load(open("./models/preprocessor.pkl", "rb")),
+        model_version="Test123",
+        cache=PredictionCache(maxsize=100),
+        metrics_sink=log_lines.append,
+    )
+    with open("./integration-test/event.json", "rt") as f:
+        event = json.load(f)
+
+    model_service.lambda_handler(event)
+    model_service.lambda_handler(event)
+
+    line = json.loads(log_lines[-1])
+    names = [metric["Name"] for metric in line["_aws"]["CloudWatchMetrics"][0]["Metrics"]]
+    assert line["model_version"] == "Test123"
+    # The replayed record is a cache hit, so it is decoded but never transformed.
+    assert names[:2] == ["decode_ms", "callbacks_ms"]
+    assert (line["records"], line["batches"], line["cache_hits"], line["errors"]) == (1, 0, 1, 0)
+    assert model_service.metrics.counters["cache_hits"] == 1
+    assert model_service.metrics.counters["cache_misses"] == 1
+
+
+def test_lambda_handler_reports_failed_invocations():
+    log_lines = []
+    model_service = model_module.ModelService(
+        model=ModelMock(),
+        preprocessor=joblib.load(open("./models/preprocessor.pkl", "rb")),
+        model_version="Test123",
+        metrics_sink=log_lines.append,
+    )
+
+    with pytest.raises(KeyError):
+        model_service.lambda_handler({"Records": [{"kinesis": {}}]})
+
+    line = json.loads(log_lines[-1])
+    assert line["errors"] == 1 and line["records"] == 0
+    assert "decode_ms" in line
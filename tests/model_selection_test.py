@@ -0,0 +1,63 @@
+import mlflow
+from mlflow.tracking import fluent
+from mlflow.tracking._tracking_service import utils as tracking_utils
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from lap.modeling import model_selection
+
+
+@pytest.fixture
+def tracking_store(tmp_path, monkeypatch):
+    # Newer MLflow versions pin the logged model's requirements to uv.lock, which can
+    # conflict with the packages of an environment not synced from it.
+    monkeypatch.setenv("MLFLOW_UV_AUTO_DETECT", "false")
+    # The tracking URI and experiment are process-wide, monkeypatch restores them after.
+    monkeypatch.setattr(tracking_utils, "_tracking_uri", tracking_utils._tracking_uri)
+    monkeypatch.setattr(fluent, "_active_experiment_id", fluent._active_experiment_id)
+    monkeypatch.delenv("MLFLOW_TRACKING_URI", raising=False)
+    monkeypatch.delenv("MLFLOW_EXPERIMENT_ID", raising=False)
+    mlflow.set_tracking_uri(f"sqlite:///{tmp_path / 'mlflow.db'}")
+    mlflow.set_experiment("model_selection_test")
+    yield
+    mlflow.end_run()
+
+
+def test_logged_model_loads_back(tracking_store):
+    features, labels = model_selection.read_training_data(
+        "./data/processed/features.csv", "./data/processed/labels.csv"
+    )
+    labels = labels.values.ravel()
+    result = model_selection.fit_and_evaluate(
+        RandomForestClassifier(n_estimators=10, random_state=42),
+        features,
+        labels,
+        features,
+        labels,
+    )
+
+    model_selection.log_model_run("RandomForest Classifier", features, result)
+
+    [run] = mlflow.search_runs(output_format="list")
+    model = mlflow.sklearn.load_model(f"runs:/{run.info.run_id}/model")
+    assert np.array_equal(model.predict(features), result["model"].predict(features))
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_train_model_logs_one_run_per_candidate(tracking_store, tmp_path, monkeypatch, n_jobs):
+    features, labels = model_selection.read_training_data(
+        "./data/processed/features.csv", "./data/processed/labels.csv"
+    )
+    features_path, labels_path = tmp_path / "features.csv", tmp_path / "labels.csv"
+    features.head(150).to_csv(features_path, index=False)
+    labels.head(150).to_csv(labels_path, index=False)
+    # The best-run lookup goes through the run index of the configured tracking server.
+    monkeypatch.setattr(model_selection, "select_best_model", lambda: None)
+
+    model_selection.train_model.fn(features_path, labels_path, n_jobs=n_jobs)
+
+    runs = mlflow.search_runs(output_format="list")
+    assert sorted(run.info.run_name for run in runs) == sorted(model_selection.candidate_models())
+    for run in runs:
+        assert {"fit_time", "predict_time", "test_f1"} <= run.data.metrics.keys()
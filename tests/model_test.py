@@ -1,8 +1,10 @@
+import base64
 import json
 
 import deployment.model as model_module
 import joblib
 import pandas as pd
+import pytest
 
 
 def test_prepare_features():
@@ -165,3 +167,146 @@ def test_lambda_handler():
     assert actual_predictions == expected_predictions, (
         f"Expected {expected_predictions}, but got {actual_predictions}"
     )
+
+
+class CreditHistoryModelMock:
+    """Approves exactly the applications with a credit history."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, X):
+        self.calls += 1
+        return (X["binary__Credit_History"] == 1.0).astype(int).to_numpy()
+
+
+def test_lambda_handler_batch():
+    model_mock = CreditHistoryModelMock()
+    preprocessor = joblib.load(open("./models/preprocessor.pkl", "rb"))
+    model_service = model_module.ModelService(
+        model=model_mock, preprocessor=preprocessor, model_version="Test123"
+    )
+
+    application = {
+        "Gender": "Male",
+        "Married": "Yes",
+        "Dependents": "2",
+        "Education": "Graduate",
+        "Self_Employed": "No",
+        "ApplicantIncome": 5000,
+        "CoapplicantIncome": 2500.0,
+        "LoanAmount": 200.0,
+        "Loan_Amount_Term": 360.0,
+        "Property_Area": "Urban",
+    }
+    credit_histories = [1.0, 0.0, 0.0, 1.0, 1.0]
+
+    records = []
+    for i, credit_history in enumerate(credit_histories):
+        input_record = {
+            "input": {**application, "Credit_History": credit_history},
+            "request_id": f"req-{i}",
+        }
+        data = base64.b64encode(json.dumps(input_record).encode("utf-8")).decode("utf-8")
+        records.append({"kinesis": {"data": data}})
+
+    actual_predictions = model_service.lambda_handler({"Records": records})
+
+    assert model_mock.calls == 1, f"Expected a single predict call, got {model_mock.calls}"
+    assert [p["prediction"]["request_id"] for p in actual_predictions["predictions"]] == [
+        f"req-{i}" for i in range(len(credit_histories))
+    ]
+    assert [p["prediction"]["approved"] for p in actual_predictions["predictions"]] == [
+        credit_history == 1.0 for credit_history in credit_histories
+    ]
+
+
+class KinesisClientMock:
+    """
+    Throttles the first `throttled` entries of the first PutRecords call, and raises on
+    the calls numbered in `raise_on`.
+    """
+
+    def __init__(self, throttled=0, raise_on=()):
+        self.throttled = throttled
+        self.raise_on = raise_on
+        self.requests = []
+        self.stored = []
+
+    def put_records(self, StreamName, Records):
+        self.requests.append(list(Records))
+        if len(self.requests) in self.raise_on:
+            raise ConnectionError("Kinesis is unreachable")
+        results = []
+        for entry in Records:
+            if self.throttled > 0:
+                self.throttled -= 1
+                results.append({"ErrorCode": "ProvisionedThroughputExceededException"})
+            else:
+                self.stored.append(json.loads(entry["Data"]))
+                results.append({"SequenceNumber": "1", "ShardId": "shardId-000000000000"})
+        failed = sum("ErrorCode" in result for result in results)
+        return {"FailedRecordCount": failed, "Records": results}
+
+
+def test_buffered_kinesis_callback():
+    kinesis_client = KinesisClientMock(throttled=3)
+    callback = model_module.BufferedKinesisCallback(
+        kinesis_client, "loan_predictions", backoff=0.0
+    )
+
+    for i in range(1200):
+        callback.put_record({"prediction": {"approved": True, "request_id": str(i)}})
+
+    assert kinesis_client.requests == [], "Events should be buffered until flush"
+
+    callback.flush()
+
+    request_sizes = [len(request) for request in kinesis_client.requests]
+    assert request_sizes == [500, 3, 500, 200], f"Unexpected PutRecords sizes {request_sizes}"
+    assert sorted(int(event["prediction"]["request_id"]) for event in kinesis_client.stored) == (
+        list(range(1200))
+    )
+    assert callback.buffer == []
+
+
+def test_buffered_kinesis_callback_keeps_unacknowledged_events():
+    kinesis_client = KinesisClientMock(throttled=2, raise_on=(2,))
+    callback = model_module.BufferedKinesisCallback(
+        kinesis_client, "loan_predictions", backoff=0.0
+    )
+    for i in range(700):
+        callback.put_record({"prediction": {"approved": True, "request_id": str(i)}})
+
+    # The retry of the 2 throttled entries of the first request raises, so they and the
+    # 200 entries of the second request stay buffered.
+    with pytest.raises(ConnectionError):
+        callback.flush()
+    assert len(callback.buffer) == 2 + 200
+
+    callback.flush()
+
+    assert callback.buffer == []
+    assert sorted(int(event["prediction"]["request_id"]) for event in kinesis_client.stored) == (
+        list(range(700))
+    )
+
+
+def test_lambda_handler_flushes_buffered_callback():
+    kinesis_client = KinesisClientMock()
+    callback = model_module.BufferedKinesisCallback(kinesis_client, "loan_predictions")
+    preprocessor = joblib.load(open("./models/preprocessor.pkl", "rb"))
+    model_service = model_module.ModelService(
+        model=ModelMock(1),
+        preprocessor=preprocessor,
+        model_version="Test123",
+        callbacks=[callback.put_record],
+    )
+
+    with open("./integration-test/event.json", "rt") as f:
+        event = json.load(f)
+
+    model_service.lambda_handler(event)
+
+    assert len(kinesis_client.requests) == 1
+    assert kinesis_client.stored[0]["prediction"] == {"approved": True, "request_id": "12345"}
@@ -0,0 +1,78 @@
+import json
+
+import deployment.model as model_module
+import joblib
+from prediction_cache import PredictionCache, record_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_record_key_is_canonical():
+    record = {"ApplicantIncome": 5000, "Gender": "Male", "Credit_History": 1}
+    reordered = {"Credit_History": 1.0, "Gender": "Male", "ApplicantIncome": 5000.0}
+
+    assert record_key(record, "v1") == record_key(reordered, "v1")
+    assert record_key(record, "v1") != record_key(record, "v2")
+    assert record_key(record, "v1") != record_key({**record, "Gender": "Female"}, "v1")
+
+
+def test_prediction_cache_lru_and_ttl():
+    clock = FakeClock()
+    cache = PredictionCache(maxsize=2, ttl_seconds=10, clock=clock)
+
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # evicts "b", the least recently used entry
+
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    clock.now = 11
+    assert cache.get("a") is None
+
+    assert cache.stats() == {
+        "size": 1,
+        "maxsize": 2,
+        "hits": 2,
+        "misses": 2,
+        "evictions": 1,
+        "expirations": 1,
+    }
+
+
+class CountingModelMock:
+    def __init__(self):
+        self.rows = 0
+
+    def predict(self, X):
+        self.rows += len(X)
+        return [1] * len(X)
+
+
+def test_lambda_handler_reuses_cached_predictions():
+    model_mock = CountingModelMock()
+    preprocessor = joblib.load(open("./models/preprocessor.pkl", "rb"))
+    model_service = model_module.ModelService(
+        model=model_mock,
+        preprocessor=preprocessor,
+        model_version="Test123",
+        cache=PredictionCache(maxsize=100),
+    )
+
+    with open("./integration-test/event.json", "rt") as f:
+        event = json.load(f)
+    replayed_event = {"Records": event["Records"] * 3}
+
+    first = model_service.lambda_handler(event)
+    replayed = model_service.lambda_handler(replayed_event)
+
+    assert model_mock.rows == 1, "Replayed records should be served from the cache"
+    assert replayed["predictions"] == first["predictions"] * 3
+    assert model_service.cache.stats()["hits"] == 3
@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+from lap import profiling
+
+
+@profiling.profiled
+def allocate(n):
+    return sum(range(n))
+
+
+@profiling.profiled
+def outer(n):
+    return allocate(n)
+
+
+@pytest.fixture
+def profile_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("LAP_PROFILE_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_cprofile_mode_writes_task_summaries_and_dumps(profile_dir, monkeypatch):
+    monkeypatch.setenv("LAP_PROFILE", "cprofile")
+
+    assert outer(100_000) == sum(range(100_000))
+
+    outer_name = next(path.stem for path in profile_dir.glob("outer-*.json"))
+    allocate_name = next(path.stem for path in profile_dir.glob("allocate-*.json"))
+    with open(profile_dir / f"{outer_name}.json") as f:
+        summary = json.load(f)
+    assert summary["status"] == "completed"
+    assert summary["wall_s"] > 0 and summary["peak_rss_mb"] > 0
+    # Only the outermost task runs cProfile.
+    assert (profile_dir / f"{outer_name}.prof").exists()
+    assert not (profile_dir / f"{allocate_name}.prof").exists()
+
+    summaries = profiling.summarize(profile_dir)
+    assert [summary["task"] for summary in summaries] == [outer_name, allocate_name]
+    assert (profile_dir / "summary.json").exists()
+
+
+def test_off_mode_writes_nothing(profile_dir, monkeypatch):
+    monkeypatch.setenv("LAP_PROFILE", "off")
+
+    allocate(10)
+
+    assert list(profile_dir.iterdir()) == []
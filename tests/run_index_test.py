@@ -0,0 +1,71 @@
+import mlflow
+import pytest
+
+from lap.run_index import RunIndex
+
+
+@pytest.fixture
+def tracking_uri(tmp_path):
+    uri = f"sqlite:///{tmp_path / 'mlflow.db'}"
+    mlflow.set_tracking_uri(uri)
+    mlflow.set_experiment("run_index_test")
+    yield uri
+    mlflow.set_tracking_uri(None)
+
+
+def log_run(run_name, metrics, params=None):
+    with mlflow.start_run(run_name=run_name) as run:
+        mlflow.log_params(params or {})
+        mlflow.log_metrics(metrics)
+    return run.info.run_id
+
+
+def test_best_run_is_served_from_the_index(tracking_uri, tmp_path):
+    log_run("SVC_Hyperparameter_Optimization", {"best_cv_f1_score": 0.7}, {"C": "1.0"})
+    best_id = log_run("SVC_Hyperparameter_Optimization", {"best_cv_f1_score": 0.9}, {"C": "5.0"})
+    log_run("Other_Optimization", {"best_cv_f1_score": 0.95})
+    log_run("Logistic Regression", {"test_f1": 0.8})
+
+    with RunIndex(tmp_path / "index.sqlite", tracking_uri) as run_index:
+        best_run = run_index.best_run(
+            "run_index_test", "best_cv_f1_score", run_name="SVC_Hyperparameter_Optimization"
+        )
+        missing = run_index.best_run("run_index_test", "not_logged")
+
+    assert best_run["run_id"] == best_id
+    assert best_run["params"] == {"C": "5.0"}
+    assert best_run["metrics"] == {"best_cv_f1_score": 0.9}
+    assert missing is None
+
+
+def test_sync_only_fetches_new_and_unfinished_runs(tracking_uri, tmp_path):
+    for f1 in (0.5, 0.6, 0.7):
+        log_run("Logistic Regression", {"test_f1": f1})
+    experiment_id = mlflow.get_experiment_by_name("run_index_test").experiment_id
+
+    with RunIndex(tmp_path / "index.sqlite", tracking_uri) as run_index:
+        assert run_index.sync(experiment_id) == 3
+
+        # Still running at sync time: its metrics are picked up by the next sync.
+        with mlflow.start_run(run_name="Slow Model") as running:
+            assert run_index.sync(experiment_id) == 2
+            mlflow.log_metric("test_f1", 0.99)
+        log_run("Logistic Regression", {"test_f1": 0.8})
+
+        # Fetched from the start time of the unfinished run, so just it and the new run.
+        assert run_index.sync(experiment_id) == 2
+        assert run_index.best_run("run_index_test", "test_f1", sync=False)["run_id"] == (
+            running.info.run_id
+        )
+
+
+def test_index_is_cleared_for_another_tracking_uri(tracking_uri, tmp_path):
+    log_run("Logistic Regression", {"test_f1": 0.8})
+    experiment_id = mlflow.get_experiment_by_name("run_index_test").experiment_id
+
+    with RunIndex(tmp_path / "index.sqlite", tracking_uri) as run_index:
+        run_index.sync(experiment_id)
+
+    other_uri = f"sqlite:///{tmp_path / 'other.db'}"
+    with RunIndex(tmp_path / "index.sqlite", other_uri) as run_index:
+        assert run_index.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 0
@@ -0,0 +1,62 @@
+import joblib
+import numpy as np
+import pandas as pd
+import scoring
+
+
+class CallCounter:
+    """Wraps a fitted model and counts calls to its scoring methods."""
+
+    def __init__(self, model):
+        self.model = model
+        self.calls = []
+
+    def __getattr__(self, name):
+        attribute = getattr(self.model, name)
+        if name not in ("predict", "predict_proba", "decision_function"):
+            return attribute
+
+        def counted(*args, **kwargs):
+            self.calls.append(name)
+            return attribute(*args, **kwargs)
+
+        return counted
+
+
+def load_model_and_features():
+    model = joblib.load(open("./models/model.pkl", "rb"))
+    features = pd.read_csv("./data/processed/features.csv")
+    return model, features
+
+
+def test_approval_probability_matches_platt_calibration():
+    model, features = load_model_and_features()
+    counted_model = CallCounter(model)
+
+    approved, probability = scoring.score(counted_model, features)
+
+    assert counted_model.calls == ["decision_function"]
+    # predict_proba approximates the same Platt sigmoid with libsvm's pairwise coupling.
+    assert np.allclose(probability, model.predict_proba(features)[:, 1], atol=1e-4)
+    assert np.array_equal(approved, probability >= 0.5)
+
+
+def test_score_threshold():
+    model, features = load_model_and_features()
+
+    _, probability = scoring.score(model, features)
+    approved, _ = scoring.score(model, features, threshold=0.9)
+
+    assert np.array_equal(approved, probability >= 0.9)
+    assert approved.sum() < (probability >= 0.5).sum()
+
+
+def test_score_without_probabilities():
+    class ModelMock:
+        def predict(self, X):
+            return [1, 0, 1]
+
+    approved, probability = scoring.score(ModelMock(), None)
+
+    assert approved.tolist() == [True, False, True]
+    assert probability is None
@@ -0,0 +1,110 @@
+import time
+
+from lap.stage_cache import StageCache
+
+
+class Stage:
+    """Copies an input file to an output file and counts its runs."""
+
+    def __init__(self, input_path, output_path):
+        self.input_path, self.output_path = input_path, output_path
+        self.runs = 0
+
+    def __call__(self):
+        self.runs += 1
+        self.output_path.write_text(self.input_path.read_text().upper())
+        return {"rows": len(self.input_path.read_text().splitlines())}
+
+
+def run(cache, stage, params=None, force=False):
+    return cache.run(
+        "copy",
+        stage,
+        inputs=[stage.input_path],
+        params=params,
+        outputs=[stage.output_path],
+        force=force,
+    )
+
+
+def test_stage_reruns_only_when_its_key_changes(tmp_path):
+    cache = StageCache(tmp_path / "cache")
+    stage = Stage(tmp_path / "input.csv", tmp_path / "output.csv")
+    stage.input_path.write_text("a\nb\n")
+
+    result, key = run(cache, stage, params={"chunksize": 10})
+    assert result == {"rows": 2} and stage.runs == 1
+
+    assert run(cache, stage, params={"chunksize": 10}) == (result, key)
+    assert stage.runs == 1
+
+    run(cache, stage, params={"chunksize": 20})
+    assert stage.runs == 2
+
+    stage.input_path.write_text("a\nb\nc\n")
+    result, new_key = run(cache, stage, params={"chunksize": 10})
+    assert result == {"rows": 3} and new_key != key and stage.runs == 3
+
+    run(cache, stage, params={"chunksize": 10}, force=True)
+    assert stage.runs == 4
+
+
+def test_hit_restores_missing_and_modified_outputs(tmp_path):
+    cache = StageCache(tmp_path / "cache")
+    stage = Stage(tmp_path / "input.csv", tmp_path / "output.csv")
+    stage.input_path.write_text("a\nb\n")
+    run(cache, stage)
+
+    stage.output_path.unlink()
+    run(cache, stage)
+    assert stage.output_path.read_text() == "A\nB\n"
+
+    stage.output_path.write_text("edited")
+    run(cache, stage)
+    assert stage.output_path.read_text() == "A\nB\n" and stage.runs == 1
+
+
+def test_invalidate_forces_a_rerun(tmp_path):
+    cache = StageCache(tmp_path / "cache")
+    stage = Stage(tmp_path / "input.csv", tmp_path / "output.csv")
+    stage.input_path.write_text("a\n")
+    run(cache, stage)
+
+    cache.invalidate("copy")
+    run(cache, stage)
+    assert stage.runs == 2
+
+    cache.invalidate()
+    run(cache, stage)
+    assert stage.runs == 3
+
+
+def test_prune_keeps_the_most_recently_used_keys(tmp_path):
+    cache = StageCache(tmp_path / "cache")
+    stage = Stage(tmp_path / "input.csv", tmp_path / "output.csv")
+    for content in ("a\n", "b\n", "c\n"):
+        stage.input_path.write_text(content)
+        run(cache, stage)
+        time.sleep(0.01)
+    assert len(list(cache.objects_dir.iterdir())) == 3
+
+    # Reusing the first key makes it the most recently used one.
+    stage.input_path.write_text("a\n")
+    run(cache, stage)
+    cache.prune(keep=1)
+
+    assert len(list((cache.manifests_dir / "copy").iterdir())) == 1
+    assert [path.read_text() for path in cache.objects_dir.iterdir()] == ["A\n"]
+    stage.output_path.unlink()
+    run(cache, stage)
+    assert stage.runs == 3 and stage.output_path.read_text() == "A\n"
+
+
+def test_invalidate_deletes_the_objects_of_the_stage(tmp_path):
+    cache = StageCache(tmp_path / "cache")
+    stage = Stage(tmp_path / "input.csv", tmp_path / "output.csv")
+    stage.input_path.write_text("a\n")
+    run(cache, stage)
+
+    cache.invalidate("copy")
+    assert list(cache.objects_dir.iterdir()) == []
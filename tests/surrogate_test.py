@@ -0,0 +1,95 @@
+import json
+
+import bundle
+import deployment.model as model_module
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+import scoring
+from sklearn.svm import SVC
+import surrogate
+
+from lap.modeling import families
+
+
+def load_training_data():
+    features = pd.read_csv("./data/processed/features.csv")
+    labels = pd.read_csv("./data/processed/labels.csv").values.ravel()
+    return features, labels
+
+
+def test_linear_svc_is_compacted_exactly():
+    model = joblib.load("./models/model.pkl")
+    features, _ = load_training_data()
+
+    compact, report = surrogate.distill(model, features, n_samples=1000)
+
+    assert compact.regressor is None
+    assert report["held_out_agreement"]["decision_agreement"] == 1.0
+    _, expected = scoring.score(model, features)
+    _, actual = scoring.score(compact, features)
+    assert np.allclose(actual, expected, rtol=0, atol=1e-9)
+
+
+def test_kernel_svc_is_distilled_into_a_regressor():
+    features, labels = load_training_data()
+    model = SVC(kernel="rbf", gamma=0.5, probability=True, random_state=42).fit(features, labels)
+
+    distilled, report = surrogate.distill(model, features, n_samples=5000)
+
+    assert distilled.regressor is not None
+    assert report["held_out_agreement"]["decision_agreement"] > 0.9
+    assert report["train_rows_agreement"]["probability_mae"] < 0.1
+
+
+def test_bundle_serves_the_surrogate_flavor(tmp_path, monkeypatch):
+    model = joblib.load("./models/model.pkl")
+    preprocessor = joblib.load("./models/preprocessor.pkl")
+    features, _ = load_training_data()
+    compact, _ = surrogate.distill(model, features, n_samples=1000)
+
+    bundle_path = tmp_path / "serving_bundle.joblib"
+    bundle.build_bundle(model, preprocessor, "v1", bundle_path, surrogate=compact)
+    monkeypatch.setenv("MODEL_BUNDLE_PATH", str(bundle_path))
+    monkeypatch.setenv("SERVING_FLAVOR", "surrogate")
+
+    model_service = model_module.init(prediction_stream_name=None, model_id=None, test_run=True)
+
+    assert isinstance(model_service.model, surrogate.SurrogateModel)
+    assert model_service.model_version == "v1-surrogate"
+    with open("./integration-test/event.json", "rt") as f:
+        predictions = model_service.lambda_handler(json.load(f))["predictions"]
+    assert "probability" in predictions[0]["prediction"]
+
+
+def test_bundle_without_surrogate_rejects_the_surrogate_flavor(tmp_path):
+    bundle_path = tmp_path / "serving_bundle.joblib"
+    bundle.build_bundle(
+        joblib.load("./models/model.pkl"),
+        joblib.load("./models/preprocessor.pkl"),
+        "v1",
+        bundle_path,
+    )
+
+    with pytest.raises(ValueError, match="no surrogate"):
+        bundle.load_bundle(bundle_path, flavor="surrogate")
+
+
+def test_surrogate_flavor_requires_a_bundle(monkeypatch):
+    monkeypatch.delenv("MODEL_BUNDLE_PATH", raising=False)
+    monkeypatch.setenv("SERVING_FLAVOR", "surrogate")
+
+    with pytest.raises(ValueError, match="MODEL_BUNDLE_PATH"):
+        model_module.init(prediction_stream_name=None, model_id="run-id", test_run=True)
+
+
+def test_distill_rejects_models_other_than_svc():
+    features, labels = load_training_data()
+    model = families.build_model(
+        "kernel_approx",
+        {"C": 1.0, "gamma": 0.1, "kernel_approximation": "nystroem", "n_components": 50},
+    ).fit(features, labels)
+
+    with pytest.raises(ValueError, match="kernel SVC"):
+        surrogate.distill(model, features, n_samples=100)
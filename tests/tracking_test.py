@@ -0,0 +1,114 @@
+import mlflow
+from mlflow.tracking import MlflowClient, fluent
+from mlflow.tracking._tracking_service import utils as tracking_utils
+import pytest
+
+from lap import tracking
+
+
+class CountingClient:
+    """Wraps an MlflowClient and records the size of every log_batch request."""
+
+    def __init__(self, client, fail=False, rejected_key=None):
+        self.client = client
+        self.fail = fail
+        self.rejected_key = rejected_key
+        self.batches = []
+
+    def log_batch(self, run_id, metrics, params, tags):
+        if self.fail:
+            raise RuntimeError("tracking server unavailable")
+        if any(metric.key == self.rejected_key for metric in metrics):
+            raise ValueError(f"invalid metric {self.rejected_key}")
+        self.batches.append((len(metrics), len(params), len(tags)))
+        self.client.log_batch(run_id, metrics=metrics, params=params, tags=tags)
+
+
+@pytest.fixture
+def file_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("MLFLOW_ALLOW_FILE_STORE", "true")
+    # The tracking URI and experiment are process-wide, monkeypatch restores them after.
+    monkeypatch.setattr(tracking_utils, "_tracking_uri", tracking_utils._tracking_uri)
+    monkeypatch.setattr(fluent, "_active_experiment_id", fluent._active_experiment_id)
+    monkeypatch.delenv("MLFLOW_TRACKING_URI", raising=False)
+    monkeypatch.delenv("MLFLOW_EXPERIMENT_ID", raising=False)
+    mlflow.set_tracking_uri((tmp_path / "mlruns").as_uri())
+    mlflow.set_experiment("tracking_test")
+    yield
+    mlflow.end_run()
+
+
+def test_start_run_flushes_everything_before_run_end(file_store):
+    with tracking.start_run(run_name="batched", flush_interval=60) as run_logger:
+        run_logger.set_tag("model_name", "SVC")
+        run_logger.log_params({"C": 1.0, "kernel": "rbf"})
+        for step in range(5):
+            run_logger.log_metric("loss", 1 / (step + 1), step=step)
+        run_logger.log_metrics({"f1": 0.8, "fit_time": 0.25})
+        run_id = mlflow.active_run().info.run_id
+
+    run = MlflowClient().get_run(run_id)
+
+    assert run.info.status == "FINISHED"
+    assert run.data.tags["model_name"] == "SVC"
+    assert run.data.params == {"C": "1.0", "kernel": "rbf"}
+    assert run.data.metrics == {"loss": 0.2, "f1": 0.8, "fit_time": 0.25}
+    assert len(MlflowClient().get_metric_history(run_id, "loss")) == 5
+
+
+def test_batch_logger_splits_requests_at_batch_limits(file_store):
+    with mlflow.start_run() as run:
+        client = CountingClient(MlflowClient())
+        run_logger = tracking.BatchLogger(run.info.run_id, client=client, flush_interval=60)
+
+        run_logger.log_params({f"param_{i}": i for i in range(250)})
+        run_logger.log_metrics({f"metric_{i}": i for i in range(10)})
+        run_logger.flush()
+        run_logger.log_metric("late", 1.0)
+        run_logger.close()
+
+    assert client.batches == [(10, 100, 0), (0, 100, 0), (0, 50, 0), (1, 0, 0)]
+    assert len(MlflowClient().get_run(run.info.run_id).data.params) == 250
+
+
+def test_batch_logger_raises_background_errors_on_flush(file_store):
+    with mlflow.start_run() as run:
+        client = CountingClient(MlflowClient(), fail=True)
+        run_logger = tracking.BatchLogger(run.info.run_id, client=client)
+
+        run_logger.log_metric("f1", 0.8)
+        with pytest.raises(RuntimeError, match="tracking server unavailable"):
+            run_logger.flush()
+
+        # The metric the failed request carried is sent again on close.
+        client.fail = False
+        run_logger.close()
+
+    assert MlflowClient().get_run(run.info.run_id).data.metrics == {"f1": 0.8}
+
+
+def test_batch_logger_drops_entities_the_server_keeps_rejecting(file_store):
+    with mlflow.start_run() as run:
+        client = CountingClient(MlflowClient(), rejected_key="loss")
+        run_logger = tracking.BatchLogger(run.info.run_id, client=client)
+
+        run_logger.log_metric("loss", 1.0)
+        for _ in range(tracking.MAX_WRITE_ATTEMPTS):
+            with pytest.raises(ValueError, match="invalid metric"):
+                run_logger.flush()
+
+        run_logger.log_metric("f1", 0.8)
+        run_logger.close()
+
+    assert MlflowClient().get_run(run.info.run_id).data.metrics == {"f1": 0.8}
+
+
+def test_start_run_does_not_mask_the_block_error_with_logging_errors(file_store, monkeypatch):
+    monkeypatch.setattr(
+        tracking, "MlflowClient", lambda: CountingClient(MlflowClient(), fail=True)
+    )
+
+    with pytest.raises(ValueError, match="bad params"):
+        with tracking.start_run(run_name="failing") as run_logger:
+            run_logger.log_param("C", 1.0)
+            raise ValueError("bad params")
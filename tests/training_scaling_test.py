@@ -0,0 +1,32 @@
+import pandas as pd
+import pytest
+
+from benchmarks.training_scaling import scaling_exponents, upsample_raw_data
+
+
+def test_upsampled_raw_data_keeps_the_raw_schema():
+    raw = pd.read_csv("./data/raw/loan_pred.csv")
+
+    df = upsample_raw_data(5_000)
+
+    assert list(df.columns) == list(raw.columns)
+    assert len(df) == 5_000
+    assert df["Loan_ID"].is_unique
+    assert set(df["Loan_Status"]) == set(raw["Loan_Status"])
+
+
+def test_scaling_exponents_skip_unmeasured_sizes():
+    report = pd.DataFrame(
+        {
+            "n_rows": [1_000, 10_000, 100_000, 1_000, 10_000],
+            "stage": ["data"] * 3 + ["hp_optim"] * 2,
+            "mode": ["bare"] * 5,
+            "status": ["ok", "ok", "ok", "ok", "skipped"],
+            "seconds": [1.0, 10.0, 100.0, 5.0, None],
+        }
+    )
+
+    exponents = scaling_exponents(report)
+
+    assert exponents["stage"].tolist() == ["data"]
+    assert exponents["exponent"].iloc[0] == pytest.approx(1.0)
@@ -0,0 +1,104 @@
+import json
+import os
+
+from fastapi.testclient import TestClient
+import pandas as pd
+import pytest
+
+os.environ.setdefault("MODEL_PATH", "./models/model.pkl")
+os.environ.setdefault("PREPROCESSOR_PATH", "./models/preprocessor.pkl")
+os.environ.setdefault("CLEANER_PATH", "./models/cleaner.pkl")
+
+import predict
+
+client = TestClient(predict.app)
+
+
+def load_applications(n):
+    df = pd.read_csv("./data/interim/cleaned.csv").drop(columns=["Loan_Status"]).head(n)
+    df["Credit_History"] = df["Credit_History"].astype(int)
+    return df.to_dict("records")
+
+
+def test_predict_batch_matches_predict():
+    applications = load_applications(25)
+
+    expected = [client.post("/predict", json=a).json()["prediction"] for a in applications]
+
+    response = client.post("/predict_batch", json=applications)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    actual = [json.loads(line)["prediction"] for line in response.iter_lines() if line]
+
+    assert actual == expected
+
+
+def test_predict_batch_ndjson():
+    applications = load_applications(10)
+    content = "\n".join(json.dumps(application) for application in applications) + "\n"
+
+    response = client.post(
+        "/predict_batch", content=content, headers={"content-type": "application/x-ndjson"}
+    )
+
+    assert response.status_code == 200
+    assert len([line for line in response.iter_lines() if line]) == len(applications)
+
+
+def test_predict_batch_rejects_invalid_application():
+    applications = load_applications(3)
+    applications[1]["Gender"] = "Unknown"
+
+    response = client.post("/predict_batch", json=applications)
+
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"][:2] == [1, "Gender"]
+
+
+@pytest.mark.parametrize(
+    "content, content_type", [("[]", "application/json"), ("\n", "application/x-ndjson")]
+)
+def test_predict_batch_empty_body(content, content_type):
+    response = client.post(
+        "/predict_batch", content=content, headers={"content-type": content_type}
+    )
+
+    assert response.status_code == 200
+    assert response.text == ""
+
+
+def test_predict_returns_probability():
+    application = load_applications(1)[0]
+
+    response = client.post("/predict", json=application)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert 0.0 <= body["probability"] <= 1.0
+    assert (body["prediction"] == "Approved") == (
+        body["probability"] >= predict.APPROVAL_THRESHOLD
+    )
+
+
+def test_predict_imputes_missing_fields():
+    application = load_applications(1)[0]
+    imputed = dict(application)
+    for field in ("Gender", "LoanAmount", "Credit_History"):
+        del application[field]
+        imputed[field] = predict.preprocessor.fill_values[field]
+
+    response = client.post("/predict", json=application)
+
+    assert response.status_code == 200
+    assert response.json() == client.post("/predict", json=imputed).json()
+
+
+def test_metrics_endpoint_exposes_stage_histograms():
+    client.post("/predict", json=load_applications(1)[0])
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'stage="transform"' in response.text
+    assert f'model_version="{predict.MODEL_VERSION}"' in response.text